@@ -0,0 +1,141 @@
+"""
+Память и скорость RuleIndex и CompactRuleIndex на больших наборах правил.
+
+    python -m benchmarks.bench_memory --sizes 100000,1000000
+    python -m benchmarks.bench_memory --mixes deep --sizes 1000000 --output memory.json
+
+Для каждого набора правил и каждого индекса замеряются: время сборки,
+память индекса по tracemalloc (после прогрева, вместе со скомпилированными
+выражениями), пик памяти при сборке и одиночные проверки allows.
+Ответы компактного индекса сверяются с RuleIndex; расхождение - ошибка.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_rules import summarize
+from benchmarks.generators import MIXES, generate_paths, generate_rules
+
+INDEXES = ("index", "compact")
+
+
+def _index_class(name: str):
+    if name == "compact":
+        from whitelist01.compact import CompactRuleIndex
+
+        return CompactRuleIndex
+    from whitelist01.index import RuleIndex
+
+    return RuleIndex
+
+
+def bench_index(name: str, rules: list[str], paths: list[str]) -> tuple[dict, bytearray]:
+    """
+    Один замер индекса name. Возвращает запись отчета и ответы check_many(paths).
+    """
+    index_class = _index_class(name)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter_ns()
+    index = index_class(rules)
+    build = time.perf_counter_ns() - start
+    # Прогрев: ленивые выражения узлов входят в память индекса
+    answers = index.check_many(paths)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durations = []
+    allows = index.allows
+    for file_path in paths:
+        start = time.perf_counter_ns()
+        allows(file_path)
+        durations.append(time.perf_counter_ns() - start)
+    start = time.perf_counter_ns()
+    index.check_many(paths)
+    batch = time.perf_counter_ns() - start
+    record = {
+        "index": name,
+        "build_s": build / 1e9,
+        "memory_bytes": current,
+        "peak_bytes": peak,
+        "bytes_per_rule": current / len(rules) if rules else 0.0,
+        "lookup": summarize(durations),
+        "check_many_us_per_path": batch / len(paths) / 1e3 if paths else 0.0,
+    }
+    return record, answers
+
+
+def _format_row(record: dict) -> str:
+    return (
+        f"{record['mix']:<8} {record['size']:>9} {record['index']:<8}"
+        f" сборка {record['build_s']:7.2f} с"
+        f"  память {record['memory_bytes'] / 2**20:8.1f} МиБ ({record['bytes_per_rule']:6.0f} Б/правило)"
+        f"  пик {record['peak_bytes'] / 2**20:8.1f} МиБ"
+        f"  p50 {record['lookup']['latency_us']['p50']:6.2f} мкс"
+        f"  пачкой {record['check_many_us_per_path']:6.2f} мкс"
+    )
+
+
+def run(args) -> dict:
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "args": vars(args).copy(),
+        },
+        "results": [],
+    }
+    for mix in args.mixes:
+        for size in args.sizes:
+            rules = generate_rules(mix, size, seed=args.seed)
+            paths = generate_paths(rules, args.lookups, seed=args.seed, hit_ratio=args.hit_ratio)
+            expected = None
+            for name in args.indexes:
+                record, answers = bench_index(name, rules, paths)
+                if expected is None:
+                    expected = answers
+                record["mix"] = mix
+                record["size"] = size
+                record["mismatches"] = sum(a != b for a, b in zip(answers, expected))
+                report["results"].append(record)
+                print(_format_row(record), flush=True)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Память и скорость RuleIndex и CompactRuleIndex.")
+    parser.add_argument("--indexes", nargs="+", choices=INDEXES, default=list(INDEXES))
+    parser.add_argument("--mixes", nargs="+", choices=MIXES, default=list(MIXES))
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[100000],
+        help="числа правил через запятую",
+    )
+    parser.add_argument("--lookups", type=int, default=20000, help="число проверок доступа")
+    parser.add_argument("--hit-ratio", type=float, default=0.5, help="доля путей, построенных из правил")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="куда сохранить отчет в JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    failed = sum(record["mismatches"] for record in report["results"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
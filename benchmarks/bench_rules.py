@@ -0,0 +1,217 @@
+"""
+Замеры add, remove и проверки доступа для whitelist и whitelist01.
+
+    python -m benchmarks.bench_rules --sizes 1000,100000 --output results.json
+    python -m benchmarks.bench_rules --compare results.json --output new.json
+
+Для каждой реализации, набора правил и числа правил замеряются:
+add и remove пачки правил, создание функции проверки и одиночные проверки.
+Результаты (пропускная способность и перцентили задержки) печатаются таблицей
+и сохраняются в JSON, который можно сравнить с прошлым запуском через --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.generators import MIXES, generate_paths, generate_rules
+
+
+def _whitelist_impl():
+    from whitelist import whitelist_rules
+
+    return {
+        "file": lambda path: path + r"\.whitelist.txt",
+        "save_rules": whitelist_rules.save_rules,
+        "add": whitelist_rules.add,
+        "remove": whitelist_rules.remove,
+        "checker": whitelist_rules.cheker,
+    }
+
+
+def _whitelist01_impl():
+    from whitelist01 import whitelist_rules
+
+    return {
+        "file": lambda path: os.path.join(path, ".whitelist.txt"),
+        "save_rules": whitelist_rules.save_rules,
+        "add": whitelist_rules.add,
+        "remove": whitelist_rules.remove,
+        "checker": whitelist_rules.checker,
+    }
+
+
+IMPLEMENTATIONS = {"whitelist": _whitelist_impl, "whitelist01": _whitelist01_impl}
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """
+    Перцентиль q (0-100) по отсортированному списку, методом ближайшего ранга.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(durations_ns: list[int]) -> dict:
+    """
+    Сводка по длительностям операций: пропускная способность и задержки в микросекундах.
+    """
+    values = sorted(durations_ns)
+    total = sum(values)
+    return {
+        "count": len(values),
+        "total_s": total / 1e9,
+        "throughput_per_s": len(values) / (total / 1e9) if total else 0.0,
+        "latency_us": {
+            "min": values[0] / 1e3,
+            "mean": total / len(values) / 1e3,
+            "p50": percentile(values, 50) / 1e3,
+            "p90": percentile(values, 90) / 1e3,
+            "p99": percentile(values, 99) / 1e3,
+            "max": values[-1] / 1e3,
+        },
+    }
+
+
+def _timed(function, *args) -> int:
+    start = time.perf_counter_ns()
+    function(*args)
+    return time.perf_counter_ns() - start
+
+
+def bench_case(impl: dict, mix: str, size: int, args) -> dict:
+    """
+    Замеры одной реализации на одном наборе правил.
+    Возвращает словарь {операция: сводка}.
+    """
+    rules = generate_rules(mix, size, seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix="whitelist-bench-")
+    path = os.path.join(workdir, "root")
+    os.mkdir(path)
+    try:
+        impl["save_rules"](impl["file"](path), set(rules))
+        results = {}
+
+        # add и remove одной и той же пачки, чтобы размер файла не менялся
+        add_times, remove_times = [], []
+        for repeat in range(args.repeats):
+            batch = [f"bench_{repeat}/{rule}" for rule in generate_rules(mix, args.batch, seed=args.seed + 1 + repeat)]
+            add_times.append(_timed(impl["add"], path, batch))
+            remove_times.append(_timed(impl["remove"], path, batch))
+        results["add"] = summarize(add_times)
+        results["remove"] = summarize(remove_times)
+
+        results["checker_build"] = summarize([_timed(impl["checker"], path) for _ in range(args.repeats)])
+
+        access = impl["checker"](path)
+        paths = generate_paths(rules, args.lookups, seed=args.seed, hit_ratio=args.hit_ratio)
+        # Первый проход прогревает ленивые структуры и кэши
+        allowed = sum(map(bool, map(access, paths)))
+        clock = time.perf_counter_ns
+        lookup_times = []
+        for file_path in paths:
+            start = clock()
+            access(file_path)
+            lookup_times.append(clock() - start)
+        results["lookup"] = summarize(lookup_times)
+        results["lookup"]["allowed_ratio"] = allowed / len(paths) if paths else 0.0
+        return results
+    finally:
+        # Файл whitelist (path + '\.whitelist.txt') тоже лежит внутри workdir
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args) -> dict:
+    """
+    Запускает все замеры и возвращает JSON-совместимый отчет.
+    """
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "args": vars(args).copy(),
+        },
+        "results": [],
+    }
+    report["meta"]["args"].pop("compare", None)
+    for name in args.implementations:
+        impl = IMPLEMENTATIONS[name]()
+        for mix in args.mixes:
+            for size in args.sizes:
+                for operation, summary in bench_case(impl, mix, size, args).items():
+                    record = {"implementation": name, "mix": mix, "rules": size, "operation": operation}
+                    record.update(summary)
+                    report["results"].append(record)
+                    print(_format_row(record), flush=True)
+    return report
+
+
+def _key(record: dict) -> tuple:
+    return record["implementation"], record["mix"], record["rules"], record["operation"]
+
+
+def _format_row(record: dict, baseline: dict | None = None) -> str:
+    latency = record["latency_us"]
+    row = (
+        f"{record['implementation']:<12} {record['mix']:<8} {record['rules']:>8} {record['operation']:<14}"
+        f" {record['throughput_per_s']:>12.1f}/s  p50 {latency['p50']:>10.1f}us"
+        f"  p90 {latency['p90']:>10.1f}us  p99 {latency['p99']:>10.1f}us"
+    )
+    if baseline is not None and baseline["latency_us"]["p50"]:
+        row += f"  p50 x{latency['p50'] / baseline['latency_us']['p50']:.2f}"
+    return row
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """
+    Сравнивает отчет с прошлым: для совпадающих замеров печатает отношение p50 (новый / старый).
+    """
+    previous = {_key(record): record for record in baseline["results"]}
+    return [_format_row(record, previous[_key(record)]) for record in report["results"] if _key(record) in previous]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры add, remove и проверки доступа whitelist и whitelist01.")
+    parser.add_argument("--implementations", nargs="+", choices=sorted(IMPLEMENTATIONS), default=sorted(IMPLEMENTATIONS))
+    parser.add_argument("--mixes", nargs="+", choices=MIXES, default=list(MIXES))
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[1000, 10000, 100000],
+        help="числа правил через запятую, например 1000,100000,1000000",
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="повторы add/remove и создания проверки")
+    parser.add_argument("--batch", type=int, default=10, help="правил в одном add/remove")
+    parser.add_argument("--lookups", type=int, default=10000, help="число проверок доступа")
+    parser.add_argument("--hit-ratio", type=float, default=0.5, help="доля путей, построенных из правил")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="куда сохранить отчет в JSON")
+    parser.add_argument("--compare", help="отчет прошлого запуска для сравнения")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        print("\nСравнение с", args.compare)
+        for row in compare(report, baseline):
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Задержка проверки доступа через сервер решений whitelist01.server
+в сравнении с проверкой в процессе.
+
+    python -m benchmarks.bench_server --rules 100000 --batches 1,64,1024
+
+Сервер запускается в отдельном процессе на временном сокете.
+Замеряются: одиночная проверка checker(path) в процессе, одиночная проверка
+через сервер (один путь - один запрос), пакетные запросы разных размеров
+и конвейерная отправка пачек. Задержка приводится на один путь.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_rules import summarize
+from benchmarks.generators import GLOB, MIXES, generate_paths, generate_rules
+
+
+def _wait_for_socket(socket_path: str, process, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("сервер не запустился")
+        time.sleep(0.05)
+
+
+def _per_path(record: dict, paths_per_call: int) -> dict:
+    # Сводка по вызовам -> задержка на один путь
+    record["paths_per_call"] = paths_per_call
+    record["per_path_us"] = record["latency_us"]["mean"] / paths_per_call
+    record["paths_per_s"] = record["throughput_per_s"] * paths_per_call
+    return record
+
+
+def run(args) -> dict:
+    from whitelist01.server import DecisionClient
+    from whitelist01.whitelist_rules import checker, save_rules
+
+    rules = generate_rules(args.mix, args.rules, seed=args.seed)
+    paths = generate_paths(rules, args.lookups, seed=args.seed, hit_ratio=args.hit_ratio)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "args": vars(args).copy(),
+        },
+        "results": [],
+    }
+    clock = time.perf_counter_ns
+    workdir = tempfile.mkdtemp(prefix="whitelist-bench-")
+    socket_path = os.path.join(workdir, "wl.sock")
+    root = os.path.join(workdir, "root")
+    os.mkdir(root)
+    save_rules(os.path.join(root, ".whitelist.txt"), set(rules))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "whitelist01.server", socket_path, "--preload", root],
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    )
+    try:
+        _wait_for_socket(socket_path, process)
+
+        local = checker(root)
+        expected = [local(file_path) for file_path in paths]
+        times = []
+        for file_path in paths:
+            start = clock()
+            local(file_path)
+            times.append(clock() - start)
+        report["results"].append(_per_path(dict(case="local", **summarize(times)), 1))
+
+        with DecisionClient(socket_path) as client:
+            remote = client.checker(root)
+            mismatches = sum(remote(file_path) != answer for file_path, answer in zip(paths, expected))
+            times = []
+            for file_path in paths:
+                start = clock()
+                remote(file_path)
+                times.append(clock() - start)
+            record = _per_path(dict(case="remote", **summarize(times)), 1)
+            record["mismatches"] = mismatches
+            report["results"].append(record)
+
+            for size in args.batches:
+                batches = [paths[i : i + size] for i in range(0, len(paths), size)]
+                times = []
+                for batch in batches:
+                    start = clock()
+                    remote.check_many(batch)
+                    times.append(clock() - start)
+                report["results"].append(_per_path(dict(case=f"remote_batch_{size}", **summarize(times)), size))
+
+                start = clock()
+                answers = remote.check_batches(batches)
+                duration = clock() - start
+                record = _per_path(dict(case=f"remote_pipelined_{size}", **summarize([duration])), len(paths))
+                record["mismatches"] = sum(
+                    bool(answer) != expect
+                    for answer, expect in zip((value for result in answers for value in result), expected)
+                )
+                report["results"].append(record)
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for record in report["results"]:
+        print(_format_row(record), flush=True)
+    return report
+
+
+def _format_row(record: dict) -> str:
+    latency = record["latency_us"]
+    return (
+        f"{record['case']:<24} {record['paths_per_s']:>12.1f} путей/s  на путь {record['per_path_us']:>8.2f}us"
+        f"  вызов p50 {latency['p50']:>10.1f}us  p99 {latency['p99']:>10.1f}us"
+        f"  расхождений {record.get('mismatches', 0)}"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Задержка проверки через сервер решений и в процессе.")
+    parser.add_argument("--mix", choices=MIXES, default=GLOB)
+    parser.add_argument("--rules", type=int, default=10000, help="число правил")
+    parser.add_argument("--lookups", type=int, default=20000, help="число проверяемых путей")
+    parser.add_argument(
+        "--batches",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[16, 256, 4096],
+        help="размеры пачек через запятую",
+    )
+    parser.add_argument("--hit-ratio", type=float, default=0.5, help="доля путей, построенных из правил")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="куда сохранить отчет в JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    return 1 if any(record.get("mismatches") for record in report["results"]) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,204 @@
+"""
+Многопоточный стресс-замер проверки доступа whitelist01.LiveChecker.
+
+    python -m benchmarks.bench_threads --rules 100000 --threads 1,2,4,8
+    python -m benchmarks.bench_threads --writes-per-s 50 --output threads.json
+
+Одна проверка делится между потоками-читателями; поток-писатель в это время
+добавляет и удаляет правила через LiveChecker.apply (как после add/remove,
+но без записи файла), и каждое изменение публикует новый индекс. Для каждого числа потоков замеряется общая пропускная
+способность и ускорение относительно одного потока. Каждый ответ сверяется
+с ожидаемым: изменяемые правила лежат в отдельной директории и не влияют
+на проверяемые пути, поэтому любое расхождение - ошибка публикации индекса.
+Режим --mode locked для сравнения берет общую блокировку на каждую проверку.
+
+Рост с числом потоков возможен только на сборке Python без GIL
+(python3.13t и новее); со включенным GIL потоки выполняют байт-код по очереди,
+и замер показывает только отсутствие ошибок и накладные расходы.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_rules import summarize
+from benchmarks.generators import GLOB, MIXES, generate_paths, generate_rules
+
+# Директория изменяемых правил: проверяемые пути в нее не попадают
+TOGGLE_DIR = "bench_toggle"
+
+
+def gil_enabled() -> bool:
+    check = getattr(sys, "_is_gil_enabled", None)
+    return True if check is None else check()
+
+
+def _reader(access, paths, expected, barrier, result, slot):
+    mismatches = 0
+    barrier.wait()
+    start = time.perf_counter_ns()
+    for file_path, answer in zip(paths, expected):
+        if access(file_path) != answer:
+            mismatches += 1
+    result[slot] = (time.perf_counter_ns() - start, mismatches)
+
+
+def _writer(live, stop, rate, durations):
+    rules = [f"{TOGGLE_DIR}/{i}/*.log" for i in range(4)]
+    pause = 1.0 / rate
+    present = False
+    while not stop.is_set():
+        start = time.perf_counter_ns()
+        if present:
+            live.apply(rules, ())
+        else:
+            live.apply((), rules)
+        durations.append(time.perf_counter_ns() - start)
+        present = not present
+        stop.wait(pause)
+
+
+def bench_threads(live, paths, expected, threads: int, mode: str, writes_per_s: float) -> dict:
+    """
+    Один замер: threads читателей проверяют paths, пока писатель меняет правила.
+    """
+    if mode == "locked":
+        lock = threading.Lock()
+
+        def access(file_path):
+            with lock:
+                return live(file_path)
+
+    else:
+        access = live
+
+    barrier = threading.Barrier(threads + 1)
+    result = [None] * threads
+    readers = [
+        threading.Thread(target=_reader, args=(access, paths, expected, barrier, result, slot))
+        for slot in range(threads)
+    ]
+    stop = threading.Event()
+    write_times = []
+    writer = threading.Thread(target=_writer, args=(live, stop, writes_per_s, write_times)) if writes_per_s else None
+    for reader in readers:
+        reader.start()
+    updates_before = live.updates
+    if writer is not None:
+        writer.start()
+    barrier.wait()
+    start = time.perf_counter_ns()
+    for reader in readers:
+        reader.join()
+    wall = time.perf_counter_ns() - start
+    stop.set()
+    if writer is not None:
+        writer.join()
+
+    lookups = threads * len(paths)
+    record = {
+        "threads": threads,
+        "mode": mode,
+        "lookups": lookups,
+        "wall_s": wall / 1e9,
+        "throughput_per_s": lookups / (wall / 1e9) if wall else 0.0,
+        "mismatches": sum(mismatches for _, mismatches in result),
+        "updates": live.updates - updates_before,
+    }
+    if write_times:
+        record["write"] = summarize(write_times)
+    return record
+
+
+def run(args) -> dict:
+    from whitelist01.checkers import LiveChecker
+    from whitelist01.index import RuleIndex
+    from whitelist01.whitelist_rules import save_rules
+
+    rules = generate_rules(args.mix, args.rules, seed=args.seed)
+    paths = generate_paths(rules, args.lookups, seed=args.seed, hit_ratio=args.hit_ratio)
+    index = RuleIndex(rules)
+    expected = [index.allows(file_path) for file_path in paths]
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "gil_enabled": gil_enabled(),
+            "args": vars(args).copy(),
+        },
+        "results": [],
+    }
+    workdir = tempfile.mkdtemp(prefix="whitelist-bench-")
+    try:
+        save_rules(os.path.join(workdir, ".whitelist.txt"), set(rules))
+        live = LiveChecker(workdir)
+        # Первый проход прогревает ленивые выражения узлов
+        live.check_many(paths)
+        for mode in args.modes:
+            base = None
+            for threads in args.threads:
+                record = bench_threads(live, paths, expected, threads, mode, args.writes_per_s)
+                base = base or record["throughput_per_s"]
+                record["speedup"] = record["throughput_per_s"] / base if base else 0.0
+                record["efficiency"] = record["speedup"] / threads
+                report["results"].append(record)
+                print(_format_row(record), flush=True)
+        live.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def _format_row(record: dict) -> str:
+    row = (
+        f"{record['mode']:<8} {record['threads']:>3} потоков {record['throughput_per_s']:>12.1f}/s"
+        f"  x{record['speedup']:.2f} ({record['efficiency']:.0%})"
+        f"  изменений {record['updates']:>4}  расхождений {record['mismatches']}"
+    )
+    if "write" in record:
+        row += f"  публикация p50 {record['write']['latency_us']['p50']:.0f}us"
+    return row
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Многопоточный замер проверки доступа whitelist01.LiveChecker.")
+    parser.add_argument("--mix", choices=MIXES, default=GLOB)
+    parser.add_argument("--rules", type=int, default=10000, help="число правил")
+    parser.add_argument(
+        "--threads",
+        type=lambda value: [int(count) for count in value.split(",")],
+        default=[1, 2, 4, 8],
+        help="числа потоков-читателей через запятую",
+    )
+    parser.add_argument("--modes", nargs="+", choices=["snapshot", "locked"], default=["snapshot", "locked"])
+    parser.add_argument("--lookups", type=int, default=20000, help="проверок на один поток")
+    parser.add_argument("--hit-ratio", type=float, default=0.5, help="доля путей, построенных из правил")
+    parser.add_argument("--writes-per-s", type=float, default=20.0, help="изменений правил в секунду (0 - без писателя)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="куда сохранить отчет в JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"GIL {'включен' if gil_enabled() else 'выключен'}, процессоров: {os.cpu_count()}", flush=True)
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    failed = sum(record["mismatches"] for record in report["results"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+import random
+
+# Наборы правил для замеров
+LITERAL = "literal"
+GLOB = "glob"
+DEEP = "deep"
+MIXES = (LITERAL, GLOB, DEEP)
+
+_EXTENSIONS = ("py", "txt", "md", "json", "csv", "log", "yaml", "cfg")
+
+
+def _segment(rng: random.Random, prefix: str, spread: int) -> str:
+    return f"{prefix}{rng.randrange(spread)}"
+
+
+def _literal_rule(rng: random.Random, depth: int) -> str:
+    parts = [_segment(rng, "d", 50) for _ in range(depth - 1)]
+    if rng.random() < 0.7:
+        parts.append(f"{_segment(rng, 'file_', 1000)}.{rng.choice(_EXTENSIONS)}")
+    else:
+        parts.append(_segment(rng, "dir_", 1000))
+    return "/".join(parts)
+
+
+def _glob_rule(rng: random.Random) -> str:
+    directory = "/".join(_segment(rng, "d", 50) for _ in range(rng.randint(1, 3)))
+    kind = rng.randrange(5)
+    if kind == 0:
+        return f"{directory}/*"
+    if kind == 1:
+        return f"*.{rng.choice(_EXTENSIONS)}{rng.randrange(100)}"
+    if kind == 2:
+        return f"{directory}/*.{rng.choice(_EXTENSIONS)}"
+    if kind == 3:
+        return f"{directory}/**/test_?{rng.randrange(100)}.py"
+    return f"{directory}/{_segment(rng, 'name_', 1000)}_*"
+
+
+def generate_rules(mix: str, count: int, seed: int = 0) -> list[str]:
+    """
+    Генерирует правила для замеров.
+
+        Args:
+            mix: вид набора: 'literal' - пути до файлов и директорий глубиной 2-4,
+                'glob' - наполовину шаблоны ('*', '**', '?', расширения),
+                'deep' - пути глубиной 8-16.
+            count: сколько правил нужно.
+            seed: зерно генератора; одинаковые аргументы дают одинаковые правила.
+
+        Возвращает список без повторов.
+    """
+    if mix not in MIXES:
+        raise ValueError(f"неизвестный набор правил: {mix}")
+    rng = random.Random(f"{mix}:{count}:{seed}")
+    rules = {}
+    while len(rules) < count:
+        if mix == LITERAL:
+            rule = _literal_rule(rng, rng.randint(2, 4))
+        elif mix == DEEP:
+            rule = _literal_rule(rng, rng.randint(8, 16))
+        elif rng.random() < 0.5:
+            rule = _glob_rule(rng)
+        else:
+            rule = _literal_rule(rng, rng.randint(2, 4))
+        rules[rule] = None
+    return list(rules)
+
+
+def generate_paths(rules: list[str], count: int, seed: int = 0, hit_ratio: float = 0.5) -> list[str]:
+    """
+    Генерирует пути для проверки доступа.
+
+        Args:
+            rules: правила, из которых строятся разрешенные пути.
+            count: сколько путей нужно.
+            seed: зерно генератора.
+            hit_ratio: доля путей, построенных из правил (обычно разрешенных);
+                остальные - случайные пути той же формы.
+    """
+    rng = random.Random(f"paths:{count}:{seed}")
+    paths = []
+    for _ in range(count):
+        if rules and rng.random() < hit_ratio:
+            rule = rng.choice(rules)
+            # Шаблон превращается в подходящий под него путь
+            path = rule.replace("**", "x/y").replace("*", "x").replace("?", "1")
+            if rng.random() < 0.3:
+                path += f"/{_segment(rng, 'sub_', 100)}.txt"
+        else:
+            path = _literal_rule(rng, rng.randint(2, 12))
+        paths.append(path)
+    return paths
@@ -1 +1,4 @@
 from whitelist.whitelist_rules import add, remove, cheker
+from whitelist.checkers import ReloadingCheker
+from whitelist.registry import ChekerRegistry
+from whitelist.session import edit
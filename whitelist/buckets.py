@@ -0,0 +1,90 @@
+import os
+import re
+import fnmatch
+from bisect import bisect_right
+
+# Символы шаблона fnmatch
+WILDCARDS = "*?["
+
+
+class RuleBuckets:
+    """
+    Правила '.whitelist', разложенные по видам для быстрой проверки fnmatch.
+
+    Точные пути лежат в множестве, префиксы ('foo/*') - в отсортированном списке,
+    хвосты ('*.log') - в словаре по расширению. Через регулярное выражение
+    fnmatch проверяются только оставшиеся шаблоны.
+    Ответы совпадают с any(fnmatch.fnmatch(path, rule) for rule in rules).
+    """
+
+    __slots__ = ("_exact", "_prefixes", "_suffixes", "_patterns")
+
+    def __init__(self, rules):
+        self._exact = set()
+        self._suffixes = {}
+        self._patterns = []
+        prefixes = []
+        for rule in rules:
+            # fnmatch сравнивает пути после os.path.normcase
+            rule = os.path.normcase(rule)
+            literal = rule.rstrip("*")
+            tail = rule.lstrip("*")
+            if not any(c in rule for c in WILDCARDS):
+                self._exact.add(rule)
+            elif not any(c in literal for c in WILDCARDS):
+                prefixes.append(literal)
+            elif tail and "." in tail and not any(c in tail for c in WILDCARDS):
+                self._suffixes.setdefault(tail[tail.rfind(".") + 1 :], []).append(tail)
+            else:
+                self._patterns.append(re.compile(fnmatch.translate(rule)))
+        # Префиксы, покрытые более коротким префиксом, не нужны:
+        # тогда путь может начинаться только с ближайшего слева префикса
+        self._prefixes = []
+        for prefix in sorted(prefixes):
+            if not self._prefixes or not prefix.startswith(self._prefixes[-1]):
+                self._prefixes.append(prefix)
+
+    def match(self, path: str) -> bool:
+        """
+        Проверяет, подходит ли путь под какое-либо правило.
+        """
+        path = os.path.normcase(path)
+        if path in self._exact:
+            return True
+        prefixes = self._prefixes
+        if prefixes:
+            i = bisect_right(prefixes, path)
+            if i and path.startswith(prefixes[i - 1]):
+                return True
+        if self._suffixes:
+            bucket = self._suffixes.get(path[path.rfind(".") + 1 :])
+            if bucket and any(path.endswith(suffix) for suffix in bucket):
+                return True
+        return any(pattern.match(path) for pattern in self._patterns)
+
+    def evaluated(self, path: str) -> int:
+        """
+        Считает шаблоны, которые проверяет match(path).
+
+        Точное совпадение шаблонов не требует, ближайший префикс считается
+        одним шаблоном, хвосты и остальные шаблоны - по одному до первого совпадения.
+        """
+        path = os.path.normcase(path)
+        if path in self._exact:
+            return 0
+        count = 0
+        if self._prefixes:
+            count += 1
+            i = bisect_right(self._prefixes, path)
+            if i and path.startswith(self._prefixes[i - 1]):
+                return count
+        bucket = self._suffixes.get(path[path.rfind(".") + 1 :]) if self._suffixes else None
+        for suffix in bucket or ():
+            count += 1
+            if path.endswith(suffix):
+                return count
+        for pattern in self._patterns:
+            count += 1
+            if pattern.match(path):
+                return count
+        return count
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+from whitelist import metrics
+from whitelist.buckets import RuleBuckets
+from whitelist.journal import journal_path
+from whitelist.whitelist_rules import load_rules
+
+
+def file_signature(path: str):
+    """
+    Возвращает признаки версии файла: (mtime в наносекундах, размер, inode).
+    Для отсутствующего файла возвращает None.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ReloadingCheker:
+    """
+    Долгоживущая проверка доступа, которая сама подхватывает изменения '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            interval: как часто (в секундах) проверять, не изменился ли файл.
+
+    Между проверками файла вызов не делает ввода-вывода, правила
+    перечитываются только после изменения файла.
+    """
+
+    def __init__(self, path: str, interval: float = 1.0):
+        self.whitelist_file = path + r"\.whitelist.txt"
+        self.interval = interval
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+        self._buckets = RuleBuckets([])
+        self.refresh(force=True)
+
+    def __call__(self, file_path: str) -> bool:
+        if time.monotonic() >= self._next_check:
+            self.refresh()
+        # Правила читаются один раз: refresh из другого потока подменяет их целиком
+        buckets = self._buckets
+        if metrics.sink is not None:
+            return metrics.timed_lookup(buckets.match, file_path, buckets.evaluated)
+        return buckets.match(file_path)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Проверяет файл и перечитывает правила, если файл изменился.
+        Возвращает True, если правила были перечитаны.
+        """
+        # пока один поток перечитывает правила, остальные работают со старыми
+        if not self._lock.acquire(blocking=force):
+            return False
+        try:
+            self._next_check = time.monotonic() + self.interval
+            # изменения могут лежать и в журнале рядом с файлом
+            signature = file_signature(self.whitelist_file), file_signature(journal_path(self.whitelist_file))
+            if signature == self._signature and not force:
+                return False
+            timing = metrics.sink is not None
+            start = time.perf_counter_ns() if timing else 0
+            self._buckets = RuleBuckets(load_rules(self.whitelist_file))
+            if timing:
+                metrics.emit("checker_build", duration_ns=time.perf_counter_ns() - start, mode="reload")
+            self._signature = signature
+            self.loads += 1
+            return True
+        finally:
+            self._lock.release()
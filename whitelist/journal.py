@@ -0,0 +1,76 @@
+import os
+
+# Журнал лежит рядом с файлом '.whitelist': '.whitelist.txt.journal'
+JOURNAL_SUFFIX = ".journal"
+# Пороги, после которых журнал сворачивается в основной файл
+MAX_JOURNAL_RECORDS = 1000
+MAX_JOURNAL_BYTES = 256 * 1024
+
+
+def journal_path(path: str) -> str:
+    """
+    Возвращает путь до журнала изменений для файла '.whitelist'.
+    """
+    return path + JOURNAL_SUFFIX
+
+
+def read_journal(path: str) -> list[str]:
+    """
+    Функция чтения записей журнала.
+
+        Args:
+            path: путь до файла '.whitelist'.
+
+        Запись: '+правило' или '-правило' на отдельной строке.
+        Недописанная последняя строка (без перевода строки) пропускается.
+    """
+    try:
+        with open(journal_path(path), "r", encoding="utf-8", newline="\n") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+    return data[: data.rfind("\n") + 1].splitlines()
+
+
+def replay(rules: list[str], records: list[str]) -> list[str]:
+    """
+    Применяет записи журнала к правилам из основного файла.
+    """
+    present_rules = dict.fromkeys(rules)
+    for record in records:
+        if record[:1] == "+":
+            present_rules[record[1:]] = None
+        elif record[:1] == "-":
+            present_rules.pop(record[1:], None)
+    return list(present_rules)
+
+
+def append_records(path: str, before: set, after: set) -> bool:
+    """
+    Дописывает в журнал разницу между старым и новым набором правил.
+
+        Args:
+            path: путь до файла '.whitelist'.
+            before: правила до изменения.
+            after: правила после изменения.
+
+        Возвращает True, если журнал превысил пороги и его пора свернуть.
+    """
+    records = ["-" + rule for rule in sorted(before - after)]
+    records += ["+" + rule for rule in sorted(after - before)]
+    if not records:
+        return False
+    with open(journal_path(path), "a", encoding="utf-8", newline="\n") as file:
+        file.write("".join(record + "\n" for record in records))
+        size = file.tell()
+    return size >= MAX_JOURNAL_BYTES or len(read_journal(path)) >= MAX_JOURNAL_RECORDS
+
+
+def discard_journal(path: str):
+    """
+    Удаляет журнал после того, как правила целиком записаны в основной файл.
+    """
+    try:
+        os.remove(journal_path(path))
+    except FileNotFoundError:
+        pass
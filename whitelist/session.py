@@ -0,0 +1,102 @@
+import contextlib
+
+from whitelist.buckets import RuleBuckets
+from whitelist.locking import locked
+from whitelist.whitelist_rules import access_cheker_for, add_rules, load_rules, remove_rules, save_changes, save_rules
+
+
+class RuleSession:
+    """
+    Серия изменений правил в памяти с одной записью файла.
+
+        Args:
+            whitelist_file: путь до файла '.whitelist'.
+            rules: правила файла на начало сессии.
+            journal: при commit дописать изменения в журнал вместо перезаписи файла.
+
+    add и remove работают так же, как функции add и remove пакета,
+    но меняют только набор в памяти. Обычно создается через edit(path).
+    """
+
+    def __init__(self, whitelist_file: str, rules, journal: bool = False):
+        self.whitelist_file = whitelist_file
+        self.journal = journal
+        self._before = frozenset(rules)
+        self._rules = set(self._before)
+
+    @property
+    def rules(self) -> frozenset:
+        """
+        Текущие правила сессии, включая незаписанные изменения.
+        """
+        return frozenset(self._rules)
+
+    @property
+    def changed(self) -> bool:
+        return self._rules != self._before
+
+    def add(self, rules: list[str]):
+        """
+        Добавляет правила в памяти, см. add.
+        """
+        self._rules = add_rules(self._rules, rules)
+
+    def remove(self, rules: list[str]):
+        """
+        Удаляет правила в памяти, см. remove.
+        """
+        self._rules = remove_rules(self._rules, rules)
+
+    def cheker(self):
+        """
+        Возвращает функцию проверки доступа по текущим правилам сессии,
+        включая незаписанные изменения; диск не читается.
+        """
+        return access_cheker_for(RuleBuckets(self._rules))
+
+    def commit(self):
+        """
+        Записывает изменения сессии (если они есть); сессию можно продолжать.
+        """
+        if not self.changed:
+            return
+        if self.journal:
+            save_changes(self.whitelist_file, self._before, self._rules)
+        else:
+            save_rules(self.whitelist_file, self._rules)
+        self._before = frozenset(self._rules)
+
+    def rollback(self):
+        """
+        Отменяет изменения после последнего commit.
+        """
+        self._rules = set(self._before)
+
+
+# Сессия изменения правил
+@contextlib.contextmanager
+def edit(path: str, journal: bool = False):
+    """
+    Сессия изменения правил файла '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            journal: записать изменения в журнал вместо перезаписи файла.
+
+        with edit(path) as session:
+            session.add(["foo/bar"])
+            access_cheker = session.cheker()
+
+        Правила читаются один раз в начале, изменения записываются один раз
+        при выходе из блока. Если в блоке возникло исключение, ничего
+        не записывается. Всю сессию файл заблокирован для других писателей.
+    """
+    whitelist_file = path + r"\.whitelist.txt"
+    with locked(whitelist_file):
+        session = RuleSession(whitelist_file, load_rules(whitelist_file), journal)
+        try:
+            yield session
+        except BaseException:
+            session.rollback()
+            raise
+        session.commit()
@@ -0,0 +1,31 @@
+import fnmatch
+import random
+
+from whitelist.buckets import RuleBuckets
+
+
+def test_rule_kinds():
+    """
+    Точные пути, префиксы, расширения и сложные шаблоны проверяются своими способами.
+    """
+    buckets = RuleBuckets(["foo/bar", "docs/*", "*.log", "img/[ab]?.png"])
+    assert buckets.match("foo/bar")
+    assert not buckets.match("foo/ba")
+    assert buckets.match("docs/a/b")
+    assert buckets.match("var/x.log")
+    assert not buckets.match("var/x.logs")
+    assert buckets.match("img/a1.png")
+    assert not buckets.match("img/c1.png")
+
+
+def test_same_results_as_fnmatch():
+    """
+    Ответы совпадают с перебором fnmatch по всем правилам.
+    """
+    rng = random.Random(3)
+    alphabet = ["a", "b", "/", ".", "*", "?", "[a]", ".log"]
+    rules = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(200)]
+    buckets = RuleBuckets(rules)
+    for _ in range(800):
+        path = "".join(rng.choice(["a", "b", "/", ".", "log", "\n"]) for _ in range(rng.randint(0, 7)))
+        assert buckets.match(path) == any(fnmatch.fnmatch(path, rule) for rule in rules), path
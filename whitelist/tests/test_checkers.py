@@ -0,0 +1,49 @@
+import pytest
+
+from whitelist.checkers import ReloadingCheker
+from whitelist.whitelist_rules import add, remove
+
+
+@pytest.fixture
+def whitelist_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_reloads_after_change(whitelist_dir):
+    """
+    Проверка подхватывает изменения файла без создания новой функции.
+    """
+    add(str(whitelist_dir), ["foo/bar"])
+    access_cheker = ReloadingCheker(str(whitelist_dir), interval=0)
+    assert access_cheker("foo/bar")
+    assert not access_cheker("goo/bat")
+
+    add(str(whitelist_dir), ["goo/bat"])
+    assert access_cheker("goo/bat")
+    remove(str(whitelist_dir), ["foo/bar"])
+    assert not access_cheker("foo/bar")
+
+
+def test_no_reload_without_change(whitelist_dir):
+    """
+    Если файл не менялся, правила не перечитываются.
+    """
+    add(str(whitelist_dir), ["foo/bar"])
+    access_cheker = ReloadingCheker(str(whitelist_dir), interval=0)
+    for _ in range(5):
+        assert access_cheker("foo/bar")
+    assert access_cheker.loads == 1
+
+
+def test_interval_throttles_checks(whitelist_dir):
+    """
+    До истечения интервала файл не проверяется.
+    """
+    add(str(whitelist_dir), ["foo/bar"])
+    access_cheker = ReloadingCheker(str(whitelist_dir), interval=3600)
+    add(str(whitelist_dir), ["goo/bat"])
+    assert not access_cheker("goo/bat")
+    assert access_cheker.refresh()
+    assert access_cheker("goo/bat")
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from whitelist.journal import journal_path
+from whitelist.whitelist_rules import add, cheker, load_rules, remove
+
+
+@pytest.fixture
+def whitelist_file(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_journaled_remove(whitelist_file):
+    """
+    remove с journal=True дописывает запись в журнал, не переписывая файл.
+    """
+    add(str(whitelist_file), ["foo/bar", "foo/bat"])
+    path = str(whitelist_file) + r"\.whitelist.txt"
+    with open(path, "rb") as file:
+        base = file.read()
+
+    remove(str(whitelist_file), ["foo/bar"], journal=True)
+    with open(path, "rb") as file:
+        assert file.read() == base
+    assert set(load_rules(path)) == {"foo/bat"}
+
+    access_cheker = cheker(str(whitelist_file))
+    assert not access_cheker("foo/bar")
+    assert access_cheker("foo/bat")
+
+
+def test_full_save_discards_journal(whitelist_file):
+    """
+    Обычная запись сохраняет все правила и удаляет журнал.
+    """
+    add(str(whitelist_file), ["foo/bar"], journal=True)
+    add(str(whitelist_file), ["goo/bat"])
+    path = str(whitelist_file) + r"\.whitelist.txt"
+    assert not os.path.exists(journal_path(path))
+    assert set(load_rules(path)) == {"foo/bar", "goo/bat"}
@@ -0,0 +1,29 @@
+import threading
+
+import pytest
+
+from whitelist.whitelist_rules import add, load_rules
+
+
+@pytest.fixture
+def whitelist_file(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+@pytest.mark.parametrize("group_window", [None, 0.05])
+def test_concurrent_writers_do_not_lose_updates(whitelist_file, group_window):
+    """
+    Изменения нескольких писателей не теряются.
+    """
+    def writer(i):
+        add(str(whitelist_file), [f"w{i}"], group_window=group_window)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    path = str(whitelist_file) + r"\.whitelist.txt"
+    assert set(load_rules(path)) == {f"w{i}" for i in range(8)}
@@ -0,0 +1,53 @@
+import pytest
+
+from whitelist import metrics
+from whitelist.buckets import RuleBuckets
+from whitelist.metrics import MetricsRegistry
+from whitelist.whitelist_rules import add, cheker
+
+
+@pytest.fixture
+def whitelist_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    previous = metrics.install(registry)
+    yield registry
+    metrics.install(previous)
+
+
+def test_lookup_and_mutation_events(whitelist_dir, registry):
+    """
+    Проверки, чтение, запись и add сообщают о себе событиями.
+    """
+    add(str(whitelist_dir), ["foo/bar"])
+    access_cheker = cheker(str(whitelist_dir))
+    assert access_cheker("foo/bar")
+    assert not access_cheker("goo/bat")
+
+    snapshot = registry.snapshot()
+    counters = snapshot["counters"]
+    assert counters["lookup.allow"] == 1
+    assert counters["lookup.deny"] == 1
+    assert counters["add"] == 1
+    assert counters["save.full"] == 1
+    assert counters["checker_build.index"] == 1
+    assert snapshot["histograms"]["save.bytes"]["total"] == len("foo/bar")
+    assert snapshot["histograms"]["lookup.duration_ns"]["count"] == 2
+
+
+def test_evaluated_counts_patterns():
+    """
+    Число проверенных шаблонов по видам правил.
+    """
+    buckets = RuleBuckets(["foo/bar", "docs/*", "*.log", "src/[ab]/*.py"])
+    assert buckets.evaluated("foo/bar") == 0
+    assert buckets.evaluated("docs/a") == 1
+    assert buckets.evaluated("a.log") == 2
+    assert buckets.evaluated("src/a/x.py") == 2
+    assert buckets.evaluated("other") == 2
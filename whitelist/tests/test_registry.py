@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from whitelist.registry import ChekerRegistry
+from whitelist.whitelist_rules import add
+
+
+@pytest.fixture
+def directories(tmp_path):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"dir{i}")
+        add(path, [f"file{i}", "common/*"])
+        paths.append(path)
+    return paths
+
+
+def test_lru_registry(directories):
+    """
+    Проверки создаются при первом обращении, давно не использованные вытесняются.
+    """
+    registry = ChekerRegistry(max_entries=2)
+    assert registry.allows(directories[0], "file0")
+    assert not registry.allows(directories[0], "file1")
+    assert registry.allows(directories[1], "common/x")
+    registry.get(directories[0])
+    registry.get(directories[2])
+    assert directories[1] not in registry
+    info = registry.info()
+    assert (info.hits, info.misses, info.evictions, info.entries) == (2, 3, 1, 2)
+    assert info.load_ns["count"] == 3
+
+
+def test_single_flight(directories):
+    """
+    Одновременные промахи по одной директории загружают ее один раз.
+    """
+    calls = []
+
+    def slow_weigher(whitelist_file):
+        calls.append(whitelist_file)
+        time.sleep(0.05)
+        return 1
+
+    registry = ChekerRegistry(weigher=slow_weigher)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get(directories[0]))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,40 @@
+import pytest
+
+from whitelist.session import edit
+from whitelist.whitelist_rules import add, cheker, load_rules
+
+
+@pytest.fixture
+def whitelist_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_session_commits_once(whitelist_dir):
+    """
+    Изменения сессии записываются при выходе из блока; проверка из сессии видит их раньше.
+    """
+    path = str(whitelist_dir)
+    add(path, ["foo/bar"])
+    with edit(path) as session:
+        session.add(["goo/bat"])
+        session.remove(["foo/bar"])
+        access_cheker = session.cheker()
+        assert access_cheker("goo/bat")
+        assert not access_cheker("foo/bar")
+        assert cheker(path)("foo/bar")
+    assert load_rules(path + r"\.whitelist.txt") == ["goo/bat"]
+
+
+def test_rollback_on_exception(whitelist_dir):
+    """
+    Исключение в блоке отменяет все изменения сессии.
+    """
+    path = str(whitelist_dir)
+    add(path, ["foo/bar"])
+    with pytest.raises(RuntimeError):
+        with edit(path) as session:
+            session.add(["goo/bat"])
+            raise RuntimeError("provisioning failed")
+    assert load_rules(path + r"\.whitelist.txt") == ["foo/bar"]
@@ -1,5 +1,18 @@
 import os
-import fnmatch
+import time
+
+from whitelist import metrics
+from whitelist.buckets import RuleBuckets
+from whitelist.journal import append_records, discard_journal, journal_path, read_journal, replay
+from whitelist.locking import atomic_write, group_commit, locked
+
+
+# Размер файла, 0 для отсутствующего
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
 
 
 # Функция выгрузки правил
@@ -12,12 +25,23 @@ def load_rules(path: str) -> list[str]:
 
         Правило: путь до файла/директории или glob expression.
 
+        Если рядом есть журнал изменений, его записи применяются к правилам из файла.
+
         Возвращает список с правилами.
     """
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
+    rules = []
     if os.path.exists(path):  # Если путь до файла существует, открывает и читает его
         with open(path, "r", encoding="utf-8") as file:
-            return file.read().strip().splitlines()
-    return []
+            rules = file.read().strip().splitlines()
+    records = read_journal(path)
+    if records:  # Если есть журнал, применяет его записи
+        rules = replay(rules, records)
+    if timing:  # Если включены измерения, сообщает о чтении
+        size = _file_size(path) + _file_size(journal_path(path))
+        metrics.emit("load", duration_ns=time.perf_counter_ns() - start, bytes=size, rules=len(rules))
+    return rules
 
 
 # Функция сохранения правил в whitelist
@@ -30,31 +54,62 @@ def save_rules(path: str, rules: set):
             rules: список правил.
 
         Правило: путь до файла/директории или glob expression.
+        Файл записывается атомарно: читатели видят либо старые, либо новые правила.
 
     """
-    with open(path, "w+", encoding="utf-8") as file:
-        file.write("\n".join(rules))
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
+    data = "\n".join(rules)
+    atomic_write(path, data)
+    # Файл содержит все правила, журнал изменений больше не нужен
+    discard_journal(path)
+    if timing:  # Если включены измерения, сообщает о записи
+        size = len(data.encode("utf-8"))
+        metrics.emit("save", duration_ns=time.perf_counter_ns() - start, bytes=size, rules=len(rules), mode="full")
     return
 
 
-# Функция добавления правил
-def add(path: str, rules: list[str]):
+# Функция сохранения изменений правил в журнал
+def save_changes(path: str, before: set, after: set):
     """
-    Функция добавления правил в файл '.whitelist'.
+    Функция сохранения изменений правил в журнал '.whitelist'.
 
         Args:
-            path: путь до директории с '.whitelist'.
-            rules: список правил.
+            path: путь до файла '.whitelist'.
+            before: правила до изменения.
+            after: правила после изменения.
+
+        В журнал дописываются только добавленные и удаленные правила.
+        Когда журнал превышает пороги, он сворачивается в основной файл.
+    """
+    timing = metrics.sink is not None
+    if timing:
+        start = time.perf_counter_ns()
+        size = _file_size(journal_path(path))
+    compact = append_records(path, before, after)
+    if timing:  # Если включены измерения, сообщает о записи в журнал
+        size = _file_size(journal_path(path)) - size
+        metrics.emit("save", duration_ns=time.perf_counter_ns() - start, bytes=size, rules=len(after), mode="journal")
+    if compact:
+        save_rules(path, after)
+
+
+# Функция добавления правил в памяти
+def add_rules(present_rules: set, rules: list[str]) -> set:
+    """
+    Добавляет правила к набору правил в памяти.
+
+        Args:
+            present_rules: текущие правила.
+            rules: список новых правил.
 
-        Правило: путь до файла/директории или glob expression.
         Если в whitelist был путь foo/bar , а в правилах добавляется foo
         оставляем в правилах только foo .
-
+        Возвращает новый набор правил.
     """
-    whitelist_file = path + r"\.whitelist.txt"
-    present_rules = set(load_rules(whitelist_file))
+    present_rules = set(present_rules)
     new_rules = set()
-    remove_rules = set()
+    rules_to_remove = set()
 
     for rule in rules:
         if not present_rules:
@@ -63,38 +118,104 @@ def add(path: str, rules: list[str]):
             for r in present_rules:
                 if os.path.commonpath([r, rule]) == rule:
                     new_rules.add(rule)
-                    remove_rules.add(r)
+                    rules_to_remove.add(r)
                 if os.path.commonpath([rule, r]) == r:
                     break
                 else:
                     new_rules.add(rule)
 
-    present_rules.difference_update(remove_rules)
+    present_rules.difference_update(rules_to_remove)
     present_rules.update(new_rules)
-    save_rules(whitelist_file, present_rules)
+    return present_rules
+
+
+# Функция удаления правил в памяти
+def remove_rules(present_rules: set, rules: list[str]) -> set:
+    """
+    Удаляет правила из набора правил в памяти.
+
+        Args:
+            present_rules: текущие правила.
+            rules: список удаляемых правил.
+
+        Возвращает новый набор правил.
+    """
+    present_rules = set(present_rules)
+    for rule in rules:
+        present_rules.discard(rule)
+    return present_rules
+
+
+# Функция изменения правил под блокировкой файла
+def _mutate(path: str, op: str, rules: list[str], journal: bool, group_window: float | None):
+    """
+    Загружает правила, применяет операцию и сохраняет результат под блокировкой файла.
+    При group_window операция записывается вместе с операциями других писателей.
+    """
+    whitelist_file = path + r"\.whitelist.txt"
+
+    def commit(ops):
+        before = frozenset(load_rules(whitelist_file))
+        present_rules = before
+        for op_name, op_rules in ops:
+            present_rules = OPERATIONS[op_name](present_rules, op_rules)
+        if journal:
+            save_changes(whitelist_file, before, present_rules)
+        else:
+            save_rules(whitelist_file, present_rules)
+
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
+    if group_window is not None:
+        group_commit(whitelist_file, op, rules, commit, group_window)
+    else:
+        with locked(whitelist_file):
+            commit([(op, rules)])
+    if timing:
+        metrics.emit(op, duration_ns=time.perf_counter_ns() - start, rules=len(rules))
+
+
+# Функция добавления правил
+def add(path: str, rules: list[str], journal: bool = False, group_window: float | None = None):
+    """
+    Функция добавления правил в файл '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            rules: список правил.
+            journal: дописать изменения в журнал вместо перезаписи файла.
+            group_window: включает групповую запись: изменения писателей, пришедшие
+                за group_window секунд, сохраняются одной перезаписью файла.
+
+        Правило: путь до файла/директории или glob expression.
+        Если в whitelist был путь foo/bar , а в правилах добавляется foo
+        оставляем в правилах только foo .
+        Загрузка, изменение и сохранение выполняются под блокировкой файла.
+
+    """
+    _mutate(path, "add", rules, journal, group_window)
     return
 
 
 # Функция удаления правил
-def remove(path: str, rules: list[str]):
+def remove(path: str, rules: list[str], journal: bool = False, group_window: float | None = None):
     """
     Функция удаления правил в файле '.whitelist'.
 
         Args:
             path: путь до директории с '.whitelist'.
             rules: список правил.
+            journal: дописать изменения в журнал вместо перезаписи файла.
+            group_window: включает групповую запись, как в add.
 
         Правило: путь до файла/директории или glob expression.
 
     """
-    whitelist_file = path + r"\.whitelist.txt"
-    present_rules = set(load_rules(whitelist_file))
+    _mutate(path, "remove", rules, journal, group_window)
+    return
 
-    for rule in rules:
-        present_rules.discard(rule)
 
-    save_rules(whitelist_file, present_rules)
-    return
+OPERATIONS = {"add": add_rules, "remove": remove_rules}
 
 
 ##Функция проверки правил
@@ -104,12 +225,32 @@ def cheker(path: str):
 
         Args:
             path: путь до директории с '.whitelist'.
+
+        Проверки сообщают о себе событиями, если включены измерения (см. whitelist.metrics).
     """
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
     whitelist_file = path + r"\.whitelist.txt"
-    present_rules = load_rules(whitelist_file)
+    # правила раскладываются по видам один раз, при создании проверки
+    buckets = RuleBuckets(load_rules(whitelist_file))
+    if timing:
+        metrics.emit("checker_build", duration_ns=time.perf_counter_ns() - start, mode="index")
+    return access_cheker_for(buckets)
+
+
+# Функция проверки по готовым правилам
+def access_cheker_for(buckets: RuleBuckets):
+    """
+    Возвращает функцию для проверки доступа по уже разложенным правилам.
+
+        Args:
+            buckets: правила в RuleBuckets.
+    """
 
     def access_cheker(file_path: str):
-        # через генератор сравнивает по шаблону новое правило и уже существующие правила
-        return any(fnmatch.fnmatch(file_path, rule) for rule in present_rules)
+        # точные пути, префиксы и расширения проверяются без fnmatch
+        if metrics.sink is None:
+            return buckets.match(file_path)
+        return metrics.timed_lookup(buckets.match, file_path, buckets.evaluated)
 
     return access_cheker
@@ -1 +1,6 @@
 from whitelist01.whitelist_rules import add, remove, checker
+from whitelist01.checkers import LiveChecker, ReloadingChecker
+from whitelist01.registry import CheckerRegistry
+from whitelist01.nested import NestedChecker
+from whitelist01.walk import walk_allowed
+from whitelist01.session import edit
@@ -0,0 +1,3 @@
+from whitelist01.cli import main
+
+raise SystemExit(main())
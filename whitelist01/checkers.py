@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+
+from whitelist01 import metrics
+from whitelist01 import whitelist_rules
+from whitelist01.decisions import DecisionCache, rules_version, subscribe, unsubscribe
+from whitelist01.index import RuleIndex
+from whitelist01.journal import journal_path
+from whitelist01.locking import locked
+from whitelist01.overlay import RuleOverlay
+from whitelist01.whitelist_rules import load_rules
+
+
+def file_signature(path: str):
+    """
+    Возвращает признаки версии файла: (mtime в наносекундах, размер, inode).
+    Для отсутствующего файла возвращает None.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ReloadingChecker:
+    """
+    Долгоживущая проверка доступа, которая сама подхватывает изменения '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            interval: как часто (в секундах) проверять, не изменился ли файл.
+            cache_size: хранить до cache_size последних решений по нормализованному
+                пути (0 - без кэша).
+
+    Между проверками файла вызов не делает ввода-вывода. Индекс правил
+    перестраивается, только если изменились mtime, размер или inode файла
+    (или его журнала изменений),
+    и подменяется целиком одним присваиванием.
+    Изменения через add/remove в этом же процессе замечаются по счетчику версий
+    при каждом вызове, не дожидаясь interval, даже если признаки файла
+    не изменились. Кэш решений сбрасывается
+    при каждой перестройке индекса, поэтому ответы из кэша совпадают с индексом.
+    """
+
+    def __init__(self, path: str, interval: float = 1.0, cache_size: int = 0):
+        self.whitelist_file = os.path.join(path, ".whitelist.txt")
+        self.interval = interval
+        self.loads = 0
+        self.cache = DecisionCache(cache_size) if cache_size else None
+        self._lock = threading.Lock()
+        self._signature = None
+        self._version = rules_version(self.whitelist_file)
+        self._seen_version = None
+        self._next_check = 0.0
+        self._index = RuleIndex()
+        self.refresh(force=True)
+
+    def _check(self):
+        # Счетчик версий проверяется на каждом вызове: изменение в этом процессе
+        # видно сразу. Если индекс уже перестраивает другой поток, ждем его
+        if self._version.value != self._seen_version:
+            self._refresh(blocking=True, force=False)
+        elif time.monotonic() >= self._next_check:
+            self.refresh()
+
+    def __call__(self, file_path: str) -> bool:
+        self._check()
+        if metrics.sink is not None:
+            return metrics.timed_lookup(self._allows, file_path, None if self.cache else self._count_patterns)
+        return self._allows(file_path)
+
+    def _allows(self, file_path: str) -> bool:
+        if self.cache is None:
+            return self._index.allows(file_path)
+        return self.cache.lookup(file_path.replace("\\", "/").rstrip("/"), self._decide)
+
+    def _count_patterns(self, file_path: str) -> int:
+        return self._index.evaluated(file_path.replace("\\", "/").rstrip("/"))
+
+    def _decide(self, normalized_path: str) -> bool:
+        index = self._index
+        return index.match(normalized_path) or index.has_descendants(normalized_path)
+
+    def rule_count(self) -> int:
+        """
+        Возвращает число правил, проверив перед этим файл, как при вызове.
+        """
+        self._check()
+        return len(self._index)
+
+    def check_many(self, paths) -> bytearray:
+        """
+        Проверяет доступ сразу для списка путей, см. RuleIndex.check_many.
+        """
+        self._check()
+        if metrics.sink is not None:
+            return metrics.timed_check_many(self._index.check_many, paths)
+        return self._index.check_many(paths)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Проверяет файл и перестраивает индекс, если файл изменился
+        (или правила поменялись через add/remove в этом процессе).
+        Возвращает True, если индекс был перестроен.
+        """
+        # Пока один поток перестраивает индекс, остальные работают со старым
+        return self._refresh(blocking=force, force=force)
+
+    def _refresh(self, blocking: bool, force: bool) -> bool:
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._next_check = time.monotonic() + self.interval
+            # Изменения могут лежать и в журнале рядом с файлом
+            signature = file_signature(self.whitelist_file), file_signature(journal_path(self.whitelist_file))
+            version = self._version.value
+            # Версия ловит изменения, которые не видны по mtime (та же секунда и размер)
+            if signature == self._signature and version == self._seen_version and not force:
+                return False
+            # Признаки снимаются до чтения: если файл изменится во время чтения,
+            # следующая проверка увидит новые признаки и перечитает его
+            timing = metrics.sink is not None
+            start = time.perf_counter_ns() if timing else 0
+            index = RuleIndex(load_rules(self.whitelist_file))
+            if timing:
+                metrics.emit("checker_build", duration_ns=time.perf_counter_ns() - start, mode="reload")
+            self._index = index
+            if self.cache is not None:
+                self.cache.clear()
+            self._signature = signature
+            self._seen_version = version
+            self.loads += 1
+            return True
+        finally:
+            self._lock.release()
+
+
+class LiveChecker:
+    """
+    Долгоживущая проверка доступа, которая получает изменения правил по одному.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+
+    Проверка подписана на изменения правил в этом процессе (add, remove,
+    сессии edit, optimize) и получает только удаленные и добавленные правила.
+    Индекс не меняется после публикации: изменение дает новый RuleOverlay,
+    который делит основной индекс со старым и копирует только небольшое
+    наложение изменений, поэтому публикация не зависит от числа правил
+    (кроме редкого слияния наложения, см. RuleOverlay). Новый индекс
+    подменяет старый одним присваиванием. Проверки не берут блокировок:
+    каждая читает индекс один раз и отвечает целиком по нему, поэтому
+    одну проверку можно делить между потоками, пока правила меняются.
+    Методы add и remove записывают изменения в файл, как функции add и remove,
+    и тем же путем попадают в индекс; их цена - цена записи файла (см. add):
+    без журнала O(числа правил), с journal=True - O(числа изменений).
+    Изменения файла из других процессов не видны до refresh();
+    для них подходит ReloadingChecker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.whitelist_file = os.path.join(path, ".whitelist.txt")
+        self.updates = 0
+        # Блокировка только для писателей: читатели видят опубликованный индекс
+        self._lock = threading.Lock()
+        self._index = None
+        # Подписка до чтения: изменение, записанное после чтения, придет в apply
+        subscribe(self.whitelist_file, self)
+        self.refresh()
+
+    def __call__(self, file_path: str) -> bool:
+        index = self._index
+        if metrics.sink is not None:
+            return metrics.timed_lookup(index.allows, file_path, lambda path: self._count_patterns(index, path))
+        return index.allows(file_path)
+
+    @staticmethod
+    def _count_patterns(index: RuleOverlay, file_path: str) -> int:
+        return index.evaluated(file_path.replace("\\", "/").rstrip("/"))
+
+    def check_many(self, paths) -> bytearray:
+        """
+        Проверяет доступ сразу для списка путей, см. RuleIndex.check_many.
+        Все пути проверяются по одной версии правил.
+        """
+        index = self._index
+        if metrics.sink is not None:
+            return metrics.timed_check_many(index.check_many, paths)
+        return index.check_many(paths)
+
+    def snapshot(self) -> RuleOverlay:
+        """
+        Возвращает текущий индекс; он не меняется, поэтому серия проверок
+        по нему видит одну версию правил. Менять его нельзя.
+        """
+        return self._index
+
+    def add(self, rules: list[str], journal: bool = False):
+        """
+        Добавляет правила в файл (см. add) и в индекс проверки.
+        """
+        whitelist_rules.add(self.path, rules, journal)
+
+    def remove(self, rules: list[str], journal: bool = False):
+        """
+        Удаляет правила из файла (см. remove) и из индекса проверки.
+        """
+        whitelist_rules.remove(self.path, rules, journal)
+
+    def apply(self, removed, added):
+        """
+        Публикует индекс с удаленными и добавленными правилами.
+        """
+        with self._lock:
+            if self._index is None:
+                # Изменение записано до чтения правил, refresh его прочитает
+                return
+            self._index = self._index.changed(removed, added)
+            self.updates += 1
+
+    def refresh(self):
+        """
+        Перечитывает правила из файла целиком.
+        """
+        # Под блокировкой файла между чтением и публикацией не может пройти запись,
+        # иначе ее apply применился бы к старому индексу и потерялся
+        with locked(self.whitelist_file):
+            index = RuleOverlay(RuleIndex(load_rules(self.whitelist_file)))
+            with self._lock:
+                self._index = index
+
+    def close(self):
+        """
+        Отписывает проверку от изменений правил.
+        """
+        unsubscribe(self.whitelist_file, self)
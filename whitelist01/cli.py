@@ -0,0 +1,148 @@
+"""
+Командная строка whitelist01.
+
+    find . -type f | python -m whitelist01 filter /srv/files
+    find . -print0 | python -m whitelist01 filter /srv/files --null --denied
+    python -m whitelist01 add /srv/files rules.txt
+    python -m whitelist01 remove /srv/files - < old_rules.txt
+"""
+
+import argparse
+import os
+import sys
+from itertools import compress
+
+from whitelist01.index import RuleIndex
+from whitelist01.whitelist_rules import add, load_rules, remove
+
+# Сколько байт читается из входа за раз
+CHUNK_SIZE = 1 << 20
+
+# 1 <-> 0 для ответов check_many
+_INVERT = bytes([1, 0]) + bytes(254)
+
+
+def read_records(stream, separator: bytes, chunk_size: int = CHUNK_SIZE):
+    """
+    Читает записи, разделенные separator, пачками.
+
+        Args:
+            stream: двоичный поток.
+            separator: b'\\n' или b'\\0'.
+            chunk_size: сколько байт читать за раз.
+
+        Выдает списки записей (bytes) без разделителей; пустые записи пропускаются.
+        Запись, разрезанная границей чтения, переносится в следующую пачку.
+    """
+    tail = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        records = (tail + chunk).split(separator)
+        tail = records.pop()
+        if b"" in records:
+            # Пустые строки редки: проверка в C дешевле, чем фильтр каждой записи
+            records = [record for record in records if record]
+        if records:
+            yield records
+    if tail:
+        yield [tail]
+
+
+def filter_paths(index: RuleIndex, source, target, separator: bytes = b"\n", denied: bool = False) -> tuple[int, int]:
+    """
+    Пишет в target пути из source, доступ к которым разрешен (или запрещен при denied).
+
+        Пути проверяются пачками через RuleIndex.check_many и выводятся
+        байт в байт, как пришли. Пачка декодируется и нормализуется
+        целиком, а не по одному пути. Возвращает (прочитано путей, выведено путей).
+    """
+    total = 0
+    written = 0
+    text_separator = separator.decode()
+    for records in read_records(source, separator):
+        # Пути в пачке разделены separator, поэтому нормализация всей строки
+        # дает те же пути, что и нормализация каждого
+        text = os.fsdecode(separator.join(records)).replace("\\", "/") + text_separator
+        while "/" + text_separator in text:
+            text = text.replace("/" + text_separator, text_separator)
+        paths = text.split(text_separator)
+        paths.pop()
+        flags = index.check_many(paths, normalized=True)
+        if denied:
+            flags = flags.translate(_INVERT)
+        selected = list(compress(records, flags))
+        total += len(records)
+        written += len(selected)
+        if selected:
+            selected.append(b"")
+            target.write(separator.join(selected))
+    return total, written
+
+
+def _read_rules(source: str, separator: bytes) -> list[str]:
+    stream = sys.stdin.buffer if source == "-" else open(source, "rb")
+    with stream:
+        data = stream.read()
+    # Правила обрезаются так же, как в load_rules: CLI и библиотека пишут одинаковые правила
+    rules = (os.fsdecode(rule).strip() for rule in data.split(separator))
+    return [rule for rule in rules if rule]
+
+
+def _filter(args) -> int:
+    index = RuleIndex(load_rules(os.path.join(args.path, ".whitelist.txt")))
+    separator = b"\0" if args.null else b"\n"
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    with source:
+        try:
+            total, written = filter_paths(index, source, sys.stdout.buffer, separator, args.denied)
+            sys.stdout.buffer.flush()
+        except BrokenPipeError:
+            # Читатель закрыл вывод раньше (например, head): это не ошибка
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0
+    if args.stats:
+        print(f"путей: {total}, выведено: {written}", file=sys.stderr)
+    return 0
+
+
+def _change(args) -> int:
+    rules = _read_rules(args.rules, b"\0" if args.null else b"\n")
+    if args.command == "add":
+        add(args.path, rules, args.journal)
+    else:
+        remove(args.path, rules, args.journal)
+    if args.stats:
+        print(f"правил: {len(rules)}", file=sys.stderr)
+    return 0
+
+
+def _add_common(parser):
+    parser.add_argument("path", help="директория с '.whitelist'")
+    parser.add_argument("-0", "--null", action="store_true", help="записи разделены '\\0', а не переводом строки")
+    parser.add_argument("--stats", action="store_true", help="напечатать счетчики в stderr")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m whitelist01", description="Правила '.whitelist' из командной строки.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    filter_parser = commands.add_parser("filter", help="вывести пути из stdin, доступ к которым разрешен")
+    _add_common(filter_parser)
+    filter_parser.add_argument("--input", default="-", help="файл с путями (по умолчанию stdin)")
+    filter_parser.add_argument("--denied", action="store_true", help="вывести запрещенные пути")
+    filter_parser.set_defaults(handler=_filter)
+
+    for name, text in (("add", "добавить правила"), ("remove", "удалить правила")):
+        change_parser = commands.add_parser(name, help=f"{text} из файла или stdin")
+        _add_common(change_parser)
+        change_parser.add_argument("rules", nargs="?", default="-", help="файл с правилами (по умолчанию stdin)")
+        change_parser.add_argument("--journal", action="store_true", help="дописать изменения в журнал")
+        change_parser.set_defaults(handler=_change)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    return args.handler(args)
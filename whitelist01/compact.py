@@ -0,0 +1,314 @@
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from whitelist01.index import EXACT, GLOB, PREFIX, classify, prune_prefixes
+from whitelist01.matcher import RuleMatcher
+from whitelist01.trie import RuleTrie, split_rule
+
+# Признаки узла
+_TERMINAL = 1
+_GLOBS = 2
+
+
+class CompactRuleIndex:
+    """
+    Неизменяемый индекс правил для очень больших наборов.
+
+        Args:
+            rules: правила '.whitelist'.
+
+    Отвечает так же, как RuleIndex, но хранит правила компактно:
+        сегменты путей хранятся по одному разу и в дереве заменены номерами;
+        дерево сегментов лежит в массивах array: узлы пронумерованы по уровням,
+            дети узла идут подряд и отсортированы по номеру сегмента,
+            поэтому ребенок ищется bisect по массиву, без словаря на узел;
+        точные пути отмечены признаком конца в узле дерева, а не отдельным множеством;
+        сами правила хранятся одной строкой через '\\n' (перевод строки
+            в правиле невозможен) - для путей с переводом строки и для rules();
+        регулярные выражения компилируются только для glob-правил,
+            одно на узел и при первой проверке, дошедшей до узла.
+    Префиксы ('foo/*') и хвосты ('*.log') проверяются без регулярных выражений,
+    как в RuleIndex. Поиск точного пути проходит дерево по сегментам,
+    поэтому он медленнее, чем в RuleIndex, а память меньше в разы.
+    """
+
+    __slots__ = (
+        "_text",
+        "_count",
+        "_segment_ids",
+        "_edges",
+        "_first",
+        "_children",
+        "_flags",
+        "_globs",
+        "_matchers",
+        "_prefixes",
+        "_suffixes",
+        "_full_trie",
+    )
+
+    def __init__(self, rules=()):
+        rules = list(dict.fromkeys(rules))
+        self._text = "\n".join(rules)
+        self._count = len(rules)
+        self._full_trie = None
+        self._matchers = {}
+        segment_ids = self._segment_ids = {}
+        prefixes = []
+        self._suffixes = {}
+        # (номера сегментов, точный путь, глубина узла glob-остатка, остаток)
+        records = []
+        for rule in rules:
+            kind, key = classify(rule)
+            ids = tuple([segment_ids.setdefault(segment, len(segment_ids)) for segment in rule.split("/")])
+            if kind == GLOB:
+                prefix, remainder = split_rule(rule)
+                records.append((ids, False, prefix.count("/"), remainder))
+                continue
+            records.append((ids, kind == EXACT, -1, None))
+            if kind == PREFIX:
+                prefixes.append(key)
+            elif kind != EXACT:
+                suffix = key[0]
+                self._suffixes.setdefault(suffix[suffix.rfind(".") + 1 :], []).append(key)
+        self._prefixes = prune_prefixes(set(prefixes))
+        del rules, prefixes
+        records.sort(key=lambda record: record[0])
+        self._build(records)
+
+    def _build(self, records):
+        # Узлы нумеруются по уровням: на глубине d узел - различный префикс
+        # из d сегментов. Записи отсортированы, поэтому одинаковые префиксы
+        # идут подряд, а дети одного узла - подряд и по возрастанию номера сегмента
+        edges = array("I", [0])
+        first = array("I", [0])
+        children = array("I", [0])
+        flags = bytearray(1)
+        globs = {}
+        node_of = [0] * len(records)
+        for position, (_, _, hang_depth, remainder) in enumerate(records):
+            if hang_depth == 0:
+                globs.setdefault(0, []).append(remainder)
+        active = range(len(records))
+        depth = 0
+        while active:
+            next_active = []
+            previous = None
+            node = 0
+            for position in active:
+                ids, exact, hang_depth, remainder = records[position]
+                parent = node_of[position]
+                key = (parent, ids[depth])
+                if key != previous:
+                    previous = key
+                    node = len(edges)
+                    edges.append(ids[depth])
+                    first.append(0)
+                    children.append(0)
+                    flags.append(0)
+                    if not children[parent]:
+                        first[parent] = node
+                    children[parent] += 1
+                node_of[position] = node
+                if hang_depth == depth + 1:
+                    globs.setdefault(node, []).append(remainder)
+                if len(ids) > depth + 1:
+                    next_active.append(position)
+                elif exact:
+                    flags[node] |= _TERMINAL
+            active = next_active
+            depth += 1
+        for node in globs:
+            flags[node] |= _GLOBS
+        self._edges = edges
+        self._first = first
+        self._children = children
+        self._flags = flags
+        self._globs = {node: tuple(remainders) for node, remainders in globs.items()}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def rules(self) -> list[str]:
+        """
+        Возвращает правила индекса.
+        """
+        return self._text.split("\n") if self._count else []
+
+    def _child(self, node: int, segment: str) -> int:
+        # Номер ребенка узла по сегменту; -1 - нет такого ребенка
+        segment_id = self._segment_ids.get(segment)
+        count = self._children[node]
+        if segment_id is None or not count:
+            return -1
+        lo = self._first[node]
+        i = bisect_left(self._edges, segment_id, lo, lo + count)
+        return i if i < lo + count and self._edges[i] == segment_id else -1
+
+    def _matcher(self, node: int) -> RuleMatcher:
+        matcher = self._matchers.get(node)
+        if matcher is None:
+            matcher = self._matchers[node] = RuleMatcher(self._globs[node])
+        return matcher
+
+    def _match_prefix(self, path: str) -> bool:
+        prefixes = self._prefixes
+        if not prefixes:
+            return False
+        i = bisect_right(prefixes, path)
+        return i > 0 and path.startswith(prefixes[i - 1])
+
+    def _match_suffix(self, path: str) -> bool:
+        if not self._suffixes:
+            return False
+        bucket = self._suffixes.get(path[path.rfind(".") + 1 :])
+        if bucket:
+            for suffix, need_slash in bucket:
+                if path.endswith(suffix) and (not need_slash or "/" in path[: len(path) - len(suffix)]):
+                    return True
+        return False
+
+    def _walk(self, path: str, descendants: bool) -> bool:
+        # Один проход по дереву: glob-правила в узлах по пути, точный путь в конце
+        # и, при descendants, правила внутри пути
+        # Поиск ребенка (_child) встроен: это самый частый шаг проверки
+        segment_ids = self._segment_ids
+        edges = self._edges
+        first = self._first
+        children = self._children
+        flags = self._flags
+        node = 0
+        start = 0
+        while True:
+            if flags[node] & _GLOBS and self._matcher(node).match(path[start:]):
+                return True
+            count = children[node]
+            if not count:
+                return False
+            slash = path.find("/", start)
+            segment_id = segment_ids.get(path[start:] if slash < 0 else path[start:slash])
+            if segment_id is None:
+                return False
+            lo = first[node]
+            node = bisect_left(edges, segment_id, lo, lo + count)
+            if node == lo + count or edges[node] != segment_id:
+                return False
+            if slash < 0:
+                return bool(flags[node] & _TERMINAL) or (descendants and children[node] > 0)
+            start = slash + 1
+
+    def _full(self) -> RuleTrie:
+        # '.' в выражении не пропускает перевод строки, а '$' допускает его в конце:
+        # такие строки проверяются деревом со всеми правилами, как в RuleIndex
+        if self._full_trie is None:
+            self._full_trie = RuleTrie(self.rules())
+        return self._full_trie
+
+    def match(self, path: str) -> bool:
+        """
+        Проверяет, подходит ли строка под какое-либо правило.
+        """
+        if "\n" in path:
+            return self._full().match(path)
+        return self._match_prefix(path) or self._match_suffix(path) or self._walk(path, False)
+
+    def _node(self, path: str) -> int:
+        # Узел всего пути; -1 - такого пути в дереве нет
+        node = 0
+        for segment in path.split("/"):
+            node = self._child(node, segment)
+            if node < 0:
+                break
+        return node
+
+    def has_descendants(self, path: str) -> bool:
+        """
+        Проверяет, есть ли правило, начинающееся с path + '/'.
+        """
+        node = self._node(path)
+        return node >= 0 and self._children[node] > 0
+
+    def _allows(self, normalized_path: str) -> bool:
+        if "\n" in normalized_path:
+            return self._full().match(normalized_path) or self.has_descendants(normalized_path)
+        return (
+            self._match_prefix(normalized_path)
+            or self._match_suffix(normalized_path)
+            or self._walk(normalized_path, True)
+        )
+
+    def allows(self, file_path: str) -> bool:
+        """
+        Проверка доступа к файлу/директории, как в access_checker.
+        """
+        return self._allows(file_path.replace("\\", "/").rstrip("/"))
+
+    def evaluated(self, path: str) -> int:
+        """
+        Считает шаблоны, которые проверяет match(path), см. RuleIndex.evaluated.
+        """
+        if "\n" in path:
+            return self._full().evaluated(path)
+        node = self._node(path)
+        if node >= 0 and self._flags[node] & _TERMINAL:
+            return 0
+        count = 0
+        if self._prefixes:
+            count += 1
+            if self._match_prefix(path):
+                return count
+        bucket = self._suffixes.get(path[path.rfind(".") + 1 :]) if self._suffixes else None
+        for suffix, need_slash in bucket or ():
+            count += 1
+            if path.endswith(suffix) and (not need_slash or "/" in path[: len(path) - len(suffix)]):
+                return count
+        node = 0
+        start = 0
+        while node >= 0:
+            if self._flags[node] & _GLOBS:
+                count += len(self._globs[node])
+                if self._matcher(node).match(path[start:]):
+                    return count
+            slash = path.find("/", start)
+            if slash < 0:
+                break
+            node = self._child(node, path[start:slash])
+            start = slash + 1
+        return count
+
+    def check_many(self, paths, normalized: bool = False) -> bytearray:
+        """
+        Проверяет доступ сразу для списка путей, см. RuleIndex.check_many.
+        """
+        if hasattr(paths, "tolist"):
+            paths = paths.tolist()
+        if not normalized:
+            paths = [os.fsdecode(path).replace("\\", "/").rstrip("/") for path in paths]
+        return bytearray(map(self._allows, paths))
+
+    def memory_usage(self) -> dict:
+        """
+        Оценивает память индекса по частям, в байтах: строка правил, таблица
+        сегментов, массивы дерева, префиксы и хвосты, glob-остатки.
+        Скомпилированные выражения и дерево для путей с переводом строки не учитываются.
+        """
+        segments = sys.getsizeof(self._segment_ids) + sum(map(sys.getsizeof, self._segment_ids))
+        nodes = sum(sys.getsizeof(table) for table in (self._edges, self._first, self._children, self._flags))
+        prefixes = sys.getsizeof(self._prefixes) + sum(map(sys.getsizeof, self._prefixes))
+        prefixes += sys.getsizeof(self._suffixes) + sum(
+            sys.getsizeof(bucket) + sum(sys.getsizeof(suffix) for suffix, _ in bucket) for bucket in self._suffixes.values()
+        )
+        globs = sys.getsizeof(self._globs) + sum(
+            sys.getsizeof(remainders) + sum(map(sys.getsizeof, remainders)) for remainders in self._globs.values()
+        )
+        usage = {
+            "text": sys.getsizeof(self._text),
+            "segments": segments,
+            "nodes": nodes,
+            "prefixes": prefixes,
+            "globs": globs,
+        }
+        usage["total"] = sum(usage.values())
+        return usage
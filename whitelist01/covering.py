@@ -0,0 +1,149 @@
+from bisect import bisect_left, insort
+
+from whitelist01.globcache import compile_glob
+from whitelist01.index import EXACT, PREFIX, SUFFIX, classify, prefix_range_end
+from whitelist01.trie import literal_prefix, split_rule
+
+
+class CoverIndex:
+    """
+    Набор правил для вопросов "покрыто ли правило?" и "что покрывает правило?".
+
+    Покрытие понимается так же, как в rule_covers: выражение правила совпадает
+    со строкой другого правила. Выражения берутся из общего кэша шаблонов при добавлении,
+    а проверка идет только по правилам-кандидатам:
+        covers - по видам правил и префиксам директорий строки;
+        covered_by - по отсортированному списку правил с общим буквальным префиксом.
+    """
+
+    __slots__ = ("_rules", "_sorted", "_exact", "_prefixes", "_prefix_lengths", "_suffixes", "_globs")
+
+    def __init__(self, rules=()):
+        self._rules = {}
+        self._sorted = []
+        self._exact = set()
+        self._prefixes = {}
+        self._prefix_lengths = {}
+        self._suffixes = {}
+        self._globs = {}
+        for rule in rules:
+            if rule not in self._rules:
+                self._insert(rule)
+        self._sorted = sorted(self._rules)
+
+    def __contains__(self, rule: str) -> bool:
+        return rule in self._rules
+
+    def __iter__(self):
+        return iter(self._rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def add(self, rule: str):
+        """
+        Добавляет правило в индекс.
+        """
+        if rule in self._rules:
+            return
+        self._insert(rule)
+        insort(self._sorted, rule)
+
+    def _insert(self, rule: str):
+        kind, key = classify(rule)
+        self._rules[rule] = (kind, key)
+        if kind == EXACT:
+            self._exact.add(rule)
+        elif kind == PREFIX:
+            # Разные правила ('foo/*' и 'foo/**') дают один префикс
+            self._prefixes[key] = self._prefixes.get(key, 0) + 1
+            if self._prefixes[key] == 1:
+                self._prefix_lengths[len(key)] = self._prefix_lengths.get(len(key), 0) + 1
+        elif kind == SUFFIX:
+            suffixes = self._suffixes.setdefault(key[0][key[0].rfind(".") + 1 :], {})
+            suffixes[key] = suffixes.get(key, 0) + 1
+        else:
+            pattern = compile_glob(rule)
+            self._globs.setdefault(split_rule(rule)[0], {})[rule] = pattern
+
+    def discard(self, rule: str):
+        """
+        Удаляет правило из индекса, если оно там есть.
+        """
+        kind_key = self._rules.pop(rule, None)
+        if kind_key is None:
+            return
+        kind, key = kind_key
+        del self._sorted[bisect_left(self._sorted, rule)]
+        if kind == EXACT:
+            self._exact.discard(rule)
+        elif kind == PREFIX:
+            self._prefixes[key] -= 1
+            if not self._prefixes[key]:
+                del self._prefixes[key]
+                self._prefix_lengths[len(key)] -= 1
+                if not self._prefix_lengths[len(key)]:
+                    del self._prefix_lengths[len(key)]
+        elif kind == SUFFIX:
+            ext = key[0][key[0].rfind(".") + 1 :]
+            suffixes = self._suffixes[ext]
+            suffixes[key] -= 1
+            if not suffixes[key]:
+                del suffixes[key]
+                if not suffixes:
+                    del self._suffixes[ext]
+        else:
+            prefix = split_rule(rule)[0]
+            globs = self._globs[prefix]
+            del globs[rule]
+            if not globs:
+                del self._globs[prefix]
+
+    def covers(self, rule: str) -> bool:
+        """
+        Проверяет, покрывает ли какое-либо правило индекса строку rule.
+        """
+        if rule in self._exact:
+            return True
+        for length in self._prefix_lengths:
+            if rule[:length] in self._prefixes:
+                return True
+        if self._suffixes:
+            suffixes = self._suffixes.get(rule[rule.rfind(".") + 1 :])
+            if suffixes:
+                for suffix, need_slash in suffixes:
+                    if rule.endswith(suffix) and (not need_slash or "/" in rule[: len(rule) - len(suffix)]):
+                        return True
+        if self._globs:
+            start = 0
+            while True:
+                globs = self._globs.get(rule[:start])
+                if globs and any(pattern.match(rule) for pattern in globs.values()):
+                    return True
+                slash = rule.find("/", start)
+                if slash < 0:
+                    return False
+                start = slash + 1
+        return False
+
+    def starting_with(self, prefix: str) -> list[str]:
+        """
+        Возвращает правила индекса, начинающиеся с prefix, в порядке сортировки.
+        """
+        return self._sorted[bisect_left(self._sorted, prefix) : prefix_range_end(self._sorted, prefix)]
+
+    def covered_by(self, rule: str) -> set[str]:
+        """
+        Возвращает правила индекса, которые покрывает правило rule.
+        """
+        prefix = literal_prefix(rule)
+        candidates = self._sorted[bisect_left(self._sorted, prefix) : prefix_range_end(self._sorted, prefix)]
+        if not candidates:
+            return set()
+        kind = classify(rule)[0]
+        if kind == EXACT:
+            return {rule} if rule in self._rules else set()
+        if kind == PREFIX:
+            return set(candidates)
+        pattern = compile_glob(rule)
+        return set(filter(pattern.match, candidates))
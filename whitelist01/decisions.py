@@ -0,0 +1,168 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from whitelist01.globcache import CacheInfo
+
+# Размер кэша решений по умолчанию
+DEFAULT_MAXSIZE = 4096
+
+
+class RulesVersion:
+    """
+    Счетчик изменений правил одного файла '.whitelist' в этом процессе.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+_versions = {}
+_versions_lock = threading.Lock()
+_subscribers = {}
+
+
+def rules_version(whitelist_file: str) -> RulesVersion:
+    """
+    Возвращает общий для процесса счетчик изменений правил файла.
+    add и remove увеличивают его после каждой записи.
+    """
+    key = os.path.abspath(whitelist_file)
+    with _versions_lock:
+        version = _versions.get(key)
+        if version is None:
+            version = _versions[key] = RulesVersion()
+        return version
+
+
+def bump_rules_version(whitelist_file: str):
+    """
+    Отмечает, что правила файла изменились.
+    """
+    version = rules_version(whitelist_file)
+    with _versions_lock:
+        version.value += 1
+
+
+def subscribe(whitelist_file: str, subscriber):
+    """
+    Подписывает объект на изменения правил файла в этом процессе.
+
+        Args:
+            whitelist_file: путь до файла '.whitelist'.
+            subscriber: объект с методом apply(removed, added); хранится по слабой ссылке.
+    """
+    key = os.path.abspath(whitelist_file)
+    with _versions_lock:
+        _subscribers.setdefault(key, weakref.WeakSet()).add(subscriber)
+
+
+def unsubscribe(whitelist_file: str, subscriber):
+    key = os.path.abspath(whitelist_file)
+    with _versions_lock:
+        subscribers = _subscribers.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+
+
+def rules_changed(whitelist_file: str, before, after):
+    """
+    Сообщает об изменении правил файла: увеличивает версию и передает
+    подписчикам удаленные и добавленные правила.
+
+        Args:
+            whitelist_file: путь до файла '.whitelist'.
+            before: правила до изменения.
+            after: правила после изменения.
+
+        Вызывается под блокировкой файла, поэтому подписчики получают
+        изменения в том же порядке, в каком они записаны.
+    """
+    subscribers = _bump_and_subscribers(whitelist_file)
+    if not subscribers:
+        return
+    before = frozenset(before)
+    after = frozenset(after)
+    removed = before - after
+    added = after - before
+    for subscriber in subscribers:
+        subscriber.apply(removed, added)
+
+
+def rules_applied(whitelist_file: str, removed, added):
+    """
+    То же, что rules_changed, но по уже известной разнице: удаленным
+    и добавленным правилам. Не требует полных наборов правил.
+    """
+    subscribers = _bump_and_subscribers(whitelist_file)
+    if not subscribers:
+        return
+    removed = frozenset(removed)
+    added = frozenset(added)
+    for subscriber in subscribers:
+        subscriber.apply(removed, added)
+
+
+def _bump_and_subscribers(whitelist_file: str) -> list:
+    bump_rules_version(whitelist_file)
+    with _versions_lock:
+        return list(_subscribers.get(os.path.abspath(whitelist_file), ()))
+
+
+class DecisionCache:
+    """
+    Кэш решений о доступе по нормализованному пути с вытеснением давно не использованных (LRU).
+
+        Args:
+            maxsize: сколько решений хранить.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self._decisions = OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, normalized_path: str, decide) -> bool:
+        """
+        Возвращает решение из кэша или вычисляет его через decide(normalized_path).
+        """
+        with self._lock:
+            allowed = self._decisions.get(normalized_path)
+            if allowed is not None:
+                self._decisions.move_to_end(normalized_path)
+                self.hits += 1
+                return allowed
+            self.misses += 1
+            generation = self._generation
+        allowed = decide(normalized_path)
+        with self._lock:
+            # Решение, посчитанное по правилам до clear(), в кэш не попадает
+            if generation != self._generation:
+                return allowed
+            self._decisions[normalized_path] = allowed
+            while len(self._decisions) > self._maxsize:
+                self._decisions.popitem(last=False)
+                self.evictions += 1
+        return allowed
+
+    def clear(self):
+        """
+        Сбрасывает все решения (например, после изменения правил); статистика сохраняется.
+        """
+        with self._lock:
+            self._decisions.clear()
+            self._generation += 1
+
+    def info(self) -> CacheInfo:
+        """
+        Возвращает статистику кэша.
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self._maxsize, len(self._decisions))
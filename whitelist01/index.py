@@ -0,0 +1,429 @@
+import os
+from bisect import bisect_left, bisect_right, insort
+
+from whitelist01.trie import WILDCARDS, RuleTrie, literal_prefix
+
+# Виды правил
+EXACT = "exact"
+PREFIX = "prefix"
+SUFFIX = "suffix"
+GLOB = "glob"
+
+
+def classify(rule: str) -> tuple[str, object]:
+    """
+    Определяет вид правила.
+
+        Args:
+            rule: glob-правило.
+
+        Возвращает пару (вид, ключ):
+            (EXACT, rule) - путь без wildcard: 'foo/bar';
+            (PREFIX, 'foo/') - буквальный префикс и звездочки в конце: 'foo/*', 'foo/**';
+            (SUFFIX, ('.log', True)) - звездочки и буквальный хвост: '*.log', '**/*.log';
+                второй элемент ключа - нужен ли '/' перед хвостом;
+            (GLOB, rule) - все остальное, проверяется регулярным выражением.
+    """
+    if not any(c in rule for c in WILDCARDS):
+        return EXACT, rule
+    literal = rule.rstrip("*")
+    if not any(c in literal for c in WILDCARDS):
+        return PREFIX, literal
+    if rule.startswith("*"):
+        rest = rule.lstrip("*")
+        need_slash = False
+        if rest.startswith("/*"):
+            rest = rest[1:].lstrip("*")
+            need_slash = True
+        dot = rest.rfind(".")
+        if rest and dot >= 0 and "/" not in rest[dot:] and not any(c in rest for c in WILDCARDS):
+            return SUFFIX, (rest, need_slash)
+    return GLOB, rule
+
+
+def prune_prefixes(prefixes) -> list[str]:
+    """
+    Оставляет отсортированные префиксы, ни один из которых не начинается с другого.
+    В таком списке путь может начинаться только с ближайшего слева от него префикса.
+    """
+    pruned = []
+    for prefix in sorted(prefixes):
+        if not pruned or not prefix.startswith(pruned[-1]):
+            pruned.append(prefix)
+    return pruned
+
+
+def prefix_range_end(items: list[str], prefix: str) -> int:
+    """
+    Возвращает конец диапазона строк с префиксом prefix в отсортированном списке.
+    Такие строки идут подряд, начиная с bisect_left(items, prefix).
+    """
+    while prefix and prefix[-1] == "\U0010ffff":
+        prefix = prefix[:-1]
+    if not prefix:
+        return len(items)
+    return bisect_left(items, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+class RuleIndex:
+    """
+    Правила, разложенные по видам при загрузке.
+
+    Точные пути лежат в множестве, префиксы - в отсортированном списке,
+    хвосты - в словаре по расширению. Регулярные выражения нужны только
+    оставшимся glob-правилам, они проверяются по дереву сегментов.
+    Ответы совпадают с перебором glob_to_regex по всем правилам.
+    Правила можно добавлять и удалять по одному (add_rule, discard_rule)
+    без перестройки всего индекса.
+    """
+
+    __slots__ = (
+        "_rules",
+        "_exact",
+        "_prefixes",
+        "_prefix_counts",
+        "_all_prefixes",
+        "_suffixes",
+        "_trie",
+        "_full_trie",
+        "_literals",
+    )
+
+    def __init__(self, rules=()):
+        self._rules = dict.fromkeys(rules)
+        self._exact = set()
+        self._suffixes = {}
+        self._trie = RuleTrie()
+        self._full_trie = None
+        self._literals = None
+        # Сколько правил дает каждый префикс ('foo/*' и 'foo/**' дают 'foo/')
+        self._prefix_counts = {}
+        for rule in self._rules:
+            kind, key = classify(rule)
+            if kind == GLOB:
+                self._trie.insert(rule)
+                continue
+            self._trie.insert_path(rule)
+            if kind == EXACT:
+                self._exact.add(rule)
+            elif kind == PREFIX:
+                self._prefix_counts[key] = self._prefix_counts.get(key, 0) + 1
+            else:
+                suffix = key[0]
+                self._suffixes.setdefault(suffix[suffix.rfind(".") + 1 :], []).append(key)
+        self._all_prefixes = sorted(self._prefix_counts)
+        self._prefixes = prune_prefixes(self._all_prefixes)
+
+    def __contains__(self, rule: str) -> bool:
+        return rule in self._rules
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __iter__(self):
+        return iter(self._rules)
+
+    def copy(self) -> "RuleIndex":
+        """
+        Возвращает копию индекса для изменения через add_rule и discard_rule.
+
+            Множества, словари и списки копируются целиком, то есть копия
+            стоит O(числа правил); дерево - только по путям измененных правил
+            (см. RuleTrie.copy), скомпилированные выражения остальных узлов
+            остаются общими. Оригинал при этом не меняется.
+            Для частых мелких изменений см. RuleOverlay.
+        """
+        index = RuleIndex.__new__(RuleIndex)
+        index._rules = dict(self._rules)
+        index._exact = set(self._exact)
+        index._prefix_counts = dict(self._prefix_counts)
+        index._all_prefixes = list(self._all_prefixes)
+        index._prefixes = list(self._prefixes)
+        index._suffixes = {ext: list(bucket) for ext, bucket in self._suffixes.items()}
+        index._trie = self._trie.copy()
+        index._full_trie = None
+        index._literals = None
+        return index
+
+    def add_rule(self, rule: str):
+        """
+        Добавляет одно правило.
+
+            Меняются только структуры вида правила: множество точных путей,
+            корзина расширения, соседние префиксы или узлы дерева правила.
+        """
+        if rule in self._rules:
+            return
+        self._rules[rule] = None
+        self._full_trie = None
+        self._literals = None
+        kind, key = classify(rule)
+        if kind == GLOB:
+            self._trie.insert(rule)
+            return
+        self._trie.insert_path(rule)
+        if kind == EXACT:
+            self._exact.add(rule)
+        elif kind == PREFIX:
+            count = self._prefix_counts.get(key, 0)
+            self._prefix_counts[key] = count + 1
+            if count:
+                return
+            insort(self._all_prefixes, key)
+            prefixes = self._prefixes
+            if self._match_prefix(key, prefixes):
+                return
+            # Новый префикс закрывает более длинные префиксы, начинающиеся с него
+            start = bisect_left(prefixes, key)
+            prefixes[start : prefix_range_end(prefixes, key)] = [key]
+        else:
+            suffix = key[0]
+            self._suffixes.setdefault(suffix[suffix.rfind(".") + 1 :], []).append(key)
+
+    def discard_rule(self, rule: str):
+        """
+        Удаляет одно правило, если оно есть; см. add_rule.
+        """
+        if rule not in self._rules:
+            return
+        del self._rules[rule]
+        self._full_trie = None
+        self._literals = None
+        kind, key = classify(rule)
+        if kind == GLOB:
+            self._trie.remove(rule)
+            return
+        self._trie.remove(rule, path_only=True)
+        if kind == EXACT:
+            self._exact.discard(rule)
+        elif kind == PREFIX:
+            count = self._prefix_counts.pop(key) - 1
+            if count:
+                self._prefix_counts[key] = count
+                return
+            all_prefixes = self._all_prefixes
+            del all_prefixes[bisect_left(all_prefixes, key)]
+            prefixes = self._prefixes
+            i = bisect_left(prefixes, key)
+            if i == len(prefixes) or prefixes[i] != key:
+                return
+            # Префиксы, которые закрывал удаленный, снова нужны
+            shadowed = all_prefixes[bisect_left(all_prefixes, key) : prefix_range_end(all_prefixes, key)]
+            prefixes[i : i + 1] = prune_prefixes(shadowed)
+        else:
+            suffix = key[0]
+            ext = suffix[suffix.rfind(".") + 1 :]
+            bucket = self._suffixes[ext]
+            bucket.remove(key)
+            if not bucket:
+                del self._suffixes[ext]
+
+    def match(self, path: str) -> bool:
+        """
+        Проверяет, подходит ли строка под какое-либо правило.
+        """
+        if "\n" in path:
+            return self._match_newline(path)
+        return (
+            path in self._exact
+            or self._match_prefix(path, self._prefixes)
+            or self._match_suffix(path)
+            or self._trie.match(path)
+        )
+
+    @staticmethod
+    def _match_prefix(path: str, prefixes: list[str]) -> bool:
+        # В списке без вложенных префиксов путь может начинаться только с ближайшего слева
+        if not prefixes:
+            return False
+        i = bisect_right(prefixes, path)
+        return i > 0 and path.startswith(prefixes[i - 1])
+
+    def _match_suffix(self, path: str) -> bool:
+        if not self._suffixes:
+            return False
+        bucket = self._suffixes.get(path[path.rfind(".") + 1 :])
+        if bucket:
+            for suffix, need_slash in bucket:
+                if path.endswith(suffix) and (not need_slash or "/" in path[: len(path) - len(suffix)]):
+                    return True
+        return False
+
+    def _full(self) -> RuleTrie:
+        # '.' в выражении не пропускает перевод строки, а '$' допускает его в конце:
+        # такие строки проверяются деревом со всеми правилами
+        if self._full_trie is None:
+            self._full_trie = RuleTrie(self._rules)
+        return self._full_trie
+
+    def _match_newline(self, path: str) -> bool:
+        return self._full().match(path)
+
+    def _count_suffixes(self, path: str) -> int:
+        # Сколько хвостовых правил подходит под путь
+        bucket = self._suffixes.get(path[path.rfind(".") + 1 :]) if self._suffixes else None
+        count = 0
+        for suffix, need_slash in bucket or ():
+            if path.endswith(suffix) and (not need_slash or "/" in path[: len(path) - len(suffix)]):
+                count += 1
+        return count
+
+    def match_except(self, path: str, removed: "RuleIndex", masked: dict) -> bool:
+        """
+        Проверяет match(path) по правилам индекса без правил removed.
+
+            Args:
+                path: нормализованный путь.
+                removed: индекс части правил этого индекса.
+                masked: кэш выражений для RuleTrie.match_except.
+
+            Каждый вид правил проверяется отдельно: точный путь - по множеству,
+            префиксы и хвосты - сравнением числа подходящих правил индекса
+            и removed, glob-правила - выражениями узлов без остатков removed.
+        """
+        if not removed._rules:
+            return self.match(path)
+        if "\n" in path:
+            return self._full().match_except(path, removed._full(), masked)
+        if path in self._exact and path not in removed._rules:
+            return True
+        if self._match_prefix(path, self._prefixes):
+            if not removed._match_prefix(path, removed._prefixes):
+                return True
+            # Префикс правила - начало пути; правила removed есть и в индексе
+            counts = self._prefix_counts
+            removed_counts = removed._prefix_counts
+            for end in range(len(path) + 1):
+                key = path[:end]
+                if counts.get(key, 0) > removed_counts.get(key, 0):
+                    return True
+        if self._suffixes and self._count_suffixes(path) > removed._count_suffixes(path):
+            return True
+        return self._trie.match_except(path, removed._trie, masked)
+
+    def has_descendants_except(self, path: str, removed: "RuleIndex") -> bool:
+        """
+        Проверяет has_descendants(path) по правилам индекса без правил removed.
+        """
+        below = self._trie.path_count(path) - (path in self._rules)
+        return below > 0 and below > removed._trie.path_count(path) - (path in removed._rules)
+
+    def has_descendants(self, path: str) -> bool:
+        """
+        Проверяет, есть ли правило, начинающееся с path + '/'.
+        """
+        return self._trie.has_descendants(path)
+
+    def evaluated(self, path: str) -> int:
+        """
+        Считает шаблоны, которые проверяет match(path).
+
+        Точное совпадение шаблонов не требует, ближайший префикс считается
+        одним шаблоном, хвосты - по одному из корзины расширения,
+        glob-правила - по RuleTrie.evaluated.
+        """
+        if "\n" in path:
+            return self._full().evaluated(path)
+        if path in self._exact:
+            return 0
+        count = 0
+        if self._prefixes:
+            count += 1
+            if self._match_prefix(path, self._prefixes):
+                return count
+        bucket = self._suffixes.get(path[path.rfind(".") + 1 :]) if self._suffixes else None
+        for suffix, need_slash in bucket or ():
+            count += 1
+            if path.endswith(suffix) and (not need_slash or "/" in path[: len(path) - len(suffix)]):
+                return count
+        return count + self._trie.evaluated(path)
+
+    def allows(self, file_path: str) -> bool:
+        """
+        Проверка доступа к файлу/директории, как в access_checker.
+        """
+        normalized_path = file_path.replace("\\", "/").rstrip("/")
+        # Путь подходит под правило или является родительским для разрешённого пути
+        return self.match(normalized_path) or self.has_descendants(normalized_path)
+
+    def may_contain(self, directory: str) -> bool:
+        """
+        Проверяет, может ли хоть одно правило разрешить путь внутри директории.
+
+            Args:
+                directory: нормализованный путь директории.
+
+            Путь внутри директории начинается с directory + '/'. Правило может его
+            разрешить, только если буквальная часть правила до первого wildcard
+            начинается с directory + '/' или сама является началом этой строки.
+        """
+        if self._literals is None:
+            literals = sorted({literal_prefix(rule) for rule in self._rules})
+            self._literals = literals, prune_prefixes(literals)
+        literals, roots = self._literals
+        head = directory + "/"
+        i = bisect_left(literals, head)
+        if i < len(literals) and literals[i].startswith(head):
+            return True
+        return self._match_prefix(head, roots)
+
+    def check_many(self, paths, normalized: bool = False) -> bytearray:
+        """
+        Проверяет доступ сразу для списка путей.
+
+            Args:
+                paths: пути (str или bytes) - список или массив строк NumPy.
+                normalized: пути уже нормализованы - строки str без '\\'
+                    и завершающего '/'; тогда они не копируются.
+
+            Возвращает bytearray той же длины: 1 - доступ разрешен, 0 - запрещен
+            (для NumPy: numpy.frombuffer(result, dtype=bool)).
+            Пути группируются по директории: дерево сегментов и префиксы
+            разбираются один раз на директорию, а не на каждый путь.
+        """
+        if hasattr(paths, "tolist"):
+            paths = paths.tolist()
+        if normalized:
+            normalized_paths = paths
+        else:
+            normalized_paths = [os.fsdecode(path).replace("\\", "/").rstrip("/") for path in paths]
+        result = bytearray(len(normalized_paths))
+        directories = {}
+        for i, normalized_path in enumerate(normalized_paths):
+            if "\n" in normalized_path:
+                result[i] = self.match(normalized_path) or self.has_descendants(normalized_path)
+                continue
+            directory, slash, name = normalized_path.rpartition("/")
+            key = directory if slash else None
+            try:
+                view = directories[key]
+            except KeyError:
+                view = directories[key] = self._directory_view(key)
+            result[i] = view is None or self._check_in_directory(view, normalized_path, name)
+        return result
+
+    def _directory_view(self, directory: str | None):
+        # Все, что для файлов директории можно вычислить один раз.
+        # None - директорию целиком покрывает префиксное правило
+        head = "" if directory is None else directory + "/"
+        prefixes = self._prefixes
+        i = bisect_right(prefixes, head)
+        if i and head.startswith(prefixes[i - 1]):
+            return None
+        # Остальные подходящие префиксы длиннее head и начинаются с него
+        candidates = prefixes[i : prefix_range_end(prefixes, head)]
+        node, globs = self._trie.directory(directory)
+        return candidates, node, globs
+
+    def _check_in_directory(self, view, path: str, name: str) -> bool:
+        candidates, node, globs = view
+        if path in self._exact or self._match_prefix(path, candidates) or self._match_suffix(path):
+            return True
+        for matcher, offset in globs:
+            if matcher.match(path[offset:]):
+                return True
+        if node is None:
+            return False
+        child = node.children.get(name)
+        # Точное правило или путь - родитель разрешенного пути
+        return child is not None and (child.terminal or bool(child.children))
@@ -0,0 +1,173 @@
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Файл блокировки и очередь групповой записи лежат рядом с файлом '.whitelist'
+LOCK_SUFFIX = ".lock"
+PENDING_SUFFIX = ".pending"
+
+
+class _Holder:
+    # Блокировка файла внутри процесса: потоки ждут друг друга на lock,
+    # повторный вход того же потока только увеличивает depth
+    __slots__ = ("lock", "depth", "users")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.users = 0
+
+
+_holders = {}
+_holders_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def locked(path: str):
+    """
+    Эксклюзивная рекомендательная блокировка файла для нескольких процессов.
+
+        Args:
+            path: путь до защищаемого файла; блокируется файл path + '.lock'.
+
+        Блокировка повторно входима внутри потока: вложенный locked того же
+        файла (например, LiveChecker внутри сессии edit) не ждет сам себя.
+        Файл блокируется только на внешнем уровне; другие потоки процесса
+        ждут, пока поток-владелец не выйдет из внешнего уровня.
+    """
+    key = os.path.abspath(path)
+    with _holders_lock:
+        holder = _holders.get(key)
+        if holder is None:
+            holder = _holders[key] = _Holder()
+        holder.users += 1
+    try:
+        with holder.lock:
+            holder.depth += 1
+            try:
+                if holder.depth == 1:
+                    with _file_lock(path):
+                        yield
+                else:
+                    yield
+            finally:
+                holder.depth -= 1
+    finally:
+        with _holders_lock:
+            holder.users -= 1
+            if not holder.users:
+                del _holders[key]
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    with open(path + LOCK_SUFFIX, "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK сдается после 10 попыток, ждем дальше
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path: str, data: str | bytes):
+    """
+    Записывает файл целиком через временный файл и переименование.
+
+        Args:
+            path: путь до файла.
+            data: новое содержимое (str или bytes).
+
+        Читатель видит либо старое, либо новое содержимое, но не обрезанный файл.
+    """
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        if isinstance(data, bytes):
+            file = open(temp_path, "xb")
+        else:
+            file = open(temp_path, "x", encoding="utf-8")
+        with file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+
+
+def group_commit(path: str, op: str, rules: list[str], commit, window: float):
+    """
+    Объединяет изменения нескольких писателей в одну перезапись файла.
+
+        Args:
+            path: путь до файла '.whitelist'.
+            op: операция ('add' или 'remove').
+            rules: список правил операции.
+            commit: функция commit(ops), применяющая список пар (op, rules)
+                и сохраняющая результат; вызывается под блокировкой файла.
+            window: сколько секунд лидер ждет операции других писателей.
+
+        Писатель кладет операцию в очередь path + '.pending' и ждет блокировку файла.
+        Получивший блокировку становится лидером: ждет window секунд, забирает
+        всю очередь и записывает ее одним commit. Писатели, чьи операции уже
+        записал лидер, сразу выходят. Записи удаляются из очереди только после
+        commit, поэтому при падении лидера их повторит следующий писатель
+        (add и remove можно применять повторно).
+    """
+    record_id = uuid.uuid4().hex
+    pending_path = path + PENDING_SUFFIX
+    with locked(pending_path):
+        with open(pending_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"id": record_id, "op": op, "rules": list(rules)}) + "\n")
+
+    with locked(path):
+        if record_id not in {record["id"] for record in _read_pending(pending_path)}:
+            return
+        if window > 0:
+            time.sleep(window)
+        with locked(pending_path):
+            records = _read_pending(pending_path)
+        commit([(record["op"], record["rules"]) for record in records])
+        done = {record["id"] for record in records}
+        with locked(pending_path):
+            rest = [record for record in _read_pending(pending_path) if record["id"] not in done]
+            if rest:
+                atomic_write(pending_path, "".join(json.dumps(record) + "\n" for record in rest))
+            else:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(pending_path)
+
+
+def _read_pending(pending_path: str) -> list[dict]:
+    try:
+        with open(pending_path, "r", encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.endswith("\n")]
+    except FileNotFoundError:
+        return []
@@ -0,0 +1,109 @@
+import re
+
+from whitelist01.globcache import compile_glob
+
+# Символы, которые glob_to_regex экранирует
+SPECIAL_CHARS = ".^$+{}[]|()"
+
+_TOKEN = re.compile(r"\*\*?|.", re.DOTALL)
+
+
+def _token(chunk: str) -> str:
+    if chunk[0] == "*":
+        return ".*"
+    if chunk == "?":
+        return "."
+    if chunk in SPECIAL_CHARS:
+        return "\\" + chunk
+    return chunk
+
+
+def glob_tokens(pattern: str) -> list[str]:
+    """
+    Разбивает glob-шаблон на токены регулярного выражения.
+
+        Args:
+            pattern: glob-шаблон правила.
+
+        Токены совпадают с тем, что собирает glob_to_regex:
+        '*' и '**' -> '.*', '?' -> '.', спецсимволы экранируются.
+    """
+    return [_token(chunk) for chunk in _TOKEN.findall(pattern)]
+
+
+def _emit(node: dict) -> str:
+    """
+    Превращает префиксное дерево токенов в регулярное выражение.
+    Цепочки без ветвлений склеиваются, группа появляется только в точке ветвления.
+    """
+    parts = []
+    terminal = False
+    for token, child in node.items():
+        if token is None:
+            terminal = True
+            continue
+        chunk = [token]
+        while len(child) == 1 and None not in child:
+            ((token, child),) = child.items()
+            chunk.append(token)
+        parts.append("".join(chunk) + _emit(child))
+    if terminal and parts:
+        parts.append("")
+    if len(parts) <= 1:
+        return "".join(parts)
+    return "(?:" + "|".join(parts) + ")"
+
+
+def build_pattern(rules) -> re.Pattern | None:
+    """
+    Собирает правила в одно регулярное выражение вида ^(?:...)$.
+
+        Args:
+            rules: glob-правила.
+
+        Общие префиксы правил выносятся за скобки, поэтому движок регулярных
+        выражений идет по дереву префиксов, а не перебирает правила по одному.
+        Возвращает None, если правил нет.
+    """
+    root = {}
+    for rule in rules:
+        node = root
+        for token in glob_tokens(rule):
+            node = node.setdefault(token, {})
+        node[None] = True
+    if not root:
+        return None
+    return re.compile("^" + _emit(root) + "$")
+
+
+class RuleMatcher:
+    """
+    Скомпилированный набор правил: проверяет, подходит ли путь хотя бы под одно правило.
+
+    Результат совпадает с any(glob_to_regex(rule).match(path) for rule in rules).
+    Правила с обратной косой чертой не объединяются: в glob_to_regex она не экранируется
+    и внутри общего выражения могла бы склеиться с соседним правилом.
+    """
+
+    __slots__ = ("_pattern", "_separate")
+
+    def __init__(self, rules):
+        combined = []
+        separate = []
+        for rule in rules:
+            if "\\" in rule:
+                separate.append(compile_glob(rule))
+            else:
+                combined.append(rule)
+        try:
+            self._pattern = build_pattern(combined)
+        except RecursionError:
+            # Слишком глубокое дерево префиксов: компилируем правила по отдельности
+            self._pattern = None
+            separate.extend(compile_glob(rule) for rule in combined)
+        self._separate = separate
+
+    def match(self, path: str) -> bool:
+        if self._pattern is not None and self._pattern.match(path):
+            return True
+        return any(pattern.match(path) for pattern in self._separate)
@@ -0,0 +1,177 @@
+import threading
+import time
+
+# Текущий приемник событий; None - измерения выключены
+sink = None
+
+
+def install(new_sink):
+    """
+    Включает измерения.
+
+        Args:
+            new_sink: функция new_sink(event, fields) или MetricsRegistry;
+                вызывается на каждое событие, fields - словарь полей события.
+
+        События:
+            'lookup' - проверка доступа: duration_ns, result ('allow'/'deny'),
+                patterns (сколько шаблонов проверено; нет для ответа из кэша решений);
+            'check_many' - пакетная проверка: duration_ns, paths, allowed;
+            'checker_build' - создание проверки: duration_ns, mode ('index'/'compact'/'snapshot'/'reload');
+            'load' - чтение правил: duration_ns, bytes, rules;
+            'save' - запись правил: duration_ns, bytes, rules, mode ('full'/'journal');
+            'add', 'remove' - изменение правил целиком: duration_ns, rules.
+
+        Возвращает предыдущий приемник.
+    """
+    global sink
+    previous, sink = sink, new_sink
+    return previous
+
+
+def uninstall():
+    """
+    Выключает измерения. Возвращает предыдущий приемник.
+    """
+    return install(None)
+
+
+def emit(event: str, **fields):
+    """
+    Передает событие приемнику, если измерения включены.
+    """
+    current = sink
+    if current is not None:
+        current(event, fields)
+
+
+def timed_lookup(allows, file_path: str, count_patterns=None) -> bool:
+    """
+    Выполняет проверку доступа allows(file_path) и сообщает о ней событием 'lookup'.
+
+        Args:
+            allows: функция проверки.
+            file_path: проверяемый путь.
+            count_patterns: функция count_patterns(file_path) -> число шаблонов,
+                которые проверяет allows; считается вне замера времени.
+    """
+    start = time.perf_counter_ns()
+    allowed = allows(file_path)
+    duration = time.perf_counter_ns() - start
+    fields = {"duration_ns": duration, "result": "allow" if allowed else "deny"}
+    if count_patterns is not None:
+        fields["patterns"] = count_patterns(file_path)
+    emit("lookup", **fields)
+    return allowed
+
+
+def timed_check_many(check_many, paths) -> bytearray:
+    """
+    Выполняет пакетную проверку и сообщает о ней событием 'check_many'.
+    """
+    start = time.perf_counter_ns()
+    result = check_many(paths)
+    duration = time.perf_counter_ns() - start
+    emit("check_many", duration_ns=duration, paths=len(result), allowed=sum(result))
+    return result
+
+
+class Histogram:
+    """
+    Гистограмма неотрицательных целых значений с корзинами по степеням двойки.
+
+    Корзина k хранит значения от 2**(k-1) до 2**k - 1 (корзина 0 - нули),
+    поэтому перцентили оцениваются с точностью до двух раз.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def observe(self, value: int):
+        value = int(value)
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        bucket = value.bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, q: float) -> int:
+        """
+        Оценка сверху перцентиля q (0-100): верхняя граница корзины, но не больше max.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * q // 100))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min((1 << bucket) - 1, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": {(1 << bucket) - 1: count for bucket, count in sorted(self.buckets.items())},
+        }
+
+
+class MetricsRegistry:
+    """
+    Приемник событий, который копит счетчики и гистограммы.
+
+    Для события 'lookup' с полями duration_ns=1200, result='allow', patterns=3
+    увеличиваются счетчики 'lookup' и 'lookup.allow', а значения попадают
+    в гистограммы 'lookup.duration_ns' и 'lookup.patterns'.
+    Строковые поля считаются счетчиками, числовые - гистограммами.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def __call__(self, event: str, fields: dict):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + 1
+            for name, value in fields.items():
+                if isinstance(value, str):
+                    key = f"{event}.{value}"
+                    self.counters[key] = self.counters.get(key, 0) + 1
+                else:
+                    key = f"{event}.{name}"
+                    histogram = self.histograms.get(key)
+                    if histogram is None:
+                        histogram = self.histograms[key] = Histogram()
+                    histogram.observe(value)
+
+    def snapshot(self) -> dict:
+        """
+        Возвращает копию накопленных значений: {'counters': {...}, 'histograms': {...}}.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {name: histogram.as_dict() for name, histogram in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
@@ -0,0 +1,152 @@
+import os
+import threading
+from bisect import bisect_left
+
+from whitelist01.checkers import ReloadingChecker
+from whitelist01.index import prefix_range_end
+
+WHITELIST_NAME = ".whitelist.txt"
+
+# Сколько директорий хранить в кэше цепочек; при переполнении кэш очищается
+CHAIN_CACHE_SIZE = 65536
+
+
+def find_whitelists(path: str, subdirectory: str = "") -> list[str]:
+    """
+    Возвращает отсортированные пути (относительно path, через '/') поддиректорий,
+    в которых лежит свой '.whitelist'. Корень в список не входит.
+
+        Args:
+            path: путь до корневой директории.
+            subdirectory: искать только в этой поддиректории (относительно path)
+                и ниже; '' - во всем дереве.
+    """
+    path = os.fspath(path)
+    found = []
+    for directory, _, files in os.walk(os.path.join(path, subdirectory) if subdirectory else path):
+        if WHITELIST_NAME in files:
+            relative = os.path.relpath(directory, path)
+            if relative != ".":
+                found.append(relative.replace(os.sep, "/"))
+    return sorted(found)
+
+
+class NestedChecker:
+    """
+    Проверка доступа с файлами '.whitelist' в поддиректориях.
+
+        Args:
+            path: путь до корневой директории.
+            interval: как часто проверять изменения каждого файла (см. ReloadingChecker).
+
+    Правила из 'a/b/.whitelist.txt' относятся к поддереву 'a/b': правило 'x/*'
+    в нем разрешает 'a/b/x/...'. Путь разрешен, если его разрешают правила
+    корня или правила любой директории-предка относительно нее, а также если
+    он ведет к поддиректории с непустым '.whitelist' (как родитель
+    разрешенного пути). Правила корня действуют на все дерево.
+
+    Для каждой директории один раз собирается цепочка наборов правил
+    ее предков; проверка пути обращается только к этой цепочке. Каждый файл
+    перечитывается отдельно, когда меняется, и остальные наборы не трогает.
+    Поддиректории с '.whitelist' ищутся при создании и в rescan():
+    новые файлы видны только после rescan(). Поиск обходит дерево через
+    os.walk, поэтому стоит O(числа файлов и директорий дерева), а не числа
+    файлов '.whitelist'; rescan(directory) обходит только поддерево directory.
+    """
+
+    def __init__(self, path: str, interval: float = 1.0):
+        self.path = os.fspath(path)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._scopes = {"": ReloadingChecker(path, interval)}
+        self._nested = []
+        self._chains = {}
+        self.rescan()
+
+    def rescan(self, directory: str = ""):
+        """
+        Заново ищет поддиректории с '.whitelist'. Сбрасываются только цепочки
+        директорий внутри появившихся и исчезнувших поддиректорий.
+
+            Args:
+                directory: обойти только эту поддиректорию (относительно корня)
+                    и ее поддерево; '' - все дерево.
+        """
+        directory = directory.replace("\\", "/").strip("/")
+        found = find_whitelists(self.path, directory)
+        head = directory + "/"
+        with self._lock:
+            # Поддиректории вне обойденного поддерева остаются как были
+            known = {
+                nested
+                for nested in self._nested
+                if not directory or nested == directory or nested.startswith(head)
+            }
+            changed = known.symmetric_difference(found)
+            for nested in known.difference(found):
+                del self._scopes[nested]
+            for nested in changed.difference(known):
+                self._scopes[nested] = ReloadingChecker(os.path.join(self.path, nested), self.interval)
+            self._nested = sorted(set(self._nested).difference(known).union(found))
+            if changed:
+                self._chains = {
+                    directory: chain
+                    for directory, chain in self._chains.items()
+                    if not any(directory == changed_dir or directory.startswith(changed_dir + "/") for changed_dir in changed)
+                }
+
+    def _chain(self, directory: str) -> tuple:
+        # Наборы правил предков директории (и ее самой): (длина префикса пути, проверка)
+        chain = self._chains.get(directory)
+        if chain is not None:
+            return chain
+        with self._lock:
+            scopes = self._scopes
+            chain = [(0, scopes[""])]
+            if directory:
+                end = 0
+                while end >= 0:
+                    end = directory.find("/", end + 1)
+                    ancestor = directory if end < 0 else directory[:end]
+                    scope = scopes.get(ancestor)
+                    if scope is not None:
+                        chain.append((len(ancestor) + 1, scope))
+            chain = tuple(chain)
+            if len(self._chains) >= CHAIN_CACHE_SIZE:
+                self._chains = {}
+            self._chains[directory] = chain
+            return chain
+
+    def __call__(self, file_path: str) -> bool:
+        normalized_path = file_path.replace("\\", "/").rstrip("/")
+        for offset, scope in self._chain(normalized_path.rpartition("/")[0]):
+            if scope(normalized_path[offset:]):
+                return True
+        return self._leads_to_rules(normalized_path)
+
+    def _leads_to_rules(self, path: str) -> bool:
+        # Путь - сама поддиректория с правилами или ее предок
+        nested = self._nested
+        head = path + "/" if path else ""
+        i = bisect_left(nested, path)
+        if i < len(nested) and nested[i] == path:
+            scope = self._scopes.get(path)
+            if scope is not None and scope.rule_count():
+                return True
+        for directory in nested[bisect_left(nested, head) : prefix_range_end(nested, head)]:
+            scope = self._scopes.get(directory)
+            if scope is not None and scope.rule_count():
+                return True
+        return False
+
+    def check_many(self, paths) -> bytearray:
+        """
+        Проверяет доступ сразу для списка путей; ответы как у вызова для каждого пути.
+        """
+        return bytearray(map(self, map(os.fsdecode, paths)))
+
+    def scopes(self) -> list[str]:
+        """
+        Возвращает директории (относительно корня) с '.whitelist'; '' - корень.
+        """
+        return [""] + list(self._nested)
@@ -0,0 +1,182 @@
+import argparse
+import os
+from collections import namedtuple
+
+from whitelist01.decisions import rules_changed
+from whitelist01.index import EXACT, PREFIX, SUFFIX, RuleIndex, classify
+from whitelist01.locking import locked
+from whitelist01.trie import literal_prefix
+from whitelist01.whitelist_rules import load_rules, save_rules
+
+OptimizeResult = namedtuple("OptimizeResult", ["before", "after", "removed", "mismatches", "written"])
+
+# Порядок проверки: правило может покрыть только правило, обработанное после него
+_KIND_ORDER = {PREFIX: 0, SUFFIX: 1}
+
+
+def _literal_tail(rule: str) -> str:
+    # Часть правила после последнего wildcard: ей заканчивается любая подходящая строка
+    last = max(rule.rfind("*"), rule.rfind("?"))
+    return rule[last + 1 :]
+
+
+def _covered(rule: str, prefixes: set, suffixes: dict) -> bool:
+    # Покрыто ли glob-правило оставленным префиксом ('foo/*') или хвостом ('*.log')
+    head = literal_prefix(rule)
+    if any(head[:i] in prefixes for i in range(len(head) + 1)):
+        return True
+    tail = _literal_tail(rule)
+    for suffix, need_slash in suffixes.get(tail[tail.rfind(".") + 1 :], ()):
+        if tail.endswith(suffix) and (not need_slash or "/" in head or "/" in tail[: len(tail) - len(suffix)]):
+            return True
+    return False
+
+
+def _parents(rule: str):
+    # Строки p, для которых правило начинается с p + '/'
+    slash = rule.find("/")
+    while slash >= 0:
+        yield rule[:slash]
+        slash = rule.find("/", slash + 1)
+
+
+def optimize_rules(rules) -> list[str]:
+    """
+    Убирает правила, которые покрыты другими правилами набора.
+
+        Args:
+            rules: правила '.whitelist'.
+
+        Правило убирается, только если это доказуемо не меняет ни одного ответа
+        access_checker:
+            точный путь - если он подходит под оставшееся правило;
+            glob-правило - если оно покрыто оставшимся префиксом ('foo/*')
+                или хвостом ('*.log'); правила с '\\' не трогаются;
+            и при этом все родительские директории убранного правила
+            по-прежнему разрешены оставшимися правилами.
+        Из правил, покрывающих друг друга ('foo/*' и 'foo/**'), остается первое
+        в порядке (длина буквального префикса, вид, длина, текст).
+        Возвращает отсортированный список оставшихся правил.
+    """
+    rules = set(rules)
+    literals = []
+    kept = []
+    prefixes = set()
+    suffixes = {}
+    candidates = []
+    for rule in rules:
+        kind, key = classify(rule)
+        if kind == EXACT:
+            literals.append(rule)
+        else:
+            candidates.append((len(literal_prefix(rule)), _KIND_ORDER.get(kind, 2), len(rule), rule, kind, key))
+    # Покрывающее правило не длиннее по буквальному префиксу, поэтому обработано раньше
+    for _, _, _, rule, kind, key in sorted(candidates):
+        if "\\" not in rule and _covered(rule, prefixes, suffixes):
+            continue
+        kept.append(rule)
+        if kind == PREFIX:
+            prefixes.add(key)
+        elif kind == SUFFIX:
+            suffix = key[0]
+            suffixes.setdefault(suffix[suffix.rfind(".") + 1 :], []).append(key)
+
+    # Точный путь не покрывает другие правила, а сам проверяется так же, как в access_checker
+    patterns = RuleIndex(kept)
+    kept.extend(rule for rule in literals if not patterns.match(rule))
+
+    # Убранное правило могло разрешать свои родительские директории
+    index = RuleIndex(kept)
+    removed = rules.difference(kept)
+    for rule in sorted(removed):
+        if not all(index.match(parent) or index.has_descendants(parent) for parent in _parents(rule)):
+            kept.append(rule)
+    return sorted(kept)
+
+
+def corpus_for(rules) -> list[str]:
+    """
+    Строит пути для проверки оптимизации по самим правилам.
+
+        Для каждого правила берутся варианты с подстановками вместо '*' и '?',
+        их родительские директории и пути внутри них.
+    """
+    paths = set()
+    for rule in rules:
+        variants = {
+            rule,
+            rule.replace("*", "").replace("?", "x"),
+            rule.replace("*", "x").replace("?", "y"),
+            rule.replace("*", "x/y").replace("?", "z"),
+        }
+        for variant in variants:
+            paths.add(variant)
+            paths.add(variant + "/z")
+            paths.add(variant + ".log")
+            paths.update(_parents(variant))
+    return sorted(paths)
+
+
+def verify(before, after, paths) -> list[str]:
+    """
+    Возвращает пути, для которых наборы правил before и after отвечают по-разному.
+    """
+    old = RuleIndex(before)
+    new = RuleIndex(after)
+    return [path for path in paths if old.allows(path) != new.allows(path)]
+
+
+def optimize(path: str, corpus=None, dry_run: bool = False) -> OptimizeResult:
+    """
+    Функция оптимизации файла '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            corpus: пути для проверки ответов; по умолчанию строятся по правилам (corpus_for).
+            dry_run: только посчитать результат, не записывая файл.
+
+        Из файла убираются правила, покрытые другими (см. optimize_rules).
+        Файл перезаписывается, только если ответы старого и нового набора
+        совпали на всех путях проверки. Чтение и запись идут под блокировкой файла.
+        Возвращает OptimizeResult(before, after, removed, mismatches, written):
+        число правил до и после, убранные правила, пути с разными ответами
+        и признак записи файла.
+    """
+    whitelist_file = os.path.join(path, ".whitelist.txt")
+    with locked(whitelist_file):
+        rules = list(dict.fromkeys(load_rules(whitelist_file)))
+        optimized = optimize_rules(rules)
+        removed = sorted(set(rules).difference(optimized))
+        paths = corpus_for(rules) if corpus is None else corpus
+        mismatches = verify(rules, optimized, paths)
+        written = not dry_run and not mismatches and bool(removed)
+        if written:
+            save_rules(whitelist_file, set(optimized))
+            rules_changed(whitelist_file, rules, optimized)
+    return OptimizeResult(len(rules), len(optimized), removed, mismatches, written)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Убирает из '.whitelist' правила, покрытые другими.")
+    parser.add_argument("path", help="директория с '.whitelist'")
+    parser.add_argument("--corpus", help="файл с путями для проверки ответов, по одному на строку")
+    parser.add_argument("--dry-run", action="store_true", help="не записывать файл")
+    args = parser.parse_args(argv)
+
+    corpus = None
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as file:
+            corpus = [line.rstrip("\r\n") for line in file if line.strip()]
+    result = optimize(args.path, corpus, args.dry_run)
+    print(f"правил: {result.before} -> {result.after}, убрано: {len(result.removed)}")
+    for path in result.mismatches[:20]:
+        print(f"ответ изменился: {path}")
+    if result.mismatches:
+        print("файл не записан: ответы на пути проверки изменились")
+    elif result.written:
+        print("файл записан")
+    return 1 if result.mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
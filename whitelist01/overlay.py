@@ -0,0 +1,154 @@
+import os
+from itertools import compress
+
+from whitelist01.index import RuleIndex
+
+# Сколько правил копит наложение, прежде чем изменения вливаются в основной индекс
+OVERLAY_LIMIT = 1024
+
+
+class RuleOverlay:
+    """
+    Неизменяемый индекс: общий основной RuleIndex и небольшое наложение изменений.
+
+        Args:
+            base: основной индекс; не меняется, пока на него ссылается наложение.
+            added: индекс добавленных правил, которых нет в base.
+            removed: индекс удаленных правил; все они есть в base.
+
+    changed(removed, added) возвращает новое наложение и не трогает старое.
+    Копируются только индексы наложения, а их размер не больше OVERLAY_LIMIT,
+    поэтому изменение стоит O(размера наложения) и не зависит от числа правил.
+    Когда наложение переполняется, изменения вливаются в копию основного
+    индекса: это O(числа правил), но один раз на OVERLAY_LIMIT правил.
+
+    Путь разрешен правилами added или правилами base, кроме removed.
+    Основной индекс отвечает как обычно; разрешающее правило ищется среди
+    оставшихся (RuleIndex.match_except) только для путей, которые разрешает
+    и какое-нибудь удаленное правило.
+    """
+
+    __slots__ = ("base", "_added", "_removed", "_masked")
+
+    def __init__(self, base: RuleIndex = None, added: RuleIndex = None, removed: RuleIndex = None):
+        self.base = RuleIndex() if base is None else base
+        self._added = RuleIndex() if added is None else added
+        self._removed = RuleIndex() if removed is None else removed
+        # Выражения узлов base без остатков removed, см. RuleTrie.match_except
+        self._masked = {}
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self._added) - len(self._removed)
+
+    def __contains__(self, rule: str) -> bool:
+        return rule in self._added or (rule in self.base and rule not in self._removed)
+
+    def __iter__(self):
+        removed = self._removed
+        yield from (rule for rule in self.base if rule not in removed)
+        yield from self._added
+
+    @property
+    def pending(self) -> int:
+        """
+        Сколько правил лежит в наложении (добавленных и удаленных).
+        """
+        return len(self._added) + len(self._removed)
+
+    def changed(self, removed, added) -> "RuleOverlay":
+        """
+        Возвращает наложение с удаленными и добавленными правилами.
+        """
+        base = self.base
+        added_index = self._added.copy()
+        removed_index = self._removed.copy()
+        for rule in removed:
+            if rule in added_index:
+                added_index.discard_rule(rule)
+            elif rule in base:
+                removed_index.add_rule(rule)
+        for rule in added:
+            if rule in removed_index:
+                removed_index.discard_rule(rule)
+            elif rule not in base:
+                added_index.add_rule(rule)
+        overlay = RuleOverlay(base, added_index, removed_index)
+        if overlay.pending > OVERLAY_LIMIT:
+            return RuleOverlay(overlay.merged())
+        return overlay
+
+    def merged(self) -> RuleIndex:
+        """
+        Возвращает новый RuleIndex с правилами наложения.
+        """
+        index = self.base.copy()
+        for rule in self._removed:
+            index.discard_rule(rule)
+        for rule in self._added:
+            index.add_rule(rule)
+        return index
+
+    def match(self, path: str) -> bool:
+        """
+        Проверяет, подходит ли строка под какое-либо правило.
+        """
+        if self._added.match(path):
+            return True
+        if not self.base.match(path):
+            return False
+        removed = self._removed
+        return not removed.match(path) or self.base.match_except(path, removed, self._masked)
+
+    def has_descendants(self, path: str) -> bool:
+        """
+        Проверяет, есть ли правило, начинающееся с path + '/'.
+        """
+        if self._added.has_descendants(path):
+            return True
+        if not self.base.has_descendants(path):
+            return False
+        removed = self._removed
+        return not removed.has_descendants(path) or self.base.has_descendants_except(path, removed)
+
+    def _allows(self, normalized_path: str) -> bool:
+        return self.match(normalized_path) or self.has_descendants(normalized_path)
+
+    def allows(self, file_path: str) -> bool:
+        """
+        Проверка доступа к файлу/директории, как в access_checker.
+        """
+        if not self.pending:
+            return self.base.allows(file_path)
+        return self._allows(file_path.replace("\\", "/").rstrip("/"))
+
+    def evaluated(self, path: str) -> int:
+        """
+        Считает шаблоны, которые проверяют основной индекс и добавленные правила.
+        """
+        if not self._added:
+            return self.base.evaluated(path)
+        return self.base.evaluated(path) + self._added.evaluated(path)
+
+    def check_many(self, paths, normalized: bool = False) -> bytearray:
+        """
+        Проверяет доступ сразу для списка путей, см. RuleIndex.check_many.
+
+            Пути проверяются пакетом по основному индексу; отдельно
+            перепроверяются только пути, которые разрешает удаленное правило.
+        """
+        if not self.pending:
+            return self.base.check_many(paths, normalized)
+        if hasattr(paths, "tolist"):
+            paths = paths.tolist()
+        if not normalized:
+            paths = [os.fsdecode(path).replace("\\", "/").rstrip("/") for path in paths]
+        result = self.base.check_many(paths, normalized=True)
+        if self._removed:
+            suspects = self._removed.check_many(paths, normalized=True)
+            for i in compress(range(len(paths)), suspects):
+                if result[i]:
+                    result[i] = self._allows(paths[i])
+        if self._added:
+            for i in compress(range(len(paths)), self._added.check_many(paths, normalized=True)):
+                result[i] = 1
+        return result
@@ -0,0 +1,210 @@
+import argparse
+import os
+import sys
+import time
+from bisect import bisect_right
+
+from whitelist01.globcache import compile_glob
+from whitelist01.index import EXACT, GLOB, PREFIX, SUFFIX, RuleIndex, classify, prune_prefixes
+from whitelist01.trie import RuleTrie, split_rule
+from whitelist01.whitelist_rules import load_rules
+
+
+class RuleCost:
+    """
+    Затраты на одно правило за время профилирования.
+
+    tier - уровень проверки, на котором правило проверяется: EXACT, PREFIX, SUFFIX, GLOB;
+    evaluations - сколько раз правило проверялось; matches - сколько раз совпало;
+    total_ns - суммарное время проверок правила.
+    """
+
+    __slots__ = ("rule", "tier", "evaluations", "matches", "total_ns")
+
+    def __init__(self, rule: str, tier: str):
+        self.rule = rule
+        self.tier = tier
+        self.evaluations = 0
+        self.matches = 0
+        self.total_ns = 0
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.evaluations if self.evaluations else 0.0
+
+    @property
+    def anchor(self) -> str:
+        """
+        Буквальная директория, в которой правило начинает проверяться;
+        пустая строка - правило проверяется для каждого пути.
+        """
+        return split_rule(self.rule)[0] if self.tier == GLOB else ""
+
+    def __repr__(self):
+        return f"RuleCost({self.rule!r}, {self.tier}, evaluations={self.evaluations}, total_ns={self.total_ns})"
+
+
+class RuleProfiler:
+    """
+    Проверка доступа, которая распределяет время проверки по отдельным правилам.
+
+        Args:
+            rules: правила '.whitelist'.
+
+    Отвечает так же, как access_checker, и повторяет порядок проверки RuleIndex:
+    точные пути, ближайший префикс, хвосты из корзины расширения, glob-правила
+    в узлах дерева по пути. Каждое правило проверяется отдельно и со своим
+    таймером, поэтому профилирование медленнее обычной проверки; общее
+    выражение узла дерева заменено проверкой его правил по очереди.
+    Префиксы, покрытые более коротким префиксом, никогда не проверяются.
+    Пути с переводом строки проверяются, но в затраты не попадают.
+    """
+
+    def __init__(self, rules=()):
+        rules = list(dict.fromkeys(rules))
+        self._index = RuleIndex(rules)
+        self._costs = {}
+        self._exact = set()
+        self._prefix_rules = {}
+        self._suffixes = {}
+        self._trie = RuleTrie()
+        self.lookups = 0
+        for rule in rules:
+            kind, key = classify(rule)
+            self._costs[rule] = RuleCost(rule, kind)
+            if kind == EXACT:
+                self._exact.add(rule)
+            elif kind == PREFIX:
+                self._prefix_rules.setdefault(key, []).append(rule)
+            elif kind == SUFFIX:
+                suffix, need_slash = key
+                self._suffixes.setdefault(suffix[suffix.rfind(".") + 1 :], []).append((suffix, need_slash, rule))
+            else:
+                self._trie.insert(rule)
+        self._prefixes = prune_prefixes(self._prefix_rules)
+
+    def __call__(self, file_path: str) -> bool:
+        normalized_path = file_path.replace("\\", "/").rstrip("/")
+        if "\n" in normalized_path:
+            return self._index.allows(normalized_path)
+        self.lookups += 1
+        return self._match(normalized_path) or self._index.has_descendants(normalized_path)
+
+    def _match(self, path: str) -> bool:
+        clock = time.perf_counter_ns
+        costs = self._costs
+
+        if path in self._exact:
+            cost = costs[path]
+            cost.evaluations += 1
+            cost.matches += 1
+            return True
+
+        prefixes = self._prefixes
+        if prefixes:
+            start = clock()
+            i = bisect_right(prefixes, path)
+            matched = i > 0 and path.startswith(prefixes[i - 1])
+            elapsed = clock() - start
+            if i:
+                # Правила 'foo/*' и 'foo/**' дают один префикс, время делится на первое
+                cost = costs[self._prefix_rules[prefixes[i - 1]][0]]
+                cost.evaluations += 1
+                cost.total_ns += elapsed
+                if matched:
+                    cost.matches += 1
+                    return True
+
+        bucket = self._suffixes.get(path[path.rfind(".") + 1 :]) if self._suffixes else None
+        for suffix, need_slash, rule in bucket or ():
+            start = clock()
+            matched = path.endswith(suffix) and (not need_slash or "/" in path[: len(path) - len(suffix)])
+            elapsed = clock() - start
+            cost = costs[rule]
+            cost.evaluations += 1
+            cost.total_ns += elapsed
+            if matched:
+                cost.matches += 1
+                return True
+
+        for remainders, offset in self._trie.glob_nodes(path):
+            tail = path[offset:]
+            head = path[:offset]
+            found = False
+            for remainder in remainders:
+                pattern = compile_glob(remainder)
+                start = clock()
+                matched = pattern.match(tail) is not None
+                elapsed = clock() - start
+                cost = costs[head + remainder]
+                cost.evaluations += 1
+                cost.total_ns += elapsed
+                if matched:
+                    cost.matches += 1
+                    found = True
+            # Выражение узла проверяет все правила узла сразу, дальше проверка не идет
+            if found:
+                return True
+        return False
+
+    def costs(self, top: int | None = None) -> list[RuleCost]:
+        """
+        Возвращает затраты правил, самые дорогие первыми.
+
+            Args:
+                top: сколько правил вернуть (None - все).
+        """
+        ranked = sorted(self._costs.values(), key=lambda cost: (-cost.total_ns, -cost.evaluations, cost.rule))
+        return ranked if top is None else ranked[:top]
+
+    def report(self, top: int = 20) -> str:
+        """
+        Возвращает таблицу самых дорогих правил.
+        """
+        total = sum(cost.total_ns for cost in self._costs.values())
+        lines = [
+            f"проверок: {self.lookups}, правил: {len(self._costs)}, время по правилам: {total / 1e6:.3f} мс",
+            f"{'#':>3} {'уровень':<7} {'проверок':>9} {'совпад.':>8} {'всего мкс':>10} {'сред. нс':>9} {'доля':>6}  правило",
+        ]
+        for place, cost in enumerate(self.costs(top), 1):
+            share = cost.total_ns / total if total else 0.0
+            where = " (для каждого пути)" if cost.tier == GLOB and not cost.anchor else ""
+            lines.append(
+                f"{place:>3} {cost.tier:<7} {cost.evaluations:>9} {cost.matches:>8} {cost.total_ns / 1e3:>10.1f}"
+                f" {cost.mean_ns:>9.0f} {share:>6.1%}  {cost.rule}{where}"
+            )
+        return "\n".join(lines)
+
+
+def profiling_checker(path: str) -> RuleProfiler:
+    """
+    Возвращает проверку доступа с профилированием правил.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+
+        Используется вместо checker(path) на выборке реальных путей,
+        затем profiler.report() показывает самые дорогие правила.
+    """
+    return RuleProfiler(load_rules(os.path.join(path, ".whitelist.txt")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Профилирование правил '.whitelist' по выборке путей.")
+    parser.add_argument("path", help="директория с '.whitelist'")
+    parser.add_argument("paths", nargs="?", help="файл с путями, по одному на строку (по умолчанию stdin)")
+    parser.add_argument("--top", type=int, default=20, help="сколько правил показать")
+    args = parser.parse_args(argv)
+
+    profiler = profiling_checker(args.path)
+    source = open(args.paths, "r", encoding="utf-8") if args.paths else sys.stdin
+    with source:
+        for line in source:
+            line = line.rstrip("\r\n")
+            if line:
+                profiler(line)
+    print(profiler.report(args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from whitelist01.checkers import ReloadingChecker, file_signature
+from whitelist01.journal import journal_path
+from whitelist01.metrics import Histogram
+
+# Бюджет памяти по умолчанию, байт
+DEFAULT_MAX_BYTES = 256 << 20
+
+# Оценка памяти проверки: индекс занимает около BYTES_PER_FILE_BYTE байт
+# на байт файла правил (замер tracemalloc на сгенерированных наборах: 33-78)
+# плюс постоянная часть на сам объект проверки
+BYTES_PER_FILE_BYTE = 64
+ENTRY_BYTES = 4096
+
+RegistryInfo = namedtuple(
+    "RegistryInfo", ["hits", "misses", "evictions", "entries", "bytes", "max_bytes", "load_ns"]
+)
+
+
+def estimate_bytes(whitelist_file: str) -> int:
+    """
+    Оценивает память проверки по размеру файла '.whitelist' и его журнала.
+    """
+    size = 0
+    for signature in (file_signature(whitelist_file), file_signature(journal_path(whitelist_file))):
+        if signature is not None:
+            size += signature[1]
+    return ENTRY_BYTES + BYTES_PER_FILE_BYTE * size
+
+
+class _Entry:
+    __slots__ = ("checker", "weight", "loads")
+
+    def __init__(self, checker, weight: int):
+        self.checker = checker
+        self.weight = weight
+        self.loads = checker.loads
+
+
+class _Load:
+    # Загрузка, которую ждут остальные потоки с тем же промахом
+    __slots__ = ("done", "checker", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.checker = None
+        self.error = None
+
+
+class CheckerRegistry:
+    """
+    Кэш проверок доступа для многих директорий с ограничением по памяти.
+
+        Args:
+            max_bytes: бюджет памяти всех проверок (оценка, см. estimate_bytes).
+            max_entries: наибольшее число проверок (None - без ограничения).
+            interval: как часто проверка перечитывает изменившийся '.whitelist'
+                (см. ReloadingChecker).
+            weigher: функция weigher(whitelist_file) -> байт вместо estimate_bytes.
+
+    Проверка директории создается при первом обращении. Если несколько потоков
+    одновременно обращаются к отсутствующей директории, правила загружает
+    один из них, остальные ждут его результата. Когда бюджет превышен,
+    вытесняются давно не использованные проверки; последняя загруженная
+    остается всегда, даже если одна не помещается в бюджет.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int | None = None,
+        interval: float = 1.0,
+        weigher=estimate_bytes,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.interval = interval
+        self._weigher = weigher
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_ns = Histogram()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return os.path.abspath(path) in self._entries
+
+    def get(self, path: str) -> ReloadingChecker:
+        """
+        Возвращает проверку доступа директории path, загружая ее при необходимости.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                checker = entry.checker
+                if checker.loads == entry.loads:
+                    return checker
+            else:
+                self._misses += 1
+                load = self._loading.get(key)
+                owner = load is None
+                if owner:
+                    load = self._loading[key] = _Load()
+        if entry is not None:
+            # Проверка перечитала правила: вес пересчитывается по новому файлу
+            self._reweigh(key, entry)
+            return checker
+        if not owner:
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.checker
+        return self._load(key, load)
+
+    def _load(self, key: str, load: _Load) -> ReloadingChecker:
+        start = time.perf_counter_ns()
+        try:
+            checker = ReloadingChecker(key, self.interval)
+            weight = self._weigher(checker.whitelist_file)
+        except BaseException as error:
+            load.error = error
+            with self._lock:
+                del self._loading[key]
+            load.done.set()
+            raise
+        duration = time.perf_counter_ns() - start
+        with self._lock:
+            self._load_ns.observe(duration)
+            del self._loading[key]
+            self._entries[key] = _Entry(checker, weight)
+            self._bytes += weight
+            self._evict()
+        load.checker = checker
+        load.done.set()
+        return checker
+
+    def _reweigh(self, key: str, entry: _Entry):
+        weight = self._weigher(entry.checker.whitelist_file)
+        with self._lock:
+            if self._entries.get(key) is not entry:
+                return
+            self._bytes += weight - entry.weight
+            entry.weight = weight
+            entry.loads = entry.checker.loads
+            self._evict()
+
+    def _evict(self):
+        # Вызывается под блокировкой; последняя запись (только что использованная) остается
+        entries = self._entries
+        while len(entries) > 1 and (
+            self._bytes > self.max_bytes or (self.max_entries is not None and len(entries) > self.max_entries)
+        ):
+            _, entry = entries.popitem(last=False)
+            self._bytes -= entry.weight
+            self._evictions += 1
+
+    def allows(self, path: str, file_path: str) -> bool:
+        """
+        Проверяет доступ к file_path внутри директории path.
+        """
+        return self.get(path)(file_path)
+
+    def invalidate(self, path: str) -> bool:
+        """
+        Убирает проверку директории; следующее обращение загрузит ее заново.
+        Возвращает True, если проверка была в кэше.
+        """
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(path), None)
+            if entry is None:
+                return False
+            self._bytes -= entry.weight
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self) -> RegistryInfo:
+        """
+        Возвращает RegistryInfo: попадания, промахи, вытеснения, число проверок,
+        оценку занятой памяти, бюджет и гистограмму времени загрузки
+        (Histogram.as_dict, наносекунды).
+        """
+        with self._lock:
+            return RegistryInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                len(self._entries),
+                self._bytes,
+                self.max_bytes,
+                self._load_ns.as_dict(),
+            )
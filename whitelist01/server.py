@@ -0,0 +1,375 @@
+import argparse
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+from itertools import accumulate, count
+
+from whitelist01.registry import DEFAULT_MAX_BYTES, CheckerRegistry
+
+# Запрос: код операции, номер запроса, номер директории, число (путей или байт пути)
+_REQUEST = struct.Struct("<BIII")
+# Ответ: статус, номер запроса, длина данных
+_RESPONSE = struct.Struct("<BII")
+_HANDLE = struct.Struct("<I")
+
+OP_OPEN = 1
+OP_CHECK = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+# Номер директории неизвестен или ее правила вытеснены: директорию нужно открыть заново
+STATUS_UNKNOWN_HANDLE = 2
+
+# Ограничения одного запроса: больше сервер не читает и закрывает соединение
+MAX_PATHS = 1 << 20
+MAX_BYTES = 64 << 20
+
+# Сколько ответов (и байт в них) клиент держит неполученными при конвейерной
+# отправке, чтобы сервер не блокировался на записи, пока клиент еще пишет запросы.
+# Каждое сообщение занимает в буфере сокета больше своей длины, поэтому
+# ограничено и число ответов
+PIPELINE_DEPTH = 16
+PIPELINE_BYTES = 64 << 10
+
+
+def encode_paths(paths) -> tuple[int, bytes]:
+    """
+    Упаковывает пути для запроса OP_CHECK: длины (u32) подряд, затем байты путей.
+    Возвращает число путей и тело запроса.
+    """
+    blobs = [os.fsencode(path) for path in paths]
+    return len(blobs), struct.pack(f"<{len(blobs)}I", *map(len, blobs)) + b"".join(blobs)
+
+
+def decode_paths(count: int, lengths: bytes, blob: bytes) -> list[bytes]:
+    ends = list(accumulate(struct.unpack(f"<{count}I", lengths)))
+    return [blob[start:end] for start, end in zip([0] + ends, ends)]
+
+
+class UnknownHandleError(ValueError):
+    """
+    Сервер не знает номер директории (или вытеснил ее правила).
+    """
+
+
+def _read_exact(file, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) < size:
+        raise ConnectionError("соединение закрыто посреди сообщения")
+    return data
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Соединение обслуживается по порядку: ответы идут в порядке запросов,
+    # поэтому клиент может отправить несколько запросов, не дожидаясь ответов
+
+    def handle(self):
+        while True:
+            header = self.rfile.read(_REQUEST.size)
+            if len(header) < _REQUEST.size:
+                return
+            op, request_id, handle, count = _REQUEST.unpack(header)
+            try:
+                body = self._read_body(op, count)
+            except (ValueError, ConnectionError) as error:
+                # Тело запроса не прочитано, дальше поток не разобрать
+                self._respond(STATUS_ERROR, request_id, str(error).encode())
+                return
+            try:
+                if op == OP_OPEN:
+                    payload = _HANDLE.pack(self.server.open(os.fsdecode(body)))
+                else:
+                    payload = self.server.check(handle, decode_paths(count, *body))
+            except UnknownHandleError as error:
+                self._respond(STATUS_UNKNOWN_HANDLE, request_id, str(error).encode())
+                continue
+            except Exception as error:
+                self._respond(STATUS_ERROR, request_id, str(error).encode())
+                continue
+            self._respond(STATUS_OK, request_id, payload)
+
+    def _read_body(self, op: int, count: int):
+        if op == OP_OPEN:
+            if count > MAX_BYTES:
+                raise ValueError("слишком длинный путь")
+            return _read_exact(self.rfile, count)
+        if op == OP_CHECK:
+            if count > MAX_PATHS:
+                raise ValueError(f"больше {MAX_PATHS} путей в запросе")
+            lengths = _read_exact(self.rfile, 4 * count)
+            size = sum(struct.unpack(f"<{count}I", lengths))
+            if size > MAX_BYTES:
+                raise ValueError(f"больше {MAX_BYTES} байт путей в запросе")
+            return lengths, _read_exact(self.rfile, size)
+        raise ValueError(f"неизвестная операция {op}")
+
+    def _respond(self, status: int, request_id: int, payload: bytes):
+        self.wfile.write(_RESPONSE.pack(status, request_id, len(payload)) + payload)
+
+
+class DecisionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Сервер решений доступа для нескольких процессов на одной машине.
+
+        Args:
+            socket_path: путь Unix-сокета.
+            interval: как часто проверять изменения '.whitelist' (см. ReloadingChecker).
+            mode: права на файл сокета.
+            max_bytes, max_entries: ограничения загруженных правил (см. CheckerRegistry).
+
+    Правила каждой директории загружаются один раз на весь сервер,
+    при первом OP_OPEN, и дальше подхватываются ReloadingChecker.
+    Проверки лежат в CheckerRegistry, поэтому память сервера ограничена,
+    сколько бы директорий ни открывали клиенты. Если правила директории
+    вытеснены, OP_CHECK по ее номеру отвечает статусом 2, и клиент
+    открывает директорию заново (DecisionClient делает это сам).
+    Каждое соединение обслуживается в своем потоке.
+
+    Протокол (little-endian):
+        запрос: u8 операция, u32 номер запроса, u32 номер директории, u32 число, тело;
+            OP_OPEN - тело: путь директории (число - его длина в байтах),
+                ответ: u32 номер директории;
+            OP_CHECK - тело: число длин u32, затем байты путей подряд,
+                ответ: по байту на путь (1 - доступ разрешен);
+        ответ: u8 статус (0 - успех, 1 - ошибка, 2 - неизвестный номер директории),
+            u32 номер запроса, u32 длина, данные; при ошибке данные - текст ошибки.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        interval: float = 1.0,
+        mode: int = 0o600,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int | None = None,
+    ):
+        self.interval = interval
+        self.registry = CheckerRegistry(max_bytes, max_entries, interval)
+        self._lock = threading.Lock()
+        self._handles = {}
+        self._paths = {}
+        self._next_handle = count(1)
+        # Сокет, оставшийся от прошлого запуска, мешает bind
+        try:
+            if stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, mode)
+
+    def open(self, path: str) -> int:
+        """
+        Возвращает номер директории, загружая ее правила при первом обращении.
+        """
+        path = os.path.abspath(path)
+        self.registry.get(path)
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is None:
+                handle = self._handles[path] = next(self._next_handle) & 0xFFFFFFFF
+                self._paths[handle] = path
+                if len(self._paths) > 2 * len(self.registry) + 64:
+                    self._prune()
+            return handle
+
+    def _prune(self):
+        # Номера вытесненных директорий; вызывается под блокировкой.
+        # Таблица номеров растет не больше чем вдвое от числа проверок
+        for handle, path in list(self._paths.items()):
+            if path not in self.registry:
+                del self._paths[handle]
+                del self._handles[path]
+
+    def check(self, handle: int, paths) -> bytearray:
+        path = self._paths.get(handle)
+        if path is None or path not in self.registry:
+            raise UnknownHandleError(f"неизвестная директория {handle}")
+        return self.registry.get(path).check_many(paths)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class RemoteChecker:
+    """
+    Проверка доступа через сервер решений; заменяет функцию из checker(path).
+    Если сервер вытеснил правила директории, она открывается заново
+    и запрос повторяется один раз.
+    """
+
+    __slots__ = ("_client", "_path")
+
+    def __init__(self, client: "DecisionClient", path: str):
+        self._client = client
+        self._path = path
+
+    def _retry(self, method, paths):
+        try:
+            return method(self._client.open(self._path), paths)
+        except UnknownHandleError:
+            self._client.forget(self._path)
+            return method(self._client.open(self._path), paths)
+
+    def __call__(self, file_path: str) -> bool:
+        return bool(self._retry(self._client.check_many, [file_path])[0])
+
+    def check_many(self, paths) -> bytearray:
+        return self._retry(self._client.check_many, paths)
+
+    def check_batches(self, batches) -> list[bytearray]:
+        return self._retry(self._client.check_batches, list(batches))
+
+
+class DecisionClient:
+    """
+    Клиент сервера решений.
+
+        Args:
+            socket_path: путь Unix-сокета сервера.
+            timeout: таймаут операций с сокетом в секундах (None - без таймаута).
+
+        with DecisionClient("/run/whitelist.sock") as client:
+            access_checker = client.checker("/srv/files")
+            access_checker("foo/bar")
+
+    Одно соединение можно делить между потоками: запросы идут по очереди.
+    """
+
+    def __init__(self, socket_path: str, timeout: float | None = None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_path)
+        self._file = self._socket.makefile("rb")
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._handles = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def _send(self, op: int, handle: int, count: int, body: bytes) -> int:
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        self._socket.sendall(_REQUEST.pack(op, self._next_id, handle, count) + body)
+        return self._next_id
+
+    def _receive(self, request_id: int) -> bytes:
+        status, answered_id, size = _RESPONSE.unpack(_read_exact(self._file, _RESPONSE.size))
+        payload = _read_exact(self._file, size)
+        if answered_id != request_id:
+            raise ConnectionError(f"ответ на запрос {answered_id} вместо {request_id}")
+        if status == STATUS_UNKNOWN_HANDLE:
+            raise UnknownHandleError(payload.decode(errors="replace"))
+        if status != STATUS_OK:
+            raise ValueError(payload.decode(errors="replace"))
+        return payload
+
+    def open(self, path: str) -> int:
+        """
+        Возвращает номер директории на сервере.
+        """
+        path = os.path.abspath(path)
+        handle = self._handles.get(path)
+        if handle is None:
+            encoded = os.fsencode(path)
+            with self._lock:
+                payload = self._receive(self._send(OP_OPEN, 0, len(encoded), encoded))
+            (handle,) = _HANDLE.unpack(payload)
+            self._handles[path] = handle
+        return handle
+
+    def checker(self, path: str) -> RemoteChecker:
+        """
+        Возвращает проверку доступа для директории path.
+        """
+        path = os.path.abspath(path)
+        self.open(path)
+        return RemoteChecker(self, path)
+
+    def forget(self, path: str):
+        """
+        Забывает номер директории; следующий open спросит его у сервера.
+        """
+        self._handles.pop(os.path.abspath(path), None)
+
+    def check_many(self, handle: int, paths) -> bytearray:
+        """
+        Проверяет пути одним запросом, см. RuleIndex.check_many.
+        """
+        count, body = encode_paths(paths)
+        with self._lock:
+            return bytearray(self._receive(self._send(OP_CHECK, handle, count, body)))
+
+    def check_batches(self, handle: int, batches) -> list[bytearray]:
+        """
+        Проверяет несколько пачек путей, отправляя запросы, не дожидаясь ответов.
+        Возвращает ответы в порядке пачек.
+        """
+        results = []
+        pending = []
+        waiting = 0
+        errors = []
+
+        def receive(request_id):
+            # Ответ с ошибкой прочитан целиком; остальные ответы тоже нужно
+            # дочитать, иначе следующий запрос получит чужой ответ
+            try:
+                results.append(bytearray(self._receive(request_id)))
+            except ValueError as error:
+                errors.append(error)
+
+        with self._lock:
+            for paths in batches:
+                count, body = encode_paths(paths)
+                while pending and (len(pending) >= PIPELINE_DEPTH or waiting + count > PIPELINE_BYTES):
+                    request_id, size = pending.pop(0)
+                    receive(request_id)
+                    waiting -= size
+                if errors:
+                    break
+                pending.append((self._send(OP_CHECK, handle, count, body), count))
+                waiting += count
+            for request_id, _ in pending:
+                receive(request_id)
+        if errors:
+            raise errors[0]
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер решений доступа '.whitelist' на Unix-сокете.")
+    parser.add_argument("socket", help="путь Unix-сокета")
+    parser.add_argument("--interval", type=float, default=1.0, help="как часто проверять изменения '.whitelist', с")
+    parser.add_argument("--preload", nargs="*", default=[], help="директории, правила которых загрузить сразу")
+    parser.add_argument("--mode", type=lambda value: int(value, 8), default=0o600, help="права на сокет (восьмеричные)")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="бюджет памяти правил, байт")
+    parser.add_argument("--max-entries", type=int, default=None, help="наибольшее число загруженных директорий")
+    args = parser.parse_args(argv)
+
+    with DecisionServer(args.socket, args.interval, args.mode, args.max_bytes, args.max_entries) as server:
+        for path in args.preload:
+            server.open(path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
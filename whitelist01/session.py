@@ -0,0 +1,137 @@
+import contextlib
+import os
+
+from whitelist01.covering import CoverIndex
+from whitelist01.decisions import rules_changed
+from whitelist01.index import RuleIndex
+from whitelist01.locking import locked
+from whitelist01.whitelist_rules import (
+    access_checker_for,
+    add_indexed,
+    load_rules,
+    remove_indexed,
+    save_changes,
+    save_rules,
+)
+
+# После удаления стольких правил индекс покрытия дешевле собрать заново, чем править
+REBUILD_AFTER = 1024
+
+
+class RuleSession:
+    """
+    Серия изменений правил в памяти с одной записью файла.
+
+        Args:
+            whitelist_file: путь до файла '.whitelist'.
+            rules: правила файла на начало сессии.
+            journal: при commit дописать изменения в журнал вместо перезаписи файла.
+
+    add и remove работают так же, как функции add и remove пакета, но меняют
+    только набор в памяти; индекс покрытия строится один раз и дальше
+    обновляется по изменениям. Обычно создается через edit(path).
+    """
+
+    def __init__(self, whitelist_file: str, rules, journal: bool = False):
+        self.whitelist_file = whitelist_file
+        self.journal = journal
+        self._before = frozenset(rules)
+        self._rules = set(self._before)
+        self._index = None
+
+    @property
+    def rules(self) -> frozenset:
+        """
+        Текущие правила сессии, включая незаписанные изменения.
+        """
+        return frozenset(self._rules)
+
+    @property
+    def changed(self) -> bool:
+        return self._rules != self._before
+
+    def _cover_index(self) -> CoverIndex:
+        if self._index is None:
+            self._index = CoverIndex(self._rules)
+        return self._index
+
+    def add(self, rules: list[str]):
+        """
+        Добавляет правила в памяти, см. add.
+        """
+        index = self._cover_index()
+        removed, added = add_indexed(self._rules, index, rules)
+        self._update_index(removed, added)
+
+    def remove(self, rules: list[str]):
+        """
+        Удаляет правила в памяти, см. remove.
+        """
+        removed = remove_indexed(self._rules, self._cover_index(), rules)
+        self._update_index(removed, ())
+
+    def _update_index(self, removed, added):
+        if len(removed) > REBUILD_AFTER:
+            self._index = None
+            return
+        for rule in removed:
+            self._index.discard(rule)
+        for rule in added:
+            self._index.add(rule)
+
+    def checker(self, cache_size: int = 0):
+        """
+        Возвращает функцию проверки доступа по текущим правилам сессии,
+        включая незаписанные изменения; диск не читается.
+        Функция не видит изменений, сделанных после ее создания.
+        """
+        return access_checker_for(RuleIndex(self._rules), cache_size)
+
+    def commit(self):
+        """
+        Записывает изменения сессии (если они есть); сессию можно продолжать.
+        """
+        if not self.changed:
+            return
+        if self.journal:
+            save_changes(self.whitelist_file, self._before, self._rules)
+        else:
+            save_rules(self.whitelist_file, self._rules)
+        rules_changed(self.whitelist_file, self._before, self._rules)
+        self._before = frozenset(self._rules)
+
+    def rollback(self):
+        """
+        Отменяет изменения после последнего commit.
+        """
+        self._rules = set(self._before)
+        self._index = None
+
+
+@contextlib.contextmanager
+def edit(path: str, journal: bool = False):
+    """
+    Сессия изменения правил файла '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            journal: записать изменения в журнал вместо перезаписи файла.
+
+        with edit(path) as session:
+            session.add(["foo/bar"])
+            session.remove(["goo"])
+            access_checker = session.checker()
+
+        Правила читаются один раз в начале, изменения записываются один раз
+        при выходе из блока. Если в блоке возникло исключение, ничего
+        не записывается. Всю сессию файл заблокирован для других писателей.
+    """
+    whitelist_file = os.path.join(path, ".whitelist.txt")
+    with locked(whitelist_file):
+        session = RuleSession(whitelist_file, load_rules(whitelist_file), journal)
+        try:
+            yield session
+        except BaseException:
+            session.rollback()
+            raise
+        session.commit()
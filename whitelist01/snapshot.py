@@ -0,0 +1,313 @@
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+
+from whitelist01.index import EXACT, PREFIX, RuleIndex, classify, prune_prefixes
+from whitelist01.journal import journal_path
+from whitelist01.locking import atomic_write, locked
+from whitelist01.whitelist_rules import load_rules
+
+# Снимок лежит рядом с файлом '.whitelist'
+SNAPSHOT_NAME = ".whitelist.idx"
+MAGIC = b"WLIDX\0"
+VERSION = 2
+
+# Сколько раз перечитать правила, если файл меняется во время чтения
+READ_ATTEMPTS = 3
+
+# magic, версия, sha256 источника, признаки файла и журнала (mtime, размер, inode),
+# смещения таблиц: точные пути, префиксы, все правила, остальные шаблоны;
+# crc32 остальных полей заголовка и всех таблиц
+_HEADER = struct.Struct("<6sH32s6q4QI")
+_CHECKED = _HEADER.size - 4
+_COUNT = struct.Struct("<I")
+_SPAN = struct.Struct("<II")
+
+
+def _encode(text: str) -> bytes:
+    # Порядок байт UTF-8 совпадает с порядком строк Python
+    return text.encode("utf-8", "surrogatepass")
+
+
+def source_signature(whitelist_file: str) -> tuple:
+    """
+    Возвращает признаки файла '.whitelist' и его журнала: mtime, размер, inode (-1 - нет файла).
+    """
+    signature = []
+    for file_path in (whitelist_file, journal_path(whitelist_file)):
+        try:
+            stat = os.stat(file_path)
+            signature += [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        except FileNotFoundError:
+            signature += [-1, -1, -1]
+    return tuple(signature)
+
+
+def source_digest(whitelist_file: str) -> bytes:
+    """
+    Возвращает sha256 содержимого файла '.whitelist' и его журнала.
+    """
+    digest = hashlib.sha256()
+    for file_path in (whitelist_file, journal_path(whitelist_file)):
+        try:
+            with open(file_path, "rb") as file:
+                digest.update(file.read())
+        except FileNotFoundError:
+            pass
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def read_source(whitelist_file: str) -> tuple[tuple, bytes, list[str]]:
+    """
+    Читает правила без блокировки писателей: (признаки, sha256, правила).
+
+        Признаки снимаются до и после чтения. Запись заменяет файл новым
+        (новый inode), журнал только растет, поэтому совпадение признаков
+        значит, что sha256 и правила прочитаны из одной версии. Если файл
+        меняется при каждой из READ_ATTEMPTS попыток, правила читаются
+        под блокировкой файла.
+    """
+    for _ in range(READ_ATTEMPTS):
+        signature = source_signature(whitelist_file)
+        digest = source_digest(whitelist_file)
+        rules = load_rules(whitelist_file)
+        if source_signature(whitelist_file) == signature:
+            return signature, digest, rules
+    with locked(whitelist_file):
+        return source_signature(whitelist_file), source_digest(whitelist_file), load_rules(whitelist_file)
+
+
+def _pack_table(strings: list[str]) -> bytes:
+    # Таблица: число строк, смещения концов строк, байты строк подряд
+    blobs = [_encode(string) for string in strings]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return _COUNT.pack(len(blobs)) + struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(blobs)
+
+
+class _Table:
+    """
+    Отсортированная таблица строк в отображенном файле; подходит для bisect.
+    """
+
+    __slots__ = ("_mm", "_count", "_offsets", "_blob")
+
+    def __init__(self, mm: mmap.mmap, offset: int):
+        self._mm = mm
+        (self._count,) = _COUNT.unpack_from(mm, offset)
+        self._offsets = offset + _COUNT.size
+        self._blob = self._offsets + 4 * (self._count + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start, end = _SPAN.unpack_from(self._mm, self._offsets + 4 * i)
+        return self._mm[self._blob + start : self._blob + end]
+
+    def strings(self) -> list[str]:
+        return [self[i].decode("utf-8", "surrogatepass") for i in range(self._count)]
+
+
+def build_snapshot(path: str) -> str:
+    """
+    Функция сборки снимка правил '.whitelist.idx'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+
+        В снимок попадают готовые структуры проверки: отсортированные точные пути,
+        префиксы без вложенных, все правила (для проверки родительских директорий)
+        и исходники остальных шаблонов. Снимок помечается версией формата,
+        sha256 исходного файла и crc32 собственного содержимого.
+        Правила читаются без блокировки писателей (см. read_source),
+        снимок записывается атомарно.
+        Возвращает путь до снимка.
+    """
+    whitelist_file = os.path.join(path, ".whitelist.txt")
+    signature, digest, rules = read_source(whitelist_file)
+
+    exact = set()
+    prefixes = []
+    patterns = []
+    for rule in rules:
+        kind, key = classify(rule)
+        if kind == EXACT:
+            exact.add(rule)
+        elif kind == PREFIX:
+            prefixes.append(key)
+        else:
+            patterns.append(rule)
+
+    tables = [_pack_table(strings) for strings in (sorted(exact), prune_prefixes(prefixes), sorted(set(rules)), patterns)]
+    offsets = []
+    position = _HEADER.size
+    for table in tables:
+        offsets.append(position)
+        position += len(table)
+    payload = b"".join(tables)
+    header = _HEADER.pack(MAGIC, VERSION, digest, *signature, *offsets, 0)[:_CHECKED]
+    checksum = zlib.crc32(payload, zlib.crc32(header))
+    snapshot_file = os.path.join(path, SNAPSHOT_NAME)
+    atomic_write(snapshot_file, header + struct.pack("<I", checksum) + payload)
+    return snapshot_file
+
+
+class SnapshotIndex:
+    """
+    Проверка доступа прямо по отображенному в память снимку '.whitelist.idx'.
+
+        Args:
+            snapshot_file: путь до снимка.
+
+    Точные пути, префиксы и родительские директории ищутся двоичным поиском
+    по таблицам снимка, а таблицы делятся между процессами через страничный кэш.
+    При открытии снимок один раз прочитывается для проверки crc32:
+    поврежденный снимок дает ValueError, а не неверные ответы. Регулярные выражения
+    собираются только для остальных шаблонов и только при первой проверке.
+    Ответы совпадают с RuleIndex.
+    """
+
+    def __init__(self, snapshot_file: str):
+        with open(snapshot_file, "rb") as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise ValueError(f"{snapshot_file}: файл снимка поврежден")
+        magic, version, self.digest, *rest, checksum = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{snapshot_file}: неизвестный формат снимка")
+        with memoryview(self._mm) as data:
+            actual = zlib.crc32(data[_HEADER.size :], zlib.crc32(data[:_CHECKED]))
+        if actual != checksum:
+            self._mm.close()
+            raise ValueError(f"{snapshot_file}: файл снимка поврежден")
+        self.signature = tuple(rest[:6])
+        self._exact, self._prefixes, self._rules, self._patterns = (_Table(self._mm, offset) for offset in rest[6:])
+        self._pattern_index = None
+        self._full_index = None
+
+    def close(self):
+        self._mm.close()
+
+    def match(self, path: str) -> bool:
+        """
+        Проверяет, подходит ли строка под какое-либо правило.
+        """
+        if "\n" in path:
+            # Редкий случай с переводом строки проверяется полным индексом
+            if self._full_index is None:
+                self._full_index = RuleIndex(self._rules.strings())
+            return self._full_index.match(path)
+        key = _encode(path)
+        i = bisect_left(self._exact, key)
+        if i < len(self._exact) and self._exact[i] == key:
+            return True
+        i = bisect_right(self._prefixes, key)
+        if i and key.startswith(self._prefixes[i - 1]):
+            return True
+        if not len(self._patterns):
+            return False
+        if self._pattern_index is None:
+            self._pattern_index = RuleIndex(self._patterns.strings())
+        return self._pattern_index.match(path)
+
+    def has_descendants(self, path: str) -> bool:
+        """
+        Проверяет, есть ли правило, начинающееся с path + '/'.
+        """
+        key = _encode(path + "/")
+        i = bisect_left(self._rules, key)
+        return i < len(self._rules) and self._rules[i].startswith(key)
+
+    def evaluated(self, path: str) -> int:
+        """
+        Считает шаблоны, которые проверяет match(path), см. RuleIndex.evaluated.
+        """
+        if "\n" in path:
+            if self._full_index is None:
+                self._full_index = RuleIndex(self._rules.strings())
+            return self._full_index.evaluated(path)
+        key = _encode(path)
+        i = bisect_left(self._exact, key)
+        if i < len(self._exact) and self._exact[i] == key:
+            return 0
+        count = 0
+        if len(self._prefixes):
+            count += 1
+            i = bisect_right(self._prefixes, key)
+            if i and key.startswith(self._prefixes[i - 1]):
+                return count
+        if not len(self._patterns):
+            return count
+        if self._pattern_index is None:
+            self._pattern_index = RuleIndex(self._patterns.strings())
+        return count + self._pattern_index.evaluated(path)
+
+    def allows(self, file_path: str) -> bool:
+        """
+        Проверка доступа к файлу/директории, как в access_checker.
+        """
+        normalized_path = file_path.replace("\\", "/").rstrip("/")
+        return self.match(normalized_path) or self.has_descendants(normalized_path)
+
+    def check_many(self, paths) -> bytearray:
+        """
+        Проверяет доступ сразу для списка путей, см. RuleIndex.check_many.
+        """
+        if hasattr(paths, "tolist"):
+            paths = paths.tolist()
+        return bytearray(self.allows(os.fsdecode(path)) for path in paths)
+
+
+def open_snapshot(path: str) -> SnapshotIndex:
+    """
+    Открывает снимок правил директории, пересобирая его при необходимости.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+
+        Снимок считается актуальным, если совпадают признаки файла правил
+        (mtime, размер, inode) или, при их расхождении, sha256 содержимого.
+        Во втором случае (например, add перезаписал файл теми же правилами)
+        в заголовок снимка записываются новые признаки, чтобы следующие
+        открытия снова обходились без чтения файла правил.
+        Содержимое самого снимка проверяется по crc32 при открытии.
+        Отсутствующий, поврежденный или устаревший снимок собирается заново.
+    """
+    whitelist_file = os.path.join(path, ".whitelist.txt")
+    snapshot_file = os.path.join(path, SNAPSHOT_NAME)
+    try:
+        index = SnapshotIndex(snapshot_file)
+    except (FileNotFoundError, ValueError, struct.error):
+        index = None
+    if index is not None:
+        if index.signature == source_signature(whitelist_file):
+            return index
+        # Под блокировкой признаки и sha256 относятся к одной версии файла
+        with locked(whitelist_file):
+            signature = source_signature(whitelist_file)
+            if index.digest == source_digest(whitelist_file):
+                return _resign(snapshot_file, index, signature)
+        index.close()
+    return SnapshotIndex(build_snapshot(path))
+
+
+def _resign(snapshot_file: str, index: SnapshotIndex, signature: tuple) -> SnapshotIndex:
+    # Таблицы не пересобираются: меняются только признаки в заголовке и crc32
+    data = index._mm[:]
+    index.close()
+    magic, version, digest, *rest, _ = _HEADER.unpack_from(data)
+    header = _HEADER.pack(magic, version, digest, *signature, *rest[6:], 0)[:_CHECKED]
+    payload = memoryview(data)[_HEADER.size :]
+    checksum = zlib.crc32(payload, zlib.crc32(header))
+    atomic_write(snapshot_file, header + struct.pack("<I", checksum) + payload)
+    return SnapshotIndex(snapshot_file)
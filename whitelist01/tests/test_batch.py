@@ -0,0 +1,47 @@
+import random
+
+from whitelist01.index import RuleIndex
+from whitelist01.whitelist_rules import add, checker
+
+
+def test_check_many_matches_single_checks():
+    """
+    Пакетная проверка дает те же ответы, что и проверка по одному пути.
+    """
+    rng = random.Random(4)
+    alphabet = ["a", "b", "/", ".", "*", "**", "?", ".log"]
+    rules = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(200)]
+    rules += ["a/*", "b/a", "a\\d"]
+    index = RuleIndex(rules)
+    paths = ["".join(rng.choice(["a", "b", "/", ".", "log", "\\", "1"]) for _ in range(rng.randint(0, 8))) for _ in range(1000)]
+    paths += ["a\n", "b/a\n", "/", ""]
+    result = index.check_many(paths)
+    assert len(result) == len(paths)
+    for path, allowed in zip(paths, result):
+        assert allowed == index.allows(path), path
+
+
+def test_directory_covered_by_prefix():
+    """
+    Директория, целиком покрытая префиксным правилом, разрешает все свои файлы.
+    """
+    index = RuleIndex(["docs/*", "src/main.py", "src/pkg/*.py"])
+    paths = ["docs/a", "docs/b/c", "src/main.py", "src/other.py", "src/pkg/x.py", "src", "src/pkg", "lib"]
+    assert list(index.check_many(paths)) == [1, 1, 1, 0, 1, 1, 1, 0]
+
+
+def test_bytes_paths():
+    """
+    Пути в bytes (например, из массива NumPy с dtype 'S') декодируются.
+    """
+    index = RuleIndex(["foo/bar"])
+    assert list(index.check_many([b"foo/bar", b"foo", b"baz"])) == [1, 1, 0]
+
+
+def test_checker_check_many(tmp_path):
+    """
+    У функции из checker есть пакетный метод.
+    """
+    add(tmp_path, ["foo/*", "bar/baz"])
+    access = checker(tmp_path)
+    assert list(access.check_many(["foo/x", "bar", "bar/qux", "bar\\baz"])) == [1, 1, 0, 1]
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from whitelist01.checkers import ReloadingChecker
+from whitelist01.whitelist_rules import add, remove, save_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_reloads_after_change(temp_dir):
+    """
+    Проверка подхватывает add и remove без повторного вызова checker.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = ReloadingChecker(temp_dir, interval=0)
+    assert access("foo/bar")
+    assert access("foo")
+    assert not access("goo/bat")
+
+    add(temp_dir, ["goo/*"])
+    assert access("goo/bat")
+    remove(temp_dir, ["foo/bar"])
+    assert not access("foo/bar")
+    assert access.loads == 3
+
+
+def test_no_reload_without_change(temp_dir):
+    """
+    Если файл не менялся, индекс не перестраивается.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = ReloadingChecker(temp_dir, interval=0)
+    for _ in range(5):
+        assert access("foo/bar")
+    assert access.loads == 1
+    assert not access.refresh()
+
+
+def test_interval_throttles_checks(temp_dir):
+    """
+    До истечения интервала файл не проверяется, refresh проверяет сразу.
+    Файл меняется в обход add, как из другого процесса: изменения
+    через add этого процесса видны сразу по счетчику версий.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = ReloadingChecker(temp_dir, interval=3600)
+    save_rules(os.path.join(temp_dir, ".whitelist.txt"), {"foo/bar", "goo/bat"})
+    assert not access("goo/bat")
+    assert access.refresh()
+    assert access("goo/bat")
+
+
+def test_missing_file(temp_dir):
+    """
+    Без файла доступ запрещен, появившийся файл подхватывается.
+    """
+    access = ReloadingChecker(temp_dir, interval=0)
+    assert not access("foo")
+    save_rules(os.path.join(temp_dir, ".whitelist.txt"), {"foo"})
+    assert access("foo")
@@ -0,0 +1,93 @@
+import io
+
+import pytest
+
+from whitelist01.cli import filter_paths, main, read_records
+from whitelist01.index import RuleIndex
+from whitelist01.journal import read_journal
+from whitelist01.whitelist_rules import add, checker, load_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+PATHS = ["foo/bar", "foo", "foo\\bar", "foo/bar/", "goo/a.log", "goo", "zoo/x", "/", "docs//", "a.log"]
+
+
+def test_read_records_across_chunks():
+    """
+    Запись, разрезанная границей чтения, собирается целиком; пустые пропускаются.
+    """
+    data = b"alpha\nbeta\n\ngamma-long-record\ndelta"
+    batches = list(read_records(io.BytesIO(data), b"\n", chunk_size=4))
+    assert [record for batch in batches for record in batch] == [b"alpha", b"beta", b"gamma-long-record", b"delta"]
+
+
+def test_filter_matches_checker(temp_dir):
+    """
+    Фильтр выводит те же пути, что пропускает checker, байт в байт.
+    """
+    add(temp_dir, ["foo/bar", "goo/*.log", "docs/*"])
+    access = checker(temp_dir)
+    index = RuleIndex(load_rules(str(temp_dir / ".whitelist.txt")))
+    for separator in (b"\n", b"\0"):
+        source = io.BytesIO(separator.join(path.encode() for path in PATHS) + separator)
+        target = io.BytesIO()
+        total, written = filter_paths(index, source, target, separator)
+        allowed = [path.encode() for path in PATHS if access(path)]
+        assert target.getvalue() == b"".join(path + separator for path in allowed)
+        assert (total, written) == (len(PATHS), len(allowed))
+
+        source.seek(0)
+        target = io.BytesIO()
+        filter_paths(index, source, target, separator, denied=True)
+        denied = [path.encode() for path in PATHS if not access(path)]
+        assert target.getvalue() == b"".join(path + separator for path in denied)
+
+
+def test_check_many_normalized(temp_dir):
+    """
+    check_many с normalized=True отвечает так же для уже нормализованных путей.
+    """
+    index = RuleIndex(["foo/*", "a/b"])
+    paths = ["foo/x", "a", "a/b", "zoo", ""]
+    assert index.check_many(paths, normalized=True) == index.check_many(paths)
+
+
+def test_cli_commands(temp_dir, tmp_path, capsysbinary):
+    """
+    add и remove берут правила из файла, filter печатает разрешенные пути.
+    """
+    rules_file = tmp_path / "rules.txt"
+    rules_file.write_bytes(b"foo/*\r\ngoo\r\n\r\ndocs/a\r\n")
+    assert main(["add", str(temp_dir), str(rules_file)]) == 0
+    assert sorted(load_rules(str(temp_dir / ".whitelist.txt"))) == ["docs/a", "foo/*", "goo"]
+
+    removed = tmp_path / "removed.txt"
+    removed.write_bytes(b"docs\0goo\0")
+    assert main(["remove", str(temp_dir), str(removed), "-0", "--journal"]) == 0
+    assert sorted(load_rules(str(temp_dir / ".whitelist.txt"))) == ["foo/*"]
+
+    paths = tmp_path / "paths.txt"
+    paths.write_bytes(b"foo/a\ngoo\nfoo\n")
+    capsysbinary.readouterr()
+    assert main(["filter", str(temp_dir), "--input", str(paths)]) == 0
+    assert capsysbinary.readouterr().out == b"foo/a\nfoo\n"
+
+
+def test_cli_rules_trimmed_like_load_rules(temp_dir, tmp_path):
+    """
+    Пробелы вокруг правил обрезаются, как в load_rules: журнал получает те же правила, что и от библиотеки.
+    """
+    rules_file = tmp_path / "rules.txt"
+    rules_file.write_bytes(b"  foo/*\t\n goo \n")
+    assert main(["add", str(temp_dir), str(rules_file), "--journal"]) == 0
+    assert read_journal(str(temp_dir / ".whitelist.txt")) == ["+foo/*", "+goo"]
+    removed = tmp_path / "removed.txt"
+    removed.write_bytes(b" goo \0")
+    assert main(["remove", str(temp_dir), str(removed), "-0", "--journal"]) == 0
+    assert load_rules(str(temp_dir / ".whitelist.txt")) == ["foo/*"]
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from whitelist01.compact import CompactRuleIndex
+from whitelist01.index import RuleIndex
+from whitelist01.whitelist_rules import add, checker
+
+
+@pytest.fixture
+def rules_and_paths():
+    rng = random.Random(7)
+    alphabet = ["a", "b", "/", ".", "*", "**", "?", ".log", "\\d", "[ab]"]
+    rules = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))) for _ in range(400)]
+    rules += ["foo/bar", "foo/bar/baz", "docs/*", "**/*.log", "a/*/b", "/abs", "a//b", "x\\.y"]
+    paths = ["".join(rng.choice(["a", "b", "/", ".", "log", "1", "\\"]) for _ in range(rng.randint(0, 8))) for _ in range(1500)]
+    paths += ["foo", "foo/bar", "foo/bar/", "docs", "docs/x", "a\n", "a/b.log\n", "a\nb.log", "", "/", "x.y", "x\\.y"]
+    return rules, paths
+
+
+def test_same_results_as_rule_index(rules_and_paths):
+    """
+    Ответы совпадают с RuleIndex для match, has_descendants, allows и evaluated.
+    """
+    rules, paths = rules_and_paths
+    index = RuleIndex(rules)
+    compact = CompactRuleIndex(rules)
+    for path in paths:
+        normalized_path = path.replace("\\", "/").rstrip("/")
+        assert compact.match(normalized_path) == index.match(normalized_path), path
+        assert compact.has_descendants(normalized_path) == index.has_descendants(normalized_path), path
+        assert compact.allows(path) == index.allows(path), path
+        assert compact.match(path) == index.match(path), path
+        assert compact.evaluated(normalized_path) == index.evaluated(normalized_path), path
+    assert compact.check_many(paths) == index.check_many(paths)
+    assert compact.check_many([path.encode() for path in paths]) == index.check_many(paths)
+
+
+def test_rules_deduplicated():
+    """
+    Повторы правил хранятся один раз, порядок первых вхождений сохраняется.
+    """
+    compact = CompactRuleIndex(["b/*", "a", "b/*", "c/d"])
+    assert len(compact) == 3
+    assert compact.rules() == ["b/*", "a", "c/d"]
+    assert CompactRuleIndex().rules() == []
+    assert not CompactRuleIndex().allows("a")
+
+
+def test_segments_interned():
+    """
+    Одинаковые сегменты хранятся один раз, дерево - в массивах.
+    """
+    rules = [f"shared/{i % 10}/file{i}.txt" for i in range(1000)]
+    compact = CompactRuleIndex(rules)
+    assert len(compact._segment_ids) == 1 + 10 + 1000
+    # Корень, 'shared', 10 директорий и 1000 файлов
+    assert len(compact._edges) == 1 + 1 + 10 + 1000
+    usage = compact.memory_usage()
+    assert usage["total"] == sum(value for name, value in usage.items() if name != "total")
+    assert compact.allows("shared/3/file13.txt")
+    assert compact.allows("shared/3")
+    assert not compact.allows("shared/3/file14.txt")
+
+
+def test_globs_compiled_lazily():
+    """
+    Выражения компилируются только для узлов, до которых дошла проверка.
+    """
+    compact = CompactRuleIndex(["a/x*y", "b/x*y", "c/d"])
+    assert compact.allows("a/xzy")
+    assert list(compact._matchers) == [compact._child(0, "a")]
+    assert not compact.allows("c/xzy")
+    assert len(compact._matchers) == 1
+
+
+def test_checker_compact(tmp_path):
+    """
+    checker(compact=True) отвечает так же, как обычная проверка.
+    """
+    add(str(tmp_path), ["docs/*", "src/main.py", "**/*.log", "a/*/b"])
+    regular = checker(str(tmp_path))
+    compact = checker(str(tmp_path), compact=True)
+    paths = ["docs/x", "src", "src/main.py", "src/other.py", "x/y.log", "a/c/b", "a/c", "b"]
+    assert [compact(path) for path in paths] == [regular(path) for path in paths]
+    assert compact.check_many(paths) == regular.check_many(paths)
@@ -0,0 +1,92 @@
+import os
+import random
+
+import pytest
+
+from whitelist01.covering import CoverIndex, literal_prefix
+from whitelist01.whitelist_rules import add, load_rules, rule_covers, save_rules
+
+
+def reference_add(present_rules, rules):
+    """
+    Прежний алгоритм add: каждое правило сравнивается с каждым через rule_covers.
+    """
+    present_rules = set(present_rules)
+    new_rules = set()
+    rules_to_remove = set()
+    for new_rule in rules:
+        if any(rule_covers(er, new_rule) for er in present_rules):
+            continue
+        if any(rule_covers(nr, new_rule) for nr in new_rules):
+            continue
+        rules_to_remove.update(er for er in present_rules if rule_covers(new_rule, er))
+        rules_to_remove.update(nr for nr in new_rules if rule_covers(new_rule, nr))
+        new_rules = {nr for nr in new_rules if not rule_covers(new_rule, nr)}
+        new_rules.add(new_rule)
+    present_rules.difference_update(rules_to_remove)
+    present_rules.update(new_rules)
+    return present_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_literal_prefix():
+    """
+    Буквальный префикс заканчивается перед первым wildcard.
+    """
+    assert literal_prefix("foo/b*r") == "foo/b"
+    assert literal_prefix("foo/bar") == "foo/bar"
+    assert literal_prefix("*.log") == ""
+
+
+def test_covers_and_covered_by():
+    """
+    Индекс отвечает так же, как rule_covers по всем правилам.
+    """
+    index = CoverIndex(["foo/*", "**/*.log", "a/*/b", "x/y"])
+    assert index.covers("foo/bar")
+    assert index.covers("var/x.log")
+    assert index.covers("a/c/b")
+    assert index.covers("x/y")
+    assert not index.covers("x/z")
+    assert CoverIndex(["foo/bar", "foo/baz/qux", "goo"]).covered_by("foo/*") == {"foo/bar", "foo/baz/qux"}
+
+
+def test_discard():
+    """
+    Удаленное правило больше ничего не покрывает.
+    """
+    index = CoverIndex(["foo/*", "foo/**", "*.log", "a/*/b"])
+    index.discard("foo/*")
+    assert index.covers("foo/bar")
+    index.discard("foo/**")
+    index.discard("*.log")
+    index.discard("a/*/b")
+    assert not index.covers("foo/bar")
+    assert not index.covers("x.log")
+    assert not index.covers("a/c/b")
+    assert len(index) == 0
+
+
+def test_add_same_as_pairwise_algorithm(temp_dir):
+    """
+    add дает тот же набор правил, что и попарное сравнение через rule_covers.
+    """
+    rng = random.Random(9)
+    alphabet = ["a", "b", "/", "*", "**", "?", ".log"]
+
+    def random_rule():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    for _ in range(30):
+        present = {random_rule() for _ in range(rng.randint(0, 15))}
+        new = [random_rule() for _ in range(rng.randint(1, 15))]
+        save_rules(whitelist_file, present)
+        add(temp_dir, new)
+        assert set(load_rules(whitelist_file)) == reference_add(present, new)
@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from whitelist01.checkers import ReloadingChecker
+from whitelist01.decisions import DecisionCache, rules_version
+from whitelist01.whitelist_rules import add, checker, remove
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_cache_counts_and_evicts():
+    """
+    Кэш считает попадания, промахи и вытеснения, хранит не больше maxsize решений.
+    """
+    cache = DecisionCache(maxsize=2)
+    calls = []
+
+    def decide(path):
+        calls.append(path)
+        return path.startswith("foo")
+
+    assert cache.lookup("foo/a", decide)
+    assert cache.lookup("foo/a", decide)
+    assert not cache.lookup("bar", decide)
+    assert cache.lookup("foo/b", decide)
+    # "foo/a" использовался раньше "bar", поэтому вытеснен он
+    assert cache.lookup("foo/a", decide)
+    assert calls == ["foo/a", "bar", "foo/b", "foo/a"]
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions, info.maxsize, info.currsize) == (1, 4, 2, 2, 2)
+
+
+def test_clear_drops_decisions_in_flight():
+    """
+    Решение, посчитанное до clear(), не попадает в кэш.
+    """
+    cache = DecisionCache()
+    assert cache.lookup("foo", lambda path: cache.clear() or True)
+    assert cache.info().currsize == 0
+
+
+def test_checker_cache_matches_uncached(temp_dir):
+    """
+    Ответы с кэшем совпадают с ответами без кэша; ключ - нормализованный путь.
+    """
+    add(temp_dir, ["foo/bar", "docs/*.md", "src/**/test_?.py"])
+    plain = checker(temp_dir)
+    cached = checker(temp_dir, cache_size=16)
+    paths = ["foo", "foo/bar", "foo/baz", "docs/a.md", "docs/a.txt", "src/x/test_1.py", "src", "other"]
+    random.seed(3)
+    for path in random.choices(paths, k=200):
+        assert cached(path) == plain(path)
+    assert cached("foo\\bar\\") == plain("foo\\bar\\")
+    info = cached.cache_info()
+    assert info.misses == len(paths)
+    assert info.hits == 201 - len(paths)
+    assert list(cached.check_many(paths)) == list(plain.check_many(paths))
+
+
+def test_add_remove_bump_version(temp_dir):
+    """
+    add и remove увеличивают счетчик версии правил файла.
+    """
+    version = rules_version(temp_dir / ".whitelist.txt")
+    start = version.value
+    add(temp_dir, ["foo"])
+    remove(temp_dir, ["foo"])
+    assert version.value == start + 2
+
+
+def test_reloading_checker_cache_invalidated(temp_dir):
+    """
+    Перестройка индекса после add/remove сбрасывает кэш решений.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = ReloadingChecker(temp_dir, interval=0, cache_size=16)
+    assert access("foo/bar")
+    assert access("foo/bar")
+    assert not access("goo/bat")
+    assert access.cache.info().hits == 1
+
+    add(temp_dir, ["goo/*"])
+    assert access("goo/bat")
+    remove(temp_dir, ["foo/bar"])
+    assert not access("foo/bar")
+    assert not access("foo")
+
+
+def test_reloading_checker_sees_same_signature_change(temp_dir, monkeypatch):
+    """
+    Изменение через add замечается по версии, даже если признаки файла совпали.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = ReloadingChecker(temp_dir, interval=0, cache_size=16)
+    assert not access("goo/bat")
+    monkeypatch.setattr("whitelist01.checkers.file_signature", lambda path: None)
+    access.refresh(force=True)
+    add(temp_dir, ["goo/bat"])
+    assert access("goo/bat")
+
+
+def test_reloading_checker_sees_change_before_interval(temp_dir):
+    """
+    Изменение через add/remove видно сразу, не дожидаясь interval.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = ReloadingChecker(temp_dir, cache_size=100)
+    assert access("foo/bar")
+    assert not access("baz")
+    assert access.check_many(["foo/bar", "baz"]) == bytearray([1, 0])
+    remove(temp_dir, ["foo/bar"])
+    add(temp_dir, ["baz"])
+    assert not access("foo/bar")
+    assert access("baz")
+    assert access.check_many(["foo/bar", "baz"]) == bytearray([0, 1])
+    assert access.rule_count() == 1
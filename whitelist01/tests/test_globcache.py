@@ -0,0 +1,69 @@
+import random
+
+from whitelist01 import globcache
+from whitelist01.globcache import GlobCache, translate
+from whitelist01.matcher import glob_tokens
+from whitelist01.whitelist_rules import rule_covers
+
+
+def char_by_char(pattern):
+    """
+    Прежняя посимвольная сборка выражения из glob_to_regex.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c in ".^$+{}[]|()":
+            regex += "\\" + c
+        elif c == "*":
+            if (i + 1) < len(pattern) and pattern[i + 1] == "*":
+                i += 1
+            regex += ".*"
+        elif c == "?":
+            regex += "."
+        else:
+            regex += c
+        i += 1
+    return "^" + regex + "$"
+
+
+def test_translate_same_as_char_by_char():
+    """
+    Однопроходный перевод дает то же выражение, что и посимвольная сборка.
+    """
+    rng = random.Random(1)
+    alphabet = "ab/*?.^$+{}[]|()\\-"
+    for _ in range(500):
+        pattern = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 10)))
+        assert translate(pattern) == char_by_char(pattern)
+        assert "^" + "".join(glob_tokens(pattern)) + "$" == char_by_char(pattern)
+
+
+def test_lru_eviction_and_stats():
+    """
+    Кэш вытесняет давно не использованный шаблон и считает попадания и промахи.
+    """
+    cache = GlobCache(maxsize=2)
+    first = cache.compile("a*")
+    cache.compile("b*")
+    assert cache.compile("a*") is first
+    cache.compile("c*")  # вытесняет 'b*'
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 3, 1, 2)
+    cache.compile("b*")
+    assert cache.info().misses == 4
+    cache.resize(0)
+    assert cache.info().currsize == 0
+
+
+def test_shared_cache_used_by_rule_covers():
+    """
+    rule_covers берет выражение из общего кэша, а не компилирует его заново.
+    """
+    globcache.clear_cache()
+    assert rule_covers("foo/*", "foo/bar")
+    assert rule_covers("foo/*", "foo/baz")
+    info = globcache.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
@@ -0,0 +1,55 @@
+import random
+
+from whitelist01.index import EXACT, GLOB, PREFIX, SUFFIX, RuleIndex, classify, prune_prefixes
+from whitelist01.whitelist_rules import glob_to_regex
+
+
+def test_classify():
+    """
+    Правила раскладываются по видам по своей форме.
+    """
+    assert classify("foo/bar") == (EXACT, "foo/bar")
+    assert classify("foo/*") == (PREFIX, "foo/")
+    assert classify("foo/**") == (PREFIX, "foo/")
+    assert classify("*") == (PREFIX, "")
+    assert classify("*.log") == (SUFFIX, (".log", False))
+    assert classify("**/*.log") == (SUFFIX, (".log", True))
+    assert classify("foo/*/bar") == (GLOB, "foo/*/bar")
+    assert classify("*foo") == (GLOB, "*foo")
+
+
+def test_prune_prefixes():
+    """
+    Префиксы, которые начинаются с другого префикса, отбрасываются.
+    """
+    assert prune_prefixes(["foo/bar/", "foo/", "fo", "x"]) == ["fo", "x"]
+
+
+def test_bucket_lookups():
+    """
+    Каждый вид правил находит свои пути.
+    """
+    index = RuleIndex(["foo/bar", "docs/*", "**/*.log", "a/*/b"])
+    assert index.match("foo/bar")
+    assert index.match("docs/x/y")
+    assert index.match("var/x.log")
+    assert not index.match("x.log")
+    assert index.match("a/c/b")
+    assert not index.match("a/c/d")
+    assert index.has_descendants("foo")
+    assert index.has_descendants("a/*")
+
+
+def test_same_results_as_rule_scan():
+    """
+    Ответы совпадают с перебором glob_to_regex по всем правилам.
+    """
+    rng = random.Random(5)
+    alphabet = ["a", "b", "/", ".", "*", "**", "?", ".log", "\\d"]
+    rules = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(250)]
+    index = RuleIndex(rules)
+    paths = ["".join(rng.choice(["a", "b", "/", ".", "log", "1"]) for _ in range(rng.randint(0, 7))) for _ in range(800)]
+    paths += ["a\n", "a/b.log\n", "a\nb.log"]
+    for path in paths:
+        assert index.match(path) == any(glob_to_regex(rule).match(path) for rule in rules), path
+        assert index.has_descendants(path) == any(rule.startswith(path + "/") for rule in rules), path
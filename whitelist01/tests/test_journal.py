@@ -0,0 +1,142 @@
+import os
+
+import pytest
+
+from whitelist01 import journal, whitelist_rules
+from whitelist01.checkers import ReloadingChecker
+from whitelist01.journal import journal_path, read_journal, replay
+from whitelist01.whitelist_rules import add, checker, load_rules, remove, save_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_replay():
+    """
+    Записи журнала применяются по порядку.
+    """
+    assert replay(["a", "b"], ["-a", "+c", "+a", "-b"]) == ["c", "a"]
+
+
+def test_journaled_add_and_remove(temp_dir):
+    """
+    В журнальном режиме основной файл не переписывается, а загрузка видит все изменения.
+    """
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    add(temp_dir, ["foo/bar", "goo/bat"])
+    with open(whitelist_file, "rb") as file:
+        base = file.read()
+
+    add(temp_dir, ["foo/*"], journal=True)
+    remove(temp_dir, ["goo/bat"], journal=True)
+    with open(whitelist_file, "rb") as file:
+        assert file.read() == base
+    assert read_journal(whitelist_file) == ["-foo/bar", "+foo/*", "-goo/bat"]
+    assert set(load_rules(whitelist_file)) == {"foo/*"}
+
+    access = checker(temp_dir)
+    assert access("foo/baz")
+    assert not access("goo/bat")
+
+
+def test_full_save_discards_journal(temp_dir):
+    """
+    Обычная запись сохраняет все правила и удаляет журнал.
+    """
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    add(temp_dir, ["foo/bar"], journal=True)
+    add(temp_dir, ["goo/bat"])
+    assert not os.path.exists(journal_path(whitelist_file))
+    assert set(load_rules(whitelist_file)) == {"foo/bar", "goo/bat"}
+
+
+def test_compaction(temp_dir, monkeypatch):
+    """
+    После порога числа записей журнал сворачивается в основной файл.
+    """
+    monkeypatch.setattr(journal, "MAX_JOURNAL_RECORDS", 3)
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    add(temp_dir, ["a", "b"], journal=True)
+    assert os.path.exists(journal_path(whitelist_file))
+    add(temp_dir, ["c"], journal=True)
+    assert not os.path.exists(journal_path(whitelist_file))
+    with open(whitelist_file, encoding="utf-8") as file:
+        assert file.read().splitlines() == ["a", "b", "c"]
+
+
+def test_torn_record_ignored(temp_dir):
+    """
+    Недописанная последняя запись журнала не применяется.
+    """
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    add(temp_dir, ["a"], journal=True)
+    with open(journal_path(whitelist_file), "a", encoding="utf-8") as file:
+        file.write("+b")
+    assert load_rules(whitelist_file) == ["a"]
+
+
+def test_reloading_checker_sees_journal(temp_dir):
+    """
+    Перезагружаемая проверка замечает изменения, записанные только в журнал.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = ReloadingChecker(temp_dir, interval=0)
+    add(temp_dir, ["goo/bat"], journal=True)
+    assert access("goo/bat")
+
+
+def test_journaled_changes_reuse_cached_rules(temp_dir, monkeypatch):
+    """
+    Повторные журнальные изменения не перечитывают правила, а результат совпадает с полной записью.
+    """
+    reference = temp_dir / "reference"
+    reference.mkdir()
+    add(temp_dir, ["foo/bar", "goo/bat", "docs/a", "docs/b"], journal=True)
+    add(reference, ["foo/bar", "goo/bat", "docs/a", "docs/b"])
+    loads = []
+    original_load = whitelist_rules.load_rules
+    monkeypatch.setattr(whitelist_rules, "load_rules", lambda path: loads.append(path) or original_load(path))
+    for op, rules in [("add", ["docs"]), ("remove", ["goo"]), ("add", ["foo/*", "x/y"]), ("remove", ["docs"]), ("add", ["docs/a"])]:
+        getattr(whitelist_rules, op)(temp_dir, rules, journal=True)
+        getattr(whitelist_rules, op)(reference, rules)
+        assert sorted(original_load(os.path.join(temp_dir, ".whitelist.txt"))) == sorted(
+            original_load(os.path.join(reference, ".whitelist.txt"))
+        )
+    assert os.path.join(temp_dir, ".whitelist.txt") not in loads
+
+
+def test_foreign_write_invalidates_cached_rules(temp_dir):
+    """
+    Запись файла в обход журнального режима не теряется при следующем журнальном изменении.
+    """
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    add(temp_dir, ["foo/bar"], journal=True)
+    save_rules(whitelist_file, ["foo/bar", "zoo"])
+    add(temp_dir, ["goo"], journal=True)
+    assert sorted(load_rules(whitelist_file)) == ["foo/bar", "goo", "zoo"]
+    add(temp_dir, ["moo"])
+    remove(temp_dir, ["zoo"], journal=True)
+    assert sorted(load_rules(whitelist_file)) == ["foo/bar", "goo", "moo"]
+
+
+def test_append_counts_records_without_reading(temp_dir, monkeypatch):
+    """
+    Журнал не перечитывается при каждой записи, а чужие записи в нем учитываются.
+    """
+    monkeypatch.setattr(journal, "MAX_JOURNAL_RECORDS", 5)
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    reads = []
+    original_read = journal.read_journal
+    monkeypatch.setattr(journal, "read_journal", lambda path: reads.append(path) or original_read(path))
+    assert not journal.append_delta(whitelist_file, [], ["a", "b"])
+    assert not journal.append_delta(whitelist_file, ["a"], [])
+    assert reads == []
+    # Запись другого процесса: число записей берется из самого журнала
+    with open(journal_path(whitelist_file), "a", encoding="utf-8", newline="\n") as file:
+        file.write("+c\n")
+    assert journal.append_delta(whitelist_file, [], ["d"])
+    assert len(reads) == 1
@@ -0,0 +1,235 @@
+import random
+import threading
+
+import pytest
+
+from whitelist01.checkers import LiveChecker
+from whitelist01.index import RuleIndex
+from whitelist01.optimize import optimize
+from whitelist01.session import edit
+from whitelist01.trie import RuleTrie
+from whitelist01.whitelist_rules import add, remove, save_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+NAMES = ["foo", "goo", "docs", "a", "a.log", "b.txt"]
+PATTERNS = ["*", "**", "*.log", "?.txt", "a*", "**/*.log"]
+
+
+def random_rule(rng):
+    parts = [rng.choice(NAMES) for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.6:
+        parts[-1] = rng.choice(PATTERNS)
+    return "/".join(parts)
+
+
+def probe_paths():
+    paths = set()
+    for first in NAMES:
+        paths.add(first)
+        for second in NAMES:
+            paths.add(f"{first}/{second}")
+            for third in NAMES:
+                paths.add(f"{first}/{second}/{third}")
+    return sorted(paths)
+
+
+def test_incremental_index_matches_rebuild():
+    """
+    Индекс после add_rule и discard_rule отвечает так же, как собранный заново.
+    """
+    rng = random.Random(19)
+    paths = probe_paths()
+    index = RuleIndex([])
+    rules = set()
+    for step in range(300):
+        rule = random_rule(rng)
+        if rules and rng.random() < 0.4:
+            rule = rng.choice(sorted(rules))
+            index.discard_rule(rule)
+            rules.discard(rule)
+        else:
+            index.add_rule(rule)
+            rules.add(rule)
+        if step % 10 == 0:
+            fresh = RuleIndex(rules)
+            assert len(index) == len(rules)
+            for path in paths:
+                assert index.match(path) == fresh.match(path), (path, sorted(rules))
+                assert index.has_descendants(path) == fresh.has_descendants(path), (path, sorted(rules))
+                assert index.allows(path) == fresh.allows(path), (path, sorted(rules))
+
+
+def test_discard_restores_shadowed_prefix():
+    """
+    После удаления короткого префикса снова работают более длинные, которые он закрывал.
+    """
+    index = RuleIndex(["foo/*", "foo/bar/*"])
+    assert index.allows("foo/goo")
+    index.discard_rule("foo/*")
+    assert not index.allows("foo/goo")
+    assert index.allows("foo/bar/goo")
+    index.add_rule("foo/*")
+    assert index.allows("foo/goo")
+
+
+def test_trie_remove_prunes_nodes():
+    """
+    Удаление правила из дерева убирает его glob-часть и опустевшие узлы.
+    """
+    trie = RuleTrie()
+    trie.insert("foo/bar/*.log")
+    trie.insert("foo/*.txt")
+    trie.remove("foo/bar/*.log")
+    assert not trie.match("foo/bar/a.log")
+    assert trie.match("foo/a.txt")
+    assert not trie.has_descendants("foo/bar")
+    trie.remove("foo/*.txt")
+    assert not trie.has_descendants("foo")
+
+
+def test_live_checker_follows_changes(temp_dir):
+    """
+    Проверка видит изменения add, remove, сессий и optimize без перечитывания файла.
+    """
+    add(temp_dir, ["foo/bar"])
+    live = LiveChecker(temp_dir)
+    assert live("foo/bar")
+    assert not live("goo/a")
+
+    add(temp_dir, ["goo/*"])
+    assert live("goo/a")
+
+    remove(temp_dir, ["foo"])
+    assert not live("foo/bar")
+
+    with edit(temp_dir) as session:
+        session.add(["docs/*.md"])
+        assert not live("docs/a.md")
+    assert live("docs/a.md")
+
+    live.add(["x/*"])
+    assert live("x/y")
+    live.remove(["x/"])
+    assert not live("x/y")
+
+    # add не записывает правило, покрытое 'goo/*', поэтому файл пишется напрямую
+    save_rules(live.whitelist_file, {"goo/*", "goo/a", "docs/*.md"})
+    live.refresh()
+    assert optimize(temp_dir).written
+    assert "goo/a" not in live._index
+    assert live("goo/a")
+    assert live.updates == 6
+
+
+def test_live_checker_refresh_and_close(temp_dir):
+    """
+    Изменения мимо функций пакета видны после refresh(); после close() изменения не приходят.
+    """
+    add(temp_dir, ["foo/bar"])
+    live = LiveChecker(temp_dir)
+    save_rules(live.whitelist_file, {"goo"})
+    assert live("foo/bar")
+    live.refresh()
+    assert not live("foo/bar")
+    assert live("goo")
+
+    live.close()
+    add(temp_dir, ["docs"])
+    assert not live("docs")
+    assert live.check_many(["goo", "docs"]) == bytearray([1, 0])
+
+
+def test_copy_leaves_original_unchanged():
+    """
+    Изменения копии индекса не видны в оригинале, общие узлы дерева не меняются.
+    """
+    rng = random.Random(20)
+    paths = probe_paths()
+    rules = {random_rule(rng) for _ in range(60)}
+    original = RuleIndex(rules)
+    answers = [original.allows(path) for path in paths]
+    copy = original.copy()
+    for rule in sorted(rules)[::2]:
+        copy.discard_rule(rule)
+    for _ in range(30):
+        copy.add_rule(random_rule(rng))
+    assert [original.allows(path) for path in paths] == answers
+    assert len(original) == len(rules)
+    fresh = RuleIndex(rule for rule in copy._rules)
+    assert [copy.allows(path) for path in paths] == [fresh.allows(path) for path in paths]
+
+
+def test_live_checker_shares_base_index(temp_dir):
+    """
+    Изменение не копирует основной индекс: старый снимок не меняется.
+    """
+    add(temp_dir, ["foo/*", "bar"])
+    live = LiveChecker(temp_dir)
+    before = live.snapshot()
+    live.apply(["bar"], ["baz/*"])
+    after = live.snapshot()
+    assert after.base is before.base
+    assert before.allows("bar")
+    assert not after.allows("bar")
+    assert after.allows("baz/x") and not before.allows("baz/x")
+
+
+def test_live_checker_inside_edit_session(temp_dir):
+    """
+    LiveChecker создается и перечитывает правила внутри сессии edit без взаимной блокировки.
+    """
+    add(temp_dir, ["foo/bar"])
+    result = []
+
+    def run():
+        with edit(temp_dir) as session:
+            live = LiveChecker(temp_dir)
+            live.refresh()
+            session.add(["goo/*"])
+        result.append(live("foo/bar") and live("goo/a"))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert result == [True]
+
+
+def test_live_checker_concurrent_readers(temp_dir):
+    """
+    Читатели из нескольких потоков не видят частично примененных изменений.
+    """
+    add(temp_dir, ["foo/*", "docs/*.md"])
+    live = LiveChecker(temp_dir)
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            index = live.snapshot()
+            # Оба правила добавляются и удаляются одним изменением
+            if index.allows("toggle/a/x") != index.allows("toggle/b/y.log"):
+                errors.append("partial")
+            if not live("foo/bar") or live("goo"):
+                errors.append("stable")
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        for _ in range(200):
+            live.apply((), ["toggle/a/*", "toggle/b/*.log"])
+            live.apply(["toggle/a/*", "toggle/b/*.log"], ())
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+    assert not errors
+    assert live.updates == 400
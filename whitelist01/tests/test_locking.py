@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from whitelist01 import whitelist_rules
+from whitelist01.locking import atomic_write, locked
+from whitelist01.whitelist_rules import add, load_rules, remove
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def add_many(path, worker, count, group_window):
+    for i in range(count):
+        add(path, [f"w{worker}/r{i}"], group_window=group_window)
+
+
+def test_atomic_write_keeps_mode_and_leaves_no_temp_files(temp_dir):
+    """
+    Атомарная запись заменяет файл целиком, сохраняет права и не оставляет временных файлов.
+    """
+    path = os.path.join(temp_dir, ".whitelist.txt")
+    atomic_write(path, "a\n")
+    os.chmod(path, 0o640)
+    atomic_write(path, "b\n")
+    with open(path, encoding="utf-8") as file:
+        assert file.read() == "b\n"
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert sorted(os.listdir(temp_dir)) == [".whitelist.txt"]
+
+
+@pytest.mark.parametrize("group_window", [None, 0.01])
+def test_concurrent_processes_do_not_lose_updates(temp_dir, group_window):
+    """
+    Изменения нескольких процессов не теряются.
+    """
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=add_many, args=(str(temp_dir), worker, 10, group_window)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+    rules = set(load_rules(os.path.join(temp_dir, ".whitelist.txt")))
+    assert rules == {f"w{worker}/r{i}" for worker in range(4) for i in range(10)}
+
+
+def test_group_commit_batches_writers(temp_dir, monkeypatch):
+    """
+    Изменения писателей, пришедшие за окно, записываются меньшим числом перезаписей.
+    """
+    saves = []
+    save_rules = whitelist_rules.save_rules
+
+    def counting_save_rules(path, rules):
+        saves.append(len(rules))
+        save_rules(path, rules)
+
+    monkeypatch.setattr(whitelist_rules, "save_rules", counting_save_rules)
+    barrier = threading.Barrier(8)
+
+    def writer(i):
+        barrier.wait()
+        add(temp_dir, [f"r{i}"], group_window=0.2)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(load_rules(os.path.join(temp_dir, ".whitelist.txt"))) == {f"r{i}" for i in range(8)}
+    assert len(saves) < 8
+
+    remove(temp_dir, ["r0"], group_window=0)
+    assert "r0" not in load_rules(os.path.join(temp_dir, ".whitelist.txt"))
+
+
+def test_locked_is_reentrant_within_thread(temp_dir):
+    """
+    Вложенный locked того же файла в том же потоке не ждет сам себя,
+    другой поток ждет выхода из внешнего уровня.
+    """
+    path = os.path.join(temp_dir, ".whitelist.txt")
+    entered = threading.Event()
+
+    def other():
+        with locked(path):
+            entered.set()
+
+    with locked(path):
+        with locked(path):
+            thread = threading.Thread(target=other)
+            thread.start()
+        # Внутренний уровень закрыт, но файл еще заблокирован внешним
+        assert not entered.wait(0.2)
+    thread.join(5)
+    assert entered.is_set()
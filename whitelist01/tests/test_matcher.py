@@ -0,0 +1,65 @@
+import random
+
+from whitelist01.matcher import RuleMatcher, build_pattern
+from whitelist01.whitelist_rules import glob_to_regex
+
+
+def per_rule_match(rules, path):
+    return any(glob_to_regex(rule).match(path) for rule in rules)
+
+
+def test_empty_rules_never_match():
+    """
+    Пустой набор правил ничего не пропускает.
+    """
+    assert build_pattern([]) is None
+    matcher = RuleMatcher([])
+    assert not matcher.match("")
+    assert not matcher.match("foo")
+
+
+def test_shared_prefixes_are_factored():
+    """
+    Общий префикс правил выносится за скобки, а не повторяется в каждой ветке.
+    """
+    pattern = build_pattern(["foo/bar", "foo/baz", "foo/ba"])
+    assert pattern.pattern.count("foo") == 1
+    assert pattern.match("foo/ba")
+    assert pattern.match("foo/baz")
+    assert not pattern.match("foo/b")
+
+
+def test_glob_rules():
+    """
+    '*' и '**' совпадают с любой строкой, '?' - с одним символом.
+    """
+    matcher = RuleMatcher(["foo/*", "a/**/b", "x?z", "v1.0"])
+    assert matcher.match("foo/bar/baz")
+    assert matcher.match("a/c/d/b")
+    assert matcher.match("xyz")
+    assert not matcher.match("xz")
+    assert matcher.match("v1.0")
+    assert not matcher.match("v1x0")
+
+
+def test_backslash_rule_kept_separate():
+    """
+    Правило с '\\' проверяется так же, как отдельным glob_to_regex.
+    """
+    rules = ["a\\d", "b"]
+    matcher = RuleMatcher(rules)
+    for path in ["a1", "a\\d", "b", "ab"]:
+        assert matcher.match(path) == per_rule_match(rules, path)
+
+
+def test_same_results_as_per_rule_matching():
+    """
+    Объединенный автомат дает те же ответы, что и перебор правил.
+    """
+    rng = random.Random(7)
+    alphabet = ["a", "b", "/", ".", "*", "**", "?", "(", "["]
+    rules = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))) for _ in range(200)]
+    matcher = RuleMatcher(rules)
+    for _ in range(500):
+        path = "".join(rng.choice("ab/.([") for _ in range(rng.randint(0, 7)))
+        assert matcher.match(path) == per_rule_match(rules, path)
@@ -0,0 +1,110 @@
+import pytest
+
+from whitelist01 import metrics
+from whitelist01.checkers import ReloadingChecker
+from whitelist01.index import RuleIndex
+from whitelist01.metrics import Histogram, MetricsRegistry
+from whitelist01.whitelist_rules import add, checker, remove
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    previous = metrics.install(registry)
+    yield registry
+    metrics.install(previous)
+
+
+def test_disabled_by_default(temp_dir):
+    """
+    Без приемника события не создаются, проверки работают как обычно.
+    """
+    add(temp_dir, ["foo/bar"])
+    access = checker(temp_dir)
+    assert metrics.sink is None
+    metrics.emit("lookup", duration_ns=1)
+    assert access("foo/bar")
+
+
+def test_lookup_counters(temp_dir, registry):
+    """
+    Проверки считаются по результату, задержка и число шаблонов попадают в гистограммы.
+    """
+    add(temp_dir, ["foo/bar", "docs/*", "src/*/x?.py"])
+    access = checker(temp_dir)
+    assert access("foo/bar")
+    assert access("src/a/x1.py")
+    assert not access("other")
+    assert list(access.check_many(["foo/bar", "other"])) == [1, 0]
+
+    snapshot = registry.snapshot()
+    counters = snapshot["counters"]
+    assert counters["lookup"] == 3
+    assert counters["lookup.allow"] == 2
+    assert counters["lookup.deny"] == 1
+    assert counters["check_many"] == 1
+    assert counters["checker_build.index"] == 1
+    assert counters["add"] == 1
+    assert snapshot["histograms"]["lookup.duration_ns"]["count"] == 3
+    assert snapshot["histograms"]["lookup.patterns"]["max"] == 2
+    assert snapshot["histograms"]["check_many.allowed"]["total"] == 1
+
+
+def test_load_and_save_bytes(temp_dir, registry):
+    """
+    Чтение и запись сообщают длительность, размер в байтах и число правил.
+    """
+    add(temp_dir, ["foo/bar", "goo"])
+    remove(temp_dir, ["goo"], journal=True)
+    histograms = registry.snapshot()["histograms"]
+    counters = registry.snapshot()["counters"]
+    assert counters["save.full"] == 1
+    assert counters["save.journal"] == 1
+    assert histograms["save.bytes"]["total"] == len("foo/bar\ngoo\n") + len("-goo\n")
+    assert histograms["load.rules"]["max"] == 2
+    assert histograms["remove.rules"]["count"] == 1
+
+
+def test_reloading_checker_events(temp_dir, registry):
+    """
+    Долгоживущая проверка сообщает о перестройке индекса и о проверках.
+    """
+    add(temp_dir, ["foo/*"])
+    access = ReloadingChecker(temp_dir, interval=0, cache_size=4)
+    assert access("foo/bar")
+    counters = registry.snapshot()["counters"]
+    assert counters["checker_build.reload"] == 1
+    assert counters["lookup.allow"] == 1
+    # Для кэша решений число шаблонов не считается
+    assert "lookup.patterns" not in registry.snapshot()["histograms"]
+
+
+def test_evaluated_counts_patterns():
+    """
+    Число проверенных шаблонов по уровням индекса.
+    """
+    index = RuleIndex(["foo/bar", "docs/*", "*.log", "src/*/x?.py", "src/*/y?.py"])
+    assert index.evaluated("foo/bar") == 0
+    assert index.evaluated("docs/a") == 1
+    assert index.evaluated("a.log") == 2
+    assert index.evaluated("src/a/x1.py") == 3
+    assert index.evaluated("other") == 1
+
+
+def test_histogram_percentiles():
+    """
+    Перцентили оцениваются сверху по корзинам степеней двойки.
+    """
+    histogram = Histogram()
+    for value in [0, 1, 3, 5, 100]:
+        histogram.observe(value)
+    assert histogram.percentile(50) == 3
+    assert histogram.percentile(90) == 100
+    assert histogram.as_dict()["min"] == 0
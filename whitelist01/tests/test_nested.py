@@ -0,0 +1,125 @@
+import os
+
+import pytest
+
+from whitelist01.nested import NestedChecker, find_whitelists
+from whitelist01.whitelist_rules import add, checker, remove
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "c").mkdir()
+    add(root, ["top.txt", "*.md"])
+    add(root / "a", ["x/*"])
+    add(root / "a" / "b", ["deep.log"])
+    return root
+
+
+def test_find_whitelists(tree):
+    assert find_whitelists(str(tree)) == ["a", "a/b"]
+
+
+def test_rules_scoped_to_subtree(tree):
+    """
+    Правила поддиректории действуют только в ее поддереве, правила корня - везде.
+    """
+    access = checker(str(tree), nested=True)
+    assert access("top.txt")
+    assert access("a/b/readme.md")
+    assert access("a/x/file")
+    assert not access("x/file")
+    assert not access("c/x/file")
+    assert access("a/b/deep.log")
+    assert not access("a/deep.log")
+    assert not access("deep.log")
+    # Поддиректории с правилами и их предки - родители разрешенных путей
+    assert access("a")
+    assert access("a/b")
+    assert access("a\\x\\file\\")
+    assert not access("c")
+    assert access.check_many(["a/x/1", "c/1", b"a/b/deep.log"]) == bytearray([1, 0, 1])
+
+
+def test_nested_matches_flattened_rules(tree):
+    """
+    Ответы совпадают с одним файлом, в котором правила поддиректорий записаны с префиксом.
+    """
+    flat = tree.parent / "flat"
+    flat.mkdir()
+    add(flat, ["top.txt", "*.md", "a/x/*", "a/b/deep.log"])
+    flat_access = checker(str(flat))
+    nested_access = NestedChecker(str(tree))
+    paths = ["top.txt", "a", "a/b", "a/x", "a/x/y", "a/b/deep.log", "a/b/c.md", "c", "c/d", "a/y", "a/b/x/y"]
+    assert [nested_access(path) for path in paths] == [flat_access(path) for path in paths]
+
+
+def test_edit_reloads_only_its_scope(tree):
+    """
+    Изменение файла поддиректории перечитывает только ее набор правил.
+    """
+    access = NestedChecker(str(tree), interval=0)
+    assert not access("a/b/new.log")
+    loads = {scope: access._scopes[scope].loads for scope in access.scopes()}
+    add(tree / "a" / "b", ["new.log"])
+    assert access("a/b/new.log")
+    assert access._scopes["a/b"].loads == loads["a/b"] + 1
+    assert access._scopes[""].loads == loads[""]
+    assert access._scopes["a"].loads == loads["a"]
+
+    remove(tree / "a" / "b", ["new.log", "deep.log"])
+    assert not access("a/b/deep.log")
+    # В 'a/b' правил не осталось, но 'a' еще разрешает 'a/x/*'
+    assert not access("a/b")
+    assert access("a")
+
+
+def test_rescan_sees_new_files(tree):
+    """
+    Новый '.whitelist' в поддиректории виден после rescan().
+    """
+    access = NestedChecker(str(tree))
+    assert not access("c/new")
+    add(tree / "c", ["new"])
+    assert not access("c/new")
+    access.rescan()
+    assert access("c/new")
+    assert access("c")
+    os.remove(tree / "c" / ".whitelist.txt")
+    access.rescan()
+    assert not access("c/new")
+
+
+def test_path_root(tree):
+    """
+    Корень, переданный как Path, не считается своей поддиректорией.
+    """
+    assert find_whitelists(tree) == ["a", "a/b"]
+    access = NestedChecker(tree)
+    assert access.scopes() == ["", "a", "a/b"]
+    assert not access(".")
+    assert access("top.txt")
+
+
+def test_rescan_subtree(tree):
+    """
+    rescan(directory) обходит только поддерево и не трогает остальные наборы правил.
+    """
+    (tree / "d").mkdir()
+    access = NestedChecker(str(tree))
+    scope_a = access._scopes["a"]
+    add(tree / "c", ["new"])
+    add(tree / "d", ["other"])
+    os.remove(tree / "a" / "b" / ".whitelist.txt")
+    access.rescan("c")
+    assert access.scopes() == ["", "a", "a/b", "c"]
+    assert access("c/new")
+    assert not access("d/other")
+    access.rescan("a\\b\\")
+    assert access.scopes() == ["", "a", "c"]
+    assert access._scopes["a"] is scope_a
+    assert not access("a/b/deep.log")
+    access.rescan()
+    assert access.scopes() == ["", "a", "c", "d"]
+    assert access("d/other")
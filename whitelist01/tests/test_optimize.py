@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from whitelist01.index import RuleIndex
+from whitelist01.optimize import corpus_for, optimize, optimize_rules, verify
+from whitelist01.whitelist_rules import load_rules, save_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_removes_subsumed_rules():
+    """
+    Правила, покрытые префиксом, хвостом или glob-правилом, убираются.
+    """
+    rules = ["foo/*", "foo/**", "foo/bar", "foo/b?z", "*.log", "**.log", "x.log", "src/*", "src/*/x.py", "src/a/x.py"]
+    assert optimize_rules(rules) == ["*.log", "foo/*", "src/*"]
+    # '**/*.log' разрешает директорию '**', а 'docs/*.log' - директорию 'docs'
+    assert optimize_rules(["*.log", "**/*.log", "docs/*.log"]) == ["**/*.log", "*.log", "docs/*.log"]
+
+
+def test_keeps_rule_that_allows_parents():
+    """
+    Покрытое правило остается, если без него родительская директория станет запрещенной.
+    """
+    assert optimize_rules(["*/c", "a/b/c"]) == ["*/c", "a/b/c"]
+    # Родителя 'docs' разрешает 'docs/*', поэтому 'docs/a/b' можно убрать
+    assert optimize_rules(["docs/*", "docs/a/b"]) == ["docs/*"]
+
+
+def test_backslash_rules_untouched():
+    """
+    Правила с '\\' не убираются: их выражение не обязано начинаться с буквального префикса.
+    """
+    assert optimize_rules(["foo/*", "foo\\|bar"]) == ["foo/*", "foo\\|bar"]
+
+
+def test_random_rules_keep_answers():
+    """
+    На случайных наборах ответы до и после оптимизации совпадают.
+    """
+    random.seed(11)
+    parts = ["a", "b", "c", "x.log", "y.py", "*", "**", "?", "*.log", "a*", "?.py"]
+    for _ in range(200):
+        rules = ["/".join(random.choice(parts) for _ in range(random.randint(1, 4))) for _ in range(12)]
+        optimized = optimize_rules(rules)
+        assert set(optimized) <= set(rules)
+        paths = corpus_for(rules) + ["/".join(random.choice("abc") for _ in range(random.randint(1, 5))) for _ in range(50)]
+        assert verify(rules, optimized, paths) == []
+
+
+def test_optimize_file(temp_dir):
+    """
+    Файл перезаписывается только без dry_run и только если ответы совпали.
+    """
+    whitelist_file = str(temp_dir / ".whitelist.txt")
+    save_rules(whitelist_file, {"foo/*", "foo/bar", "goo"})
+
+    result = optimize(temp_dir, dry_run=True)
+    assert (result.before, result.after, result.removed, result.written) == (3, 2, ["foo/bar"], False)
+    assert len(load_rules(whitelist_file)) == 3
+
+    result = optimize(temp_dir)
+    assert result.written and result.mismatches == []
+    assert sorted(load_rules(whitelist_file)) == ["foo/*", "goo"]
+    assert RuleIndex(load_rules(whitelist_file)).allows("foo/bar")
@@ -0,0 +1,89 @@
+import random
+
+from whitelist01 import overlay
+from whitelist01.index import RuleIndex
+from whitelist01.overlay import RuleOverlay
+
+
+def _paths(rng: random.Random) -> list[str]:
+    paths = ["".join(rng.choice(["a", "b", "/", ".", "log", "1"]) for _ in range(rng.randint(0, 7))) for _ in range(600)]
+    return paths + ["a\n", "a/b.log\n", "a\nb.log", "foo", "foo/x", "foo/bar", "x.log", "d/x.log"]
+
+
+def _assert_same(index, rules, paths):
+    expected = RuleIndex(rules)
+    for path in paths:
+        normalized_path = path.replace("\\", "/").rstrip("/")
+        assert index.match(normalized_path) == expected.match(normalized_path), path
+        assert index.has_descendants(normalized_path) == expected.has_descendants(normalized_path), path
+        assert index.allows(path) == expected.allows(path), path
+    assert index.check_many(paths) == expected.check_many(paths)
+    assert set(index) == set(rules)
+    assert len(index) == len(set(rules))
+
+
+def test_same_results_as_rebuilt_index():
+    """
+    После серии изменений ответы совпадают с индексом, собранным заново.
+    """
+    rng = random.Random(11)
+    alphabet = ["a", "b", "/", ".", "*", "**", "?", ".log", "foo"]
+    pool = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(300)]
+    # Правила с общим ключом вида: удаление одного не должно прятать другое
+    pool += ["foo/*", "foo/**", "*.log", "**.log", "**/*.log", "foo/bar", "foo/bar/baz", "a/*b", "a/b*"]
+    paths = _paths(rng)
+    rules = set(rng.sample(pool, 150))
+    index = RuleOverlay(RuleIndex(rules))
+    for _ in range(40):
+        removed = set(rng.sample(sorted(rules), min(len(rules), rng.randint(0, 6))))
+        added = set(rng.sample(pool, rng.randint(0, 6))) - removed
+        rules = (rules - removed) | added
+        index = index.changed(removed, added)
+        _assert_same(index, rules, paths)
+
+
+def test_removed_rule_keeps_shared_key():
+    """
+    Правило с тем же ключом вида, что и удаленное, продолжает разрешать путь.
+    """
+    index = RuleOverlay(RuleIndex(["foo/*", "foo/**", "*.log", "**.log", "a/*b", "a/b*", "x", "x/y"]))
+    index = index.changed(["foo/*", "*.log", "a/*b", "x/y"], ())
+    assert index.match("foo/z")
+    assert index.match("d.log")
+    assert index.match("a/bb")
+    assert index.match("x")
+    assert not index.has_descendants("x")
+    index = index.changed(["foo/**", "**.log", "a/b*"], ())
+    assert not index.match("foo/z")
+    assert not index.match("d.log")
+    assert not index.match("a/bb")
+
+
+def test_changes_do_not_touch_old_overlay():
+    """
+    changed не меняет старое наложение и основной индекс.
+    """
+    base = RuleIndex(["foo/*", "bar"])
+    old = RuleOverlay(base)
+    new = old.changed(["bar"], ["baz/*"])
+    assert old.allows("bar") and not old.allows("baz/x")
+    assert not new.allows("bar") and new.allows("baz/x")
+    assert new.base is base
+    assert new.pending == 2
+
+
+def test_overlay_merged_when_full(monkeypatch):
+    """
+    Переполненное наложение вливается в новый основной индекс.
+    """
+    monkeypatch.setattr(overlay, "OVERLAY_LIMIT", 4)
+    base = RuleIndex(["keep"])
+    index = RuleOverlay(base)
+    for i in range(4):
+        index = index.changed((), [f"r{i}"])
+    assert index.base is base
+    index = index.changed(["keep"], [])
+    assert index.base is not base
+    assert index.pending == 0
+    assert set(index) == {"r0", "r1", "r2", "r3"}
+    assert set(base) == {"keep"}
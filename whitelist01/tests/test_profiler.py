@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from whitelist01.index import EXACT, GLOB, PREFIX, SUFFIX, RuleIndex
+from whitelist01.profiler import RuleProfiler, main, profiling_checker
+from whitelist01.whitelist_rules import add
+
+RULES = ["foo/bar", "docs/*", "docs/api/*", "*.log", "src/*/x?.py", "**/test_*.py", "src/**/deep/**/*.txt"]
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_answers_match_index():
+    """
+    Профилирующая проверка отвечает так же, как обычная.
+    """
+    index = RuleIndex(RULES)
+    profiler = RuleProfiler(RULES)
+    random.seed(5)
+    parts = ["foo", "bar", "docs", "api", "src", "a", "x1.py", "test_a.py", "deep", "b.txt", "c.log", "\\", ""]
+    for _ in range(2000):
+        path = "/".join(random.choice(parts) for _ in range(random.randint(1, 5)))
+        assert profiler(path) == index.allows(path), path
+
+
+def test_attributes_costs_to_rules():
+    """
+    Проверки и совпадения приписываются правилам вместе с их уровнем.
+    """
+    profiler = RuleProfiler(RULES)
+    assert profiler("foo/bar")
+    assert profiler("docs/readme")
+    assert profiler("docs/api/x")
+    assert profiler("var/a.log")
+    assert profiler("src/a/x1.py")
+    assert profiler("lib/test_a.py")
+    assert not profiler("lib/other.py")
+
+    costs = {cost.rule: cost for cost in profiler.costs()}
+    assert costs["foo/bar"].tier == EXACT
+    assert (costs["foo/bar"].evaluations, costs["foo/bar"].matches) == (1, 1)
+    assert costs["docs/*"].tier == PREFIX
+    assert costs["docs/*"].matches == 2
+    # 'docs/api/*' покрыт 'docs/*' и никогда не проверяется
+    assert costs["docs/api/*"].evaluations == 0
+    assert costs["*.log"].tier == SUFFIX
+    assert costs["src/*/x?.py"].tier == GLOB
+    assert costs["src/*/x?.py"].anchor == "src/"
+    # Правило без буквальной директории проверяется для каждого пути, который дошел до glob
+    assert costs["**/test_*.py"].anchor == ""
+    assert costs["**/test_*.py"].evaluations == 3
+    assert costs["**/test_*.py"].matches == 1
+    assert profiler.lookups == 7
+
+
+def test_report_and_cli(temp_dir, tmp_path, capsys):
+    """
+    Отчет показывает самые дорогие правила; то же доступно из командной строки.
+    """
+    add(temp_dir, RULES)
+    profiler = profiling_checker(temp_dir)
+    for path in ["lib/a.py", "src/a/x1.py", "docs/readme"]:
+        profiler(path)
+    report = profiler.report(top=3)
+    assert len(report.splitlines()) == 5
+    assert "(для каждого пути)" in report
+
+    paths_file = tmp_path / "paths.txt"
+    paths_file.write_text("lib/a.py\nsrc/a/x1.py\n", encoding="utf-8")
+    main([str(temp_dir), str(paths_file), "--top", "2"])
+    assert "проверок: 2" in capsys.readouterr().out
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from whitelist01.registry import CheckerRegistry, estimate_bytes
+from whitelist01.whitelist_rules import add
+
+
+@pytest.fixture
+def directories(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"dir{i}"
+        path.mkdir()
+        add(path, [f"file{i}", "common/*"])
+        paths.append(str(path))
+    return paths
+
+
+def test_loads_once_and_answers(directories):
+    """
+    Проверка директории создается при первом обращении и дальше берется из кэша.
+    """
+    registry = CheckerRegistry()
+    first = registry.get(directories[0])
+    assert registry.get(directories[0]) is first
+    assert registry.allows(directories[0], "file0")
+    assert not registry.allows(directories[0], "file1")
+    assert registry.allows(directories[1], "common/x")
+    info = registry.info()
+    assert (info.hits, info.misses, info.entries) == (3, 2, 2)
+    assert info.load_ns["count"] == 2
+    assert info.bytes == estimate_bytes(first.whitelist_file) + estimate_bytes(registry.get(directories[1]).whitelist_file)
+
+
+def test_lru_eviction(directories):
+    """
+    При превышении числа проверок или бюджета вытесняются давно не использованные.
+    """
+    registry = CheckerRegistry(max_entries=2)
+    registry.get(directories[0])
+    registry.get(directories[1])
+    registry.get(directories[0])
+    registry.get(directories[2])
+    assert directories[0] in registry and directories[2] in registry
+    assert directories[1] not in registry
+    assert registry.info().evictions == 1
+
+    registry = CheckerRegistry(max_bytes=250, weigher=lambda whitelist_file: 100)
+    for path in directories:
+        registry.get(path)
+    assert len(registry) == 2
+    assert registry.info().bytes == 200
+
+    registry = CheckerRegistry(max_bytes=10, weigher=lambda whitelist_file: 100)
+    registry.get(directories[0])
+    registry.get(directories[1])
+    # Последняя проверка остается, даже если одна не помещается в бюджет
+    assert len(registry) == 1 and directories[1] in registry
+
+
+def test_single_flight(directories):
+    """
+    Одновременные промахи по одной директории загружают ее один раз.
+    """
+    calls = []
+
+    def slow_weigher(whitelist_file):
+        calls.append(whitelist_file)
+        time.sleep(0.05)
+        return 1
+
+    registry = CheckerRegistry(weigher=slow_weigher)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get(directories[0]))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert registry.info().misses == 8
+
+
+def test_failed_load_is_retried(directories):
+    """
+    Ошибка загрузки передается вызывающему и не остается в кэше.
+    """
+    failures = [RuntimeError("boom")]
+
+    def weigher(whitelist_file):
+        if failures:
+            raise failures.pop()
+        return 1
+
+    registry = CheckerRegistry(weigher=weigher)
+    with pytest.raises(RuntimeError):
+        registry.get(directories[0])
+    assert directories[0] not in registry
+    assert registry.allows(directories[0], "file0")
+
+
+def test_reweigh_after_reload(directories):
+    """
+    После перечитывания правил вес проверки пересчитывается.
+    """
+    registry = CheckerRegistry(interval=0)
+    checker = registry.get(directories[0])
+    before = registry.info().bytes
+    add(directories[0], [f"more/{i}" for i in range(100)])
+    assert checker("more/5")
+    registry.get(directories[0])
+    assert registry.info().bytes > before
+    assert registry.invalidate(directories[0])
+    assert registry.info().bytes == 0
@@ -0,0 +1,41 @@
+import random
+
+from whitelist01.whitelist_rules import remove_rules
+
+
+def scan_remove_rules(present_rules, rules):
+    # Прежняя реализация: перебор всех правил на каждый удаляемый путь
+    present_rules = set(present_rules)
+    rules_to_remove = set()
+    for rule in rules:
+        rules_to_remove.add(rule)
+        if not any(c in rule for c in ["*", "?", "[", "]"]):
+            prefix = rule.rstrip("/") + "/"
+            for existing_rule in present_rules:
+                if existing_rule.startswith(prefix):
+                    rules_to_remove.add(existing_rule)
+    present_rules.difference_update(rules_to_remove)
+    return present_rules
+
+
+def test_removes_descendants():
+    """
+    Вместе с путем удаляются правила внутри него, но не соседние с общим началом.
+    """
+    present_rules = {"foo", "foo/bar", "foo/bar/baz", "foo/*.txt", "foobar", "foo-bar/x", "goo"}
+    assert remove_rules(present_rules, ["foo/"]) == {"foo", "foobar", "foo-bar/x", "goo"}
+    assert remove_rules(present_rules, ["foo/*"]) == present_rules
+    assert remove_rules(present_rules, ["foo/bar", "goo"]) == {"foo", "foo/*.txt", "foobar", "foo-bar/x"}
+
+
+def test_matches_scan():
+    """
+    Результат совпадает с прежним перебором на случайных наборах.
+    """
+    random.seed(17)
+    alphabet = "ab/*?\U0010ffffé"
+    for _ in range(2000):
+        present_rules = {"".join(random.choice(alphabet) for _ in range(random.randint(0, 6))) for _ in range(15)}
+        rules = ["".join(random.choice(alphabet) for _ in range(random.randint(0, 4))) for _ in range(4)]
+        rules += random.sample(sorted(present_rules), 2)
+        assert remove_rules(present_rules, rules) == scan_remove_rules(present_rules, rules)
@@ -0,0 +1,164 @@
+import socket
+import struct
+import threading
+
+import pytest
+
+from whitelist01.whitelist_rules import add, checker
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="нужны Unix-сокеты")
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+@pytest.fixture
+def server(tmp_path):
+    from whitelist01.server import DecisionServer
+
+    server = DecisionServer(str(tmp_path / "wl.sock"), interval=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def connect(server):
+    from whitelist01.server import DecisionClient
+
+    return DecisionClient(server.server_address, timeout=10)
+
+
+def test_remote_checker_matches_local(temp_dir, server):
+    """
+    Проверка через сервер отвечает так же, как checker(path).
+    """
+    add(temp_dir, ["foo/bar", "goo/*", "*.log", "docs/**/*.md"])
+    paths = ["foo/bar", "foo", "foo/baz", "goo/a/b", "x.log", "docs/a/b.md", "docs", "zoo", "foo\\bar\\"]
+    local = checker(temp_dir)
+    with connect(server) as client:
+        remote = client.checker(str(temp_dir))
+        assert [remote(path) for path in paths] == [local(path) for path in paths]
+        assert list(remote.check_many(paths)) == [int(local(path)) for path in paths]
+
+
+def test_pipelined_batches(temp_dir, server):
+    """
+    Пачки, отправленные без ожидания ответов, получают ответы в своем порядке.
+    """
+    add(temp_dir, ["foo/*"])
+    batches = [[f"foo/{i}", f"bar/{i}"] * 20000 for i in range(10)]
+    with connect(server) as client:
+        results = client.checker(str(temp_dir)).check_batches(batches)
+    assert [len(result) for result in results] == [40000] * 10
+    assert all(result[0] == 1 and result[1] == 0 for result in results)
+
+
+def test_pipelined_small_batches(temp_dir, server):
+    """
+    Много маленьких пачек подряд не блокируют клиента и сервер друг на друге.
+    """
+    add(temp_dir, ["foo/*"])
+    batches = [["foo/a", "bar"] * 8] * 5000
+    with connect(server) as client:
+        results = client.checker(str(temp_dir)).check_batches(batches)
+    assert len(results) == 5000
+    assert all(result == bytearray([1, 0] * 8) for result in results)
+
+
+def test_many_directories_one_load(tmp_path, server):
+    """
+    Несколько директорий обслуживаются одним сервером, правила грузятся один раз на директорию.
+    """
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    add(first, ["a"])
+    add(second, ["b"])
+    with connect(server) as one, connect(server) as two:
+        assert one.checker(str(first))("a")
+        assert not one.checker(str(first))("b")
+        assert two.checker(str(second))("b")
+        assert two.open(str(first)) == one.open(str(first))
+    assert len(server.registry) == 2
+    assert server.registry.info().misses == 2
+
+
+def test_evicted_directory_reopened(tmp_path):
+    """
+    Сервер держит не больше max_entries директорий; номер вытесненной
+    директории - ошибка UnknownHandleError, RemoteChecker открывает ее заново.
+    """
+    from whitelist01.server import DecisionServer, UnknownHandleError
+
+    server = DecisionServer(str(tmp_path / "small.sock"), interval=0, max_entries=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        directories = []
+        for name in ("first", "second"):
+            directory = tmp_path / name
+            directory.mkdir()
+            add(directory, [name])
+            directories.append(str(directory))
+        with connect(server) as client:
+            first = client.checker(directories[0])
+            handle = client.open(directories[0])
+            second = client.checker(directories[1])
+            assert len(server.registry) == 1
+            with pytest.raises(UnknownHandleError):
+                client.check_many(handle, ["first"])
+            assert first("first") and not first("second")
+            assert second.check_batches([["second"], ["first"]] * 20) == [bytearray([1]), bytearray([0])] * 20
+            assert first.check_batches([["first"]] * 20) == [bytearray([1])] * 20
+            for i in range(200):
+                directory = tmp_path / f"d{i}"
+                directory.mkdir()
+                client.open(str(directory))
+            assert len(server.registry) == 1
+            assert len(server._paths) <= 2 * len(server.registry) + 65
+            assert first("first")
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_server_picks_up_changes(temp_dir, server):
+    """
+    Изменения '.whitelist' видны клиентам без переподключения.
+    """
+    add(temp_dir, ["foo"])
+    with connect(server) as client:
+        remote = client.checker(str(temp_dir))
+        assert not remote("goo")
+        add(temp_dir, ["goo"])
+        assert remote("goo")
+
+
+def test_errors(temp_dir, server):
+    """
+    Неизвестная директория - ошибка запроса, соединение остается рабочим;
+    неизвестная операция закрывает соединение.
+    """
+    add(temp_dir, ["foo"])
+    with connect(server) as client:
+        with pytest.raises(ValueError):
+            client.check_many(99, ["foo"])
+        assert client.checker(str(temp_dir))("foo")
+
+    raw = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    raw.settimeout(10)
+    raw.connect(server.server_address)
+    raw.sendall(struct.pack("<BIII", 77, 1, 0, 0))
+    reply = raw.makefile("rb").read()
+    raw.close()
+    status, request_id, size = struct.unpack_from("<BII", reply)
+    assert (status, request_id) == (1, 1) and len(reply) == 9 + size
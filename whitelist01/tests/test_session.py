@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from whitelist01.checkers import ReloadingChecker
+from whitelist01.session import RuleSession, edit
+from whitelist01.whitelist_rules import add, add_rules, checker, load_rules, remove_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def whitelist_file(temp_dir):
+    return str(temp_dir / ".whitelist.txt")
+
+
+def test_session_commits_once(temp_dir):
+    """
+    Изменения сессии записываются при выходе из блока, а не после каждого вызова.
+    """
+    add(temp_dir, ["foo/bar"])
+    with edit(temp_dir) as session:
+        session.add(["foo/*"])
+        session.add(["goo/*", "docs/a"])
+        session.remove(["docs"])
+        assert sorted(load_rules(whitelist_file(temp_dir))) == ["foo/bar"]
+    assert sorted(load_rules(whitelist_file(temp_dir))) == ["foo/*", "goo/*"]
+
+
+def test_session_checker_sees_uncommitted(temp_dir):
+    """
+    Проверка из сессии видит незаписанные изменения, проверка с диска - нет.
+    """
+    add(temp_dir, ["foo/bar"])
+    with edit(temp_dir) as session:
+        session.add(["goo/*"])
+        session.remove(["foo"])
+        access = session.checker()
+        assert access("goo/bat")
+        assert not access("foo/bar")
+        assert checker(temp_dir)("foo/bar")
+
+
+def test_rollback_on_exception(temp_dir):
+    """
+    Исключение в блоке отменяет все изменения сессии.
+    """
+    add(temp_dir, ["foo/bar"])
+    with pytest.raises(RuntimeError):
+        with edit(temp_dir) as session:
+            session.add(["goo"])
+            raise RuntimeError("provisioning failed")
+    assert load_rules(whitelist_file(temp_dir)) == ["foo/bar"]
+
+
+def test_explicit_commit_and_rollback(temp_dir):
+    """
+    commit записывает текущие изменения, rollback отменяет изменения после него.
+    """
+    with edit(temp_dir, journal=True) as session:
+        session.add(["foo"])
+        session.commit()
+        session.add(["goo"])
+        session.rollback()
+        assert session.rules == {"foo"}
+    assert load_rules(whitelist_file(temp_dir)) == ["foo"]
+
+
+def test_commit_visible_to_reloading_checker(temp_dir):
+    """
+    После записи сессии долгоживущая проверка видит новые правила.
+    """
+    add(temp_dir, ["foo"])
+    access = ReloadingChecker(temp_dir, interval=0)
+    with edit(temp_dir) as session:
+        session.add(["goo"])
+    assert access("goo")
+
+
+def test_same_results_as_separate_calls():
+    """
+    Серия add/remove в сессии дает те же правила, что и отдельные вызовы.
+    """
+    random.seed(23)
+    parts = ["a", "b", "c", "*", "?", "x.log", "*.log"]
+    for _ in range(100):
+        start = {"/".join(random.choice(parts) for _ in range(random.randint(1, 3))) for _ in range(10)}
+        session = RuleSession("unused", start)
+        expected = set(start)
+        for _ in range(10):
+            rules = ["/".join(random.choice(parts) for _ in range(random.randint(1, 3))) for _ in range(3)]
+            if random.random() < 0.5:
+                session.add(rules)
+                expected = add_rules(expected, rules)
+            else:
+                session.remove(rules)
+                expected = remove_rules(expected, rules)
+            assert session.rules == expected
@@ -0,0 +1,158 @@
+import os
+import random
+import threading
+
+import pytest
+
+from whitelist01 import snapshot as snapshot_module
+from whitelist01.index import RuleIndex
+from whitelist01.locking import locked
+from whitelist01.session import edit
+from whitelist01.snapshot import _HEADER, SNAPSHOT_NAME, SnapshotIndex, build_snapshot, open_snapshot, source_signature
+from whitelist01.whitelist_rules import add, checker, save_rules
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    test_dir = tmp_path / "temp_dir"
+    test_dir.mkdir()
+    return test_dir
+
+
+def test_snapshot_same_results_as_index(temp_dir):
+    """
+    Снимок отвечает так же, как индекс правил в памяти.
+    """
+    rng = random.Random(8)
+    alphabet = ["a", "b", "/", ".", "*", "**", "?", ".log", "é"]
+    rules = {"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(300)}
+    save_rules(os.path.join(temp_dir, ".whitelist.txt"), rules)
+    snapshot = SnapshotIndex(build_snapshot(temp_dir))
+    index = RuleIndex(rules)
+    paths = ["".join(rng.choice(["a", "b", "/", ".", "log", "é"]) for _ in range(rng.randint(0, 7))) for _ in range(800)]
+    paths += ["a\n", "a/b.log\n"]
+    for path in paths:
+        assert snapshot.allows(path) == index.allows(path), path
+    assert list(snapshot.check_many(paths)) == list(index.check_many(paths))
+    snapshot.close()
+
+
+def test_checker_uses_snapshot(temp_dir):
+    """
+    checker(snapshot=True) собирает снимок и отвечает по нему.
+    """
+    add(temp_dir, ["foo/bar", "docs/*"])
+    access = checker(temp_dir, snapshot=True)
+    assert os.path.exists(os.path.join(temp_dir, SNAPSHOT_NAME))
+    assert access("foo/bar")
+    assert access("foo")
+    assert access("docs/a/b")
+    assert not access("goo")
+
+
+def test_stale_snapshot_is_rebuilt(temp_dir):
+    """
+    После изменения правил снимок собирается заново.
+    """
+    add(temp_dir, ["foo/bar"])
+    open_snapshot(temp_dir).close()
+    add(temp_dir, ["goo/bat"], journal=True)
+    snapshot = open_snapshot(temp_dir)
+    assert snapshot.allows("goo/bat")
+    snapshot.close()
+
+
+def test_touched_source_keeps_snapshot(temp_dir):
+    """
+    Если изменились только признаки файла, а содержимое то же, таблицы снимка
+    не пересобираются, а в заголовок записываются новые признаки.
+    """
+    add(temp_dir, ["foo/bar"])
+    snapshot_file = build_snapshot(temp_dir)
+    with open(snapshot_file, "rb") as file:
+        tables = file.read()[_HEADER.size :]
+    whitelist_file = os.path.join(temp_dir, ".whitelist.txt")
+    os.utime(whitelist_file, ns=(0, 0))
+    snapshot = open_snapshot(temp_dir)
+    assert snapshot.signature == source_signature(whitelist_file)
+    assert snapshot.allows("foo/bar")
+    snapshot.close()
+    with open(snapshot_file, "rb") as file:
+        assert file.read()[_HEADER.size :] == tables
+
+
+def test_noop_add_hashes_source_once(temp_dir, monkeypatch):
+    """
+    После перезаписи файла теми же правилами sha256 считается только при первом открытии.
+    """
+    add(temp_dir, ["foo/bar"])
+    build_snapshot(temp_dir)
+    add(temp_dir, ["foo/bar"])
+    calls = []
+    original_digest = snapshot_module.source_digest
+    monkeypatch.setattr(snapshot_module, "source_digest", lambda path: calls.append(path) or original_digest(path))
+    for _ in range(2):
+        snapshot = open_snapshot(temp_dir)
+        assert snapshot.allows("foo/bar")
+        snapshot.close()
+    assert len(calls) <= 1
+
+
+def test_corrupt_snapshot_is_rebuilt(temp_dir):
+    """
+    Поврежденный снимок не читается, а собирается заново.
+    """
+    add(temp_dir, ["foo/bar"])
+    with open(os.path.join(temp_dir, SNAPSHOT_NAME), "wb") as file:
+        file.write(b"garbage")
+    with pytest.raises(ValueError):
+        SnapshotIndex(os.path.join(temp_dir, SNAPSHOT_NAME))
+    snapshot = open_snapshot(temp_dir)
+    assert snapshot.allows("foo/bar")
+    snapshot.close()
+
+
+def test_corrupt_table_body_is_rebuilt(temp_dir):
+    """
+    Поврежденная таблица за заголовком видна по crc32, даже если признаки файла правил совпали.
+    """
+    add(temp_dir, ["foo/bar", "docs/*"])
+    snapshot_file = build_snapshot(temp_dir)
+    with open(snapshot_file, "r+b") as file:
+        data = file.read()
+        position = data.rindex(b"foo/bar")
+        file.seek(position)
+        file.write(b"goo")
+    with pytest.raises(ValueError):
+        SnapshotIndex(snapshot_file)
+    snapshot = open_snapshot(temp_dir)
+    assert snapshot.allows("foo/bar")
+    assert not snapshot.allows("goo/bar")
+    snapshot.close()
+
+
+def test_snapshot_built_without_writer_lock(temp_dir):
+    """
+    Снимок собирается, пока файл заблокирован писателем, и внутри сессии edit.
+    """
+    add(temp_dir, ["foo/bar"])
+    result = []
+
+    def build():
+        result.append(build_snapshot(temp_dir))
+
+    with locked(os.path.join(temp_dir, ".whitelist.txt")):
+        thread = threading.Thread(target=build, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert result
+
+    def in_session():
+        with edit(temp_dir) as session:
+            session.add(["goo/*"])
+            result.append(checker(temp_dir, snapshot=True)("foo/bar"))
+
+    thread = threading.Thread(target=in_session, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert result[-1] is True
@@ -0,0 +1,64 @@
+import random
+
+from whitelist01.trie import RuleTrie, split_rule
+from whitelist01.whitelist_rules import glob_to_regex
+
+
+def reference_match(rules, path):
+    return any(glob_to_regex(rule).match(path) for rule in rules)
+
+
+def reference_parent(rules, path):
+    return any(rule.startswith(path + "/") for rule in rules)
+
+
+def test_split_rule():
+    """
+    Правило делится по последнему '/' перед первым wildcard.
+    """
+    assert split_rule("foo/bar") == ("foo/bar", "")
+    assert split_rule("foo/bar/*.txt") == ("foo/bar/", "*.txt")
+    assert split_rule("foo/ba?/x") == ("foo/", "ba?/x")
+    assert split_rule("**/*.log") == ("", "**/*.log")
+
+
+def test_literal_and_parent_lookup():
+    """
+    Точные правила и родительские директории находятся проходом по сегментам.
+    """
+    trie = RuleTrie(["foo/bar", "alpha/beta/gamma"])
+    assert trie.match("foo/bar")
+    assert not trie.match("foo")
+    assert not trie.match("foo/ba")
+    assert trie.has_descendants("foo")
+    assert trie.has_descendants("alpha/beta")
+    assert not trie.has_descendants("alpha/beta/gamma")
+    assert not trie.has_descendants("fo")
+
+
+def test_glob_checked_below_literal_prefix():
+    """
+    Glob-правило проверяется только для путей с его буквальным префиксом.
+    """
+    trie = RuleTrie(["foo/*/bar", "docs/*.md"])
+    assert trie.match("foo/x/y/bar")
+    assert trie.match("docs/readme.md")
+    assert not trie.match("doc/readme.md")
+    # Правило с '*' тоже делает директорию родительской
+    assert trie.has_descendants("foo/*")
+
+
+def test_same_results_as_rule_scan():
+    """
+    Дерево отвечает так же, как перебор правил в прежнем access_checker.
+    """
+    rng = random.Random(11)
+    alphabet = ["a", "b", "/", "/", ".", "*", "?"]
+    rules = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 7))) for _ in range(150)]
+    rules += ["a\\nb", "a/b\\d"]
+    trie = RuleTrie(rules)
+    paths = ["".join(rng.choice("ab/.*") for _ in range(rng.randint(0, 8))) for _ in range(800)]
+    paths += ["a\nb", "a/b1", "ab\n", "a/\n"]
+    for path in paths:
+        assert trie.match(path) == reference_match(rules, path), path
+        assert trie.has_descendants(path) == reference_parent(rules, path), path
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from whitelist01.index import RuleIndex
+from whitelist01.walk import walk_allowed
+from whitelist01.whitelist_rules import add
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """
+    Создает дерево файлов:
+        docs/a.md, docs/b.txt, src/pkg/main.py, src/pkg/util.py, logs/x/1.log, big/1/2/3
+    """
+    for relative_path in ["docs/a.md", "docs/b.txt", "src/pkg/main.py", "src/pkg/util.py", "logs/x/1.log", "big/1/2/3"]:
+        file_path = tmp_path / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("")
+    return tmp_path
+
+
+def relative_paths(root, entries):
+    return sorted(os.path.relpath(entry.path, root).replace(os.sep, "/") for entry in entries)
+
+
+def test_walk_yields_allowed_files(tree):
+    """
+    Обход выдает только файлы, разрешенные правилами.
+    """
+    add(tree, ["docs/*.md", "src/pkg/main.py", "**/*.log"])
+    assert relative_paths(tree, walk_allowed(tree)) == ["docs/a.md", "logs/x/1.log", "src/pkg/main.py"]
+
+
+def test_walk_include_dirs(tree):
+    """
+    С include_dirs выдаются и директории, разрешенные как родители правил.
+    """
+    add(tree, ["src/pkg/main.py"])
+    assert relative_paths(tree, walk_allowed(tree, include_dirs=True)) == ["src", "src/pkg", "src/pkg/main.py"]
+
+
+def test_walk_skips_unmatched_subtrees(tree, monkeypatch):
+    """
+    В поддеревья, где ни одно правило не может совпасть, обход не заходит.
+    """
+    add(tree, ["src/pkg/*"])
+    scanned = []
+    scandir = os.scandir
+
+    def tracking_scandir(path):
+        scanned.append(os.path.relpath(path, tree).replace(os.sep, "/"))
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", tracking_scandir)
+    assert relative_paths(tree, walk_allowed(tree)) == ["src/pkg/main.py", "src/pkg/util.py"]
+    assert sorted(scanned) == [".", "src", "src/pkg"]
+
+
+def test_may_contain():
+    """
+    Директорию стоит обходить, если правило лежит в ней или wildcard начинается выше.
+    """
+    index = RuleIndex(["a/b/c", "x/*", "y*/z"])
+    assert index.may_contain("a")
+    assert index.may_contain("a/b")
+    assert not index.may_contain("a/c")
+    assert index.may_contain("x/deep/er")
+    assert index.may_contain("yes/no")
+    assert not index.may_contain("q")
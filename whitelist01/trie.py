@@ -0,0 +1,332 @@
+from whitelist01.matcher import RuleMatcher
+
+# Символы, после которых правило перестает быть точным путем
+WILDCARDS = "*?\\"
+
+
+def literal_prefix(rule: str) -> str:
+    """
+    Возвращает часть правила до первого wildcard: 'foo/b*r' -> 'foo/b'.
+    Любая строка, которую покрывает правило, начинается с этой части.
+    """
+    first = min((i for i in (rule.find(c) for c in WILDCARDS) if i >= 0), default=len(rule))
+    return rule[:first]
+
+
+def split_rule(rule: str) -> tuple[str, str]:
+    """
+    Делит правило на буквальный префикс директорий и остаток с первым wildcard.
+
+        Args:
+            rule: glob-правило.
+
+        'foo/bar/*.txt' -> ('foo/bar/', '*.txt'), '*.log' -> ('', '*.log').
+        Для правила без wildcard остаток пустой: 'foo/bar' -> ('foo/bar', '').
+    """
+    first = min((i for i in (rule.find(c) for c in WILDCARDS) if i >= 0), default=-1)
+    if first < 0:
+        return rule, ""
+    cut = rule.rfind("/", 0, first) + 1
+    return rule[:cut], rule[cut:]
+
+
+class TrieNode:
+    """
+    Узел дерева: один сегмент пути.
+
+    terminal - в узле заканчивается точное правило;
+    globs - остатки glob-правил, чей буквальный префикс ведет в этот узел;
+    count - сколько правил проходит через узел (узел без правил удаляется).
+    """
+
+    __slots__ = ("children", "terminal", "globs", "count", "_matcher")
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = False
+        self.globs = []
+        self.count = 0
+        self._matcher = None
+
+    def matcher(self) -> RuleMatcher:
+        # Выражение компилируется при первой проверке, которая дошла до узла
+        if self._matcher is None:
+            self._matcher = RuleMatcher(self.globs)
+        return self._matcher
+
+    def copy(self) -> "TrieNode":
+        # Дети остаются общими, скомпилированное выражение тоже: остатки те же
+        node = TrieNode()
+        node.children = dict(self.children)
+        node.terminal = self.terminal
+        node.globs = list(self.globs)
+        node.count = self.count
+        node._matcher = self._matcher
+        return node
+
+
+class RuleTrie:
+    """
+    Дерево сегментов пути, построенное из правил.
+
+    Точное совпадение и проверка "путь является родителем разрешенного" проходят
+    не больше узлов, чем сегментов в пути. Glob-правила проверяются регулярным
+    выражением только в узле, где у них появляется первый wildcard.
+    """
+
+    __slots__ = ("_root", "_owned")
+
+    def __init__(self, rules=()):
+        self._root = TrieNode()
+        # Узлы, которые можно менять; None - все узлы свои (дерево не копия)
+        self._owned = None
+        for rule in rules:
+            self.insert(rule)
+
+    def copy(self) -> "RuleTrie":
+        """
+        Возвращает копию дерева, которая делит узлы с оригиналом.
+
+            Копируется только корень. insert и remove в копии копируют узлы
+            на пути правила перед изменением, поэтому оригинал не меняется
+            и его можно продолжать читать из других потоков.
+        """
+        trie = RuleTrie()
+        trie._root = self._root.copy()
+        trie._owned = {trie._root}
+        return trie
+
+    def _child(self, node: TrieNode, segment: str) -> TrieNode:
+        # Ребенок для изменения: новый или общий с оригиналом узел становится своим
+        child = node.children.get(segment)
+        owned = self._owned
+        if child is None:
+            child = node.children[segment] = TrieNode()
+        elif owned is None or child in owned:
+            return child
+        else:
+            child = node.children[segment] = child.copy()
+        if owned is not None:
+            owned.add(child)
+        return child
+
+    def insert_path(self, rule: str):
+        """
+        Добавляет только сегменты правила: оно участвует в has_descendants, но не в match.
+        """
+        node = self._root
+        for segment in rule.split("/"):
+            child = self._child(node, segment)
+            child.count += 1
+            node = child
+
+    def insert(self, rule: str):
+        """
+        Добавляет правило в дерево.
+        """
+        prefix, remainder = split_rule(rule)
+        node = self._root
+        hang = self._root
+        segments = rule.split("/")
+        prefix_depth = prefix.count("/")
+        for depth, segment in enumerate(segments, 1):
+            child = self._child(node, segment)
+            child.count += 1
+            node = child
+            if remainder and depth == prefix_depth:
+                hang = node
+        if remainder:
+            hang.globs.append(remainder)
+            hang._matcher = None
+        else:
+            node.terminal = True
+
+    def remove(self, rule: str, path_only: bool = False):
+        """
+        Удаляет правило, добавленное через insert (или через insert_path при path_only).
+
+            Затрагиваются только узлы правила: выражение перекомпилируется лишь
+            у узла, где висел его остаток, а узлы без правил удаляются.
+        """
+        segments = rule.split("/")
+        nodes = [self._root]
+        node = self._root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return
+        for segment in segments:
+            nodes.append(self._child(nodes[-1], segment))
+        if not path_only:
+            prefix, remainder = split_rule(rule)
+            if remainder:
+                hang = nodes[prefix.count("/")]
+                hang.globs.remove(remainder)
+                hang._matcher = None
+            else:
+                nodes[-1].terminal = False
+        for depth in range(len(segments), 0, -1):
+            node = nodes[depth]
+            node.count -= 1
+            if not node.count:
+                del nodes[depth - 1].children[segments[depth - 1]]
+
+    def match(self, path: str) -> bool:
+        """
+        Проверяет, подходит ли строка под какое-либо правило.
+        Результат совпадает с any(glob_to_regex(rule).match(path) for rule in rules).
+        """
+        node = self._root
+        start = 0
+        while True:
+            if node.globs and node.matcher().match(path[start:]):
+                return True
+            slash = path.find("/", start)
+            if slash < 0:
+                segment = path[start:]
+                last = node.children.get(segment)
+                if last is not None and last.terminal:
+                    return True
+                if segment.endswith("\n"):
+                    # '$' в выражении допускает завершающий перевод строки
+                    last = node.children.get(segment[:-1])
+                    return last is not None and last.terminal
+                return False
+            node = node.children.get(path[start:slash])
+            if node is None:
+                return False
+            start = slash + 1
+
+    def match_except(self, path: str, excluded: "RuleTrie", masked: dict) -> bool:
+        """
+        Проверяет match(path) без правил дерева excluded.
+
+            Args:
+                path: проверяемая строка.
+                excluded: дерево из части правил этого дерева.
+                masked: кэш выражений узлов без остатков excluded (по id узла);
+                    годится, пока excluded не меняется.
+
+            Выражение без исключенных остатков собирается только для узла,
+            где путь подходит под общее выражение и у excluded есть остатки.
+        """
+        node = self._root
+        other = excluded._root
+        start = 0
+        while True:
+            if node.globs and node.matcher().match(path[start:]):
+                skip = other.globs if other is not None else None
+                if not skip:
+                    return True
+                matcher = masked.get(id(node))
+                if matcher is None:
+                    matcher = masked[id(node)] = RuleMatcher([rule for rule in node.globs if rule not in skip])
+                if matcher.match(path[start:]):
+                    return True
+            slash = path.find("/", start)
+            if slash < 0:
+                segment = path[start:]
+                # '$' в выражении допускает завершающий перевод строки
+                names = (segment, segment[:-1]) if segment.endswith("\n") else (segment,)
+                for name in names:
+                    last = node.children.get(name)
+                    if last is not None and last.terminal:
+                        other_last = other.children.get(name) if other is not None else None
+                        if other_last is None or not other_last.terminal:
+                            return True
+                return False
+            node = node.children.get(path[start:slash])
+            if node is None:
+                return False
+            if other is not None:
+                other = other.children.get(path[start:slash])
+            start = slash + 1
+
+    def path_count(self, path: str) -> int:
+        """
+        Возвращает, сколько правил проходит через узел пути path:
+        само правило path и правила, начинающиеся с path + '/'.
+        """
+        node = self._root
+        for segment in path.split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                return 0
+        return node.count
+
+    def glob_nodes(self, path: str):
+        """
+        Выдает узлы с glob-правилами, до которых доходит match(path), в порядке проверки.
+
+            Выдает пары (остатки правил узла, смещение): правило узла -
+            path[:смещение] + остаток, оно проверяется на path[смещение:].
+        """
+        node = self._root
+        start = 0
+        while True:
+            if node.globs:
+                yield node.globs, start
+            slash = path.find("/", start)
+            if slash < 0:
+                return
+            node = node.children.get(path[start:slash])
+            if node is None:
+                return
+            start = slash + 1
+
+    def evaluated(self, path: str) -> int:
+        """
+        Считает glob-правила, которые проверяет match(path): остатки правил
+        во всех узлах, до которых дошла проверка.
+        """
+        count = 0
+        node = self._root
+        start = 0
+        while True:
+            if node.globs:
+                count += len(node.globs)
+                if node.matcher().match(path[start:]):
+                    return count
+            slash = path.find("/", start)
+            if slash < 0:
+                return count
+            node = node.children.get(path[start:slash])
+            if node is None:
+                return count
+            start = slash + 1
+
+    def directory(self, path: str | None):
+        """
+        Проходит директорию один раз для пакетной проверки файлов в ней.
+
+            Args:
+                path: путь директории; None - файлы без директории.
+
+            Возвращает узел директории (None, если его нет) и список пар
+            (выражение узла, смещение), где смещение - позиция в пути файла,
+            с которой это выражение проверяет остаток пути.
+        """
+        node = self._root
+        globs = [(node.matcher(), 0)] if node.globs else []
+        if path is None:
+            return node, globs
+        start = 0
+        for segment in path.split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                return None, globs
+            start += len(segment) + 1
+            if node.globs:
+                globs.append((node.matcher(), start))
+        return node, globs
+
+    def has_descendants(self, path: str) -> bool:
+        """
+        Проверяет, есть ли правило, начинающееся с path + '/'.
+        """
+        node = self._root
+        for segment in path.split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                return False
+        return bool(node.children)
@@ -0,0 +1,47 @@
+import os
+
+from whitelist01.index import RuleIndex
+from whitelist01.whitelist_rules import load_rules
+
+
+def walk_allowed(path: str, include_dirs: bool = False, index: RuleIndex | None = None):
+    """
+    Обходит директорию и лениво выдает только разрешенные файлы.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            include_dirs: выдавать также разрешенные директории.
+            index: готовый индекс правил; по умолчанию читается '.whitelist' из path.
+
+        Выдает os.DirEntry. Доступ проверяется так же, как в access_checker,
+        по пути относительно path. В поддиректорию, где ни одно правило не может
+        ничего разрешить, обход не заходит и файлы в ней не читает.
+        Память зависит только от глубины дерева.
+    """
+    if index is None:
+        index = RuleIndex(load_rules(os.path.join(path, ".whitelist.txt")))
+    stack = [(os.scandir(path), "")]
+    try:
+        while stack:
+            entries, prefix = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                entries.close()
+                stack.pop()
+                continue
+            relative_path = (prefix + entry.name).replace("\\", "/")
+            if entry.is_dir(follow_symlinks=False):
+                if include_dirs and index.allows(relative_path):
+                    yield entry
+                # Поддиректории без возможных совпадений пропускаются целиком
+                if index.may_contain(relative_path):
+                    try:
+                        stack.append((os.scandir(entry.path), relative_path + "/"))
+                    except OSError:
+                        # Недоступная директория пропускается, как в os.walk
+                        pass
+            elif index.allows(relative_path):
+                yield entry
+    finally:
+        for entries, _ in stack:
+            entries.close()
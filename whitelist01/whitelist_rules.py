@@ -1,5 +1,29 @@
 import os
 import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from whitelist01.compact import CompactRuleIndex
+from whitelist01.covering import CoverIndex
+from whitelist01.decisions import DecisionCache, rules_applied, rules_changed, rules_version
+from whitelist01.globcache import compile_glob
+from whitelist01.index import RuleIndex, prefix_range_end
+from whitelist01 import metrics
+from whitelist01.journal import append_delta, discard_journal, journal_path, read_journal, replay
+from whitelist01.locking import atomic_write, group_commit, locked
+
+
+# Для скольких файлов журнальные add/remove держат правила и CoverIndex в памяти
+RULES_CACHE_SIZE = 8
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
 
 
 def load_rules(path: str) -> list[str]:
@@ -11,12 +35,23 @@ def load_rules(path: str) -> list[str]:
 
         Правило: путь до файла/директории или glob expression.
 
+        Если рядом есть журнал изменений, его записи применяются к правилам из файла.
+
         Возвращает список с правилами.
     """
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
+    rules = []
     if os.path.exists(path):
         with open(path, "r", encoding="utf-8") as file:
-            return [line.strip() for line in file if line.strip()]
-    return []
+            rules = [line.strip() for line in file if line.strip()]
+    records = read_journal(path)
+    if records:
+        rules = replay(rules, records)
+    if timing:
+        size = _file_size(path) + _file_size(journal_path(path))
+        metrics.emit("load", duration_ns=time.perf_counter_ns() - start, bytes=size, rules=len(rules))
+    return rules
 
 
 def save_rules(path: str, rules: set):
@@ -28,39 +63,66 @@ def save_rules(path: str, rules: set):
             rules: список правил.
 
         Правило: путь до файла/директории или glob expression.
+        Файл записывается атомарно: читатели видят либо старые, либо новые правила.
+        Файл содержит все правила, поэтому журнал изменений после записи удаляется.
 
     """
-    with open(path, "w", encoding="utf-8") as file:
-        for rule in sorted(rules):
-            file.write(f"{rule}\n")
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
+    data = "".join(f"{rule}\n" for rule in sorted(rules))
+    atomic_write(path, data)
+    discard_journal(path)
+    if timing:
+        size = len(data.encode("utf-8"))
+        metrics.emit("save", duration_ns=time.perf_counter_ns() - start, bytes=size, rules=len(rules), mode="full")
     return
 
 
+def save_changes(path: str, before: set, after: set):
+    """
+    Функция сохранения изменений правил в журнал '.whitelist'.
+
+        Args:
+            path: путь до файла '.whitelist'.
+            before: правила до изменения.
+            after: правила после изменения.
+
+        В журнал дописываются только добавленные и удаленные правила,
+        основной файл не переписывается. Когда журнал превышает пороги
+        из whitelist01.journal, он сворачивается в основной файл.
+    """
+    save_delta(path, before - after, after - before, after)
+
+
+def save_delta(path: str, removed, added, rules):
+    """
+    Дописывает в журнал готовую разницу правил, см. save_changes.
+
+        Args:
+            path: путь до файла '.whitelist'.
+            removed: удаленные правила.
+            added: добавленные правила.
+            rules: все правила после изменения; читаются, только если
+                журнал пора свернуть в основной файл.
+    """
+    timing = metrics.sink is not None
+    if timing:
+        start = time.perf_counter_ns()
+        size = _file_size(journal_path(path))
+    compact = append_delta(path, removed, added)
+    if timing:
+        size = _file_size(journal_path(path)) - size
+        metrics.emit("save", duration_ns=time.perf_counter_ns() - start, bytes=size, rules=len(rules), mode="journal")
+    if compact:
+        save_rules(path, rules)
+
+
 def glob_to_regex(pattern: str) -> re.Pattern:
     """
     Конвертирует glob-шаблон в регулярное выражение, корректно обрабатывая '*'.
+    Скомпилированные выражения хранятся в общем кэше (см. whitelist01.globcache).
     """
-    special_chars = ".^$+{}[]|()"
-    regex = ""
-    i = 0
-    n = len(pattern)
-    while i < n:
-        c = pattern[i]
-        if c in special_chars:
-            regex += "\\" + c
-        elif c == "*":
-            if (i + 1) < n and pattern[i + 1] == "*":
-                regex += ".*"
-                i += 1
-            else:
-                regex += ".*"
-        elif c == "?":
-            regex += "."
-        else:
-            regex += c
-        i += 1
-    regex = "^" + regex + "$"
-    return re.compile(regex)
+    return compile_glob(pattern)
 
 
 def rule_covers(covering_rule: str, covered_rule: str) -> bool:
@@ -78,65 +140,100 @@ def rule_covers(covering_rule: str, covered_rule: str) -> bool:
     return bool(regex.match(covered_rule))
 
 
-def add(path: str, rules: list[str]):
+def add_rules(present_rules: set, rules: list[str]) -> set:
     """
-    Функция добавления правил в файл '.whitelist'.
+    Добавляет правила к набору правил в памяти.
 
         Args:
-            path: путь до директории с '.whitelist'.
-            rules: список правил.
+            present_rules: текущие правила.
+            rules: список новых правил.
 
-        Правило: путь до файла/директории или glob expression.
         Если в whitelist был путь foo/bar , а в правилах добавляется foo
         оставляем в правилах только foo .
+        Возвращает новый набор правил.
+    """
+    present_rules = set(present_rules)
+    # Индексы хранят скомпилированные правила и сравнивают только кандидатов с общим префиксом
+    add_indexed(present_rules, CoverIndex(present_rules), rules)
+    return present_rules
+
 
+def add_indexed(present_rules: set, present_index: CoverIndex, rules: list[str]) -> tuple[set, set]:
     """
-    whitelist_file = os.path.join(path, ".whitelist.txt")
-    present_rules = set(load_rules(whitelist_file))
-    new_rules = set()
+    Добавляет правила, как add_rules, но изменяет present_rules на месте.
+
+        Args:
+            present_rules: текущие правила; изменяется.
+            present_index: CoverIndex тех же правил; не изменяется.
+            rules: список новых правил.
+
+        Готовый индекс позволяет серии вызовов (например, в RuleSession)
+        не разбирать все правила на каждый вызов.
+        Возвращает пару (удаленные правила, добавленные правила), чтобы
+        вызывающий мог обновить свой индекс.
+    """
+    new_rules = CoverIndex()
     rules_to_remove = set()
 
     for new_rule in rules:
-        # Проверяем, покрывается ли новое правило существующими правилами
-        is_covered = False
-        for existing_rule in present_rules:
-            if rule_covers(existing_rule, new_rule):
-                is_covered = True
-                break
-        if not is_covered:
-            # Проверяем, покрывается ли новое правило уже добавленными новыми правилами
-            for added_new_rule in new_rules:
-                if rule_covers(added_new_rule, new_rule):
-                    is_covered = True
-                    break
-        if not is_covered:
-            # Удаляем существующие правила, которые покрываются новым правилом
-            to_remove = {er for er in present_rules if rule_covers(new_rule, er)}
-            rules_to_remove.update(to_remove)
-            # Также удаляем из новых правил те, которые покрываются новым правилом
-            to_remove_new = {nr for nr in new_rules if rule_covers(new_rule, nr)}
-            rules_to_remove.update(to_remove_new)
-            new_rules = {nr for nr in new_rules if not rule_covers(new_rule, nr)}
-            new_rules.add(new_rule)
-
+        # Проверяем, покрывается ли новое правило существующими или уже добавленными новыми правилами
+        if present_index.covers(new_rule) or new_rules.covers(new_rule):
+            continue
+        # Удаляем существующие правила, которые покрываются новым правилом
+        rules_to_remove.update(present_index.covered_by(new_rule))
+        # Также удаляем из новых правил те, которые покрываются новым правилом
+        to_remove_new = new_rules.covered_by(new_rule)
+        rules_to_remove.update(to_remove_new)
+        for covered_rule in to_remove_new:
+            new_rules.discard(covered_rule)
+        new_rules.add(new_rule)
+
+    added = set(new_rules)
     present_rules.difference_update(rules_to_remove)
-    present_rules.update(new_rules)
-    save_rules(whitelist_file, present_rules)
+    present_rules.update(added)
+    return rules_to_remove, added
 
 
-def remove(path: str, rules: list[str]):
+def remove_indexed(present_rules: set, present_index: CoverIndex, rules: list[str]) -> set:
     """
-    Функция удаления правил в файле '.whitelist'.
+    Удаляет правила, как remove_rules, но изменяет present_rules на месте.
 
         Args:
-            path: путь до директории с '.whitelist'.
-            rules: список правил.
+            present_rules: текущие правила; изменяется.
+            present_index: CoverIndex тех же правил; не изменяется.
+            rules: список удаляемых правил.
 
-        Правило: путь до файла/директории или glob expression.
+        Правила внутри пути берутся из готового индекса, а не из заново
+        отсортированного списка. Возвращает удаленные правила (и те
+        из rules, которых не было).
+    """
+    rules_to_remove = set()
+    for rule in rules:
+        rules_to_remove.add(rule)
+        # Правила внутри конкретного пути идут в индексе подряд
+        if not any(c in rule for c in ["*", "?", "[", "]"]):
+            rules_to_remove.update(present_index.starting_with(rule.rstrip("/") + "/"))
+    present_rules.difference_update(rules_to_remove)
+    return rules_to_remove
 
+
+def remove_rules(present_rules: set, rules: list[str]) -> set:
     """
-    whitelist_file = os.path.join(path, ".whitelist.txt")
-    present_rules = set(load_rules(whitelist_file))
+    Удаляет правила из набора правил в памяти.
+
+        Args:
+            present_rules: текущие правила.
+            rules: список удаляемых правил.
+
+        Вместе с конкретным путем удаляются все правила внутри него.
+        Правила внутри пути ищутся двоичным поиском по отсортированному списку
+        текущих правил, поэтому массовое удаление не перебирает все правила
+        на каждый путь.
+        Возвращает новый набор правил.
+    """
+    present_rules = set(present_rules)
+    # Правила внутри пути идут в отсортированном списке подряд
+    ordered_rules = sorted(present_rules)
     rules_to_remove = set()
 
     for rule in rules:
@@ -146,37 +243,266 @@ def remove(path: str, rules: list[str]):
         # Для упрощения, предполагаем, что правило без wildcard является конкретным путем
         if not any(c in rule for c in ["*", "?", "[", "]"]):
             prefix = rule.rstrip("/") + "/"
-            for existing_rule in present_rules:
-                if existing_rule.startswith(prefix):
-                    rules_to_remove.add(existing_rule)
+            start = bisect_left(ordered_rules, prefix)
+            rules_to_remove.update(ordered_rules[start : prefix_range_end(ordered_rules, prefix)])
 
     present_rules.difference_update(rules_to_remove)
-    save_rules(whitelist_file, present_rules)
+    return present_rules
 
 
-def checker(path: str):
+class _RulesState:
+    """
+    Правила файла и их CoverIndex после последней журнальной записи этого процесса.
+    Годятся, пока совпадают признаки файла и журнала и счетчик версий правил.
+    """
+
+    __slots__ = ("signature", "version", "rules", "index")
+
+    def __init__(self, signature, version: int, rules: set):
+        self.signature = signature
+        self.version = version
+        self.rules = rules
+        self.index = CoverIndex(rules)
+
+
+_states = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def _files_signature(whitelist_file: str) -> tuple:
+    signature = []
+    for file_path in (whitelist_file, journal_path(whitelist_file)):
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(signature)
+
+
+def _take_state(whitelist_file: str) -> _RulesState:
+    # Вызывается под блокировкой файла; состояние возвращается в кэш
+    # только после удачной записи, поэтому ошибка посреди изменения его не портит
+    key = os.path.abspath(whitelist_file)
+    signature = _files_signature(whitelist_file)
+    version = rules_version(whitelist_file).value
+    with _states_lock:
+        state = _states.pop(key, None)
+    if state is None or state.signature != signature or state.version != version:
+        state = _RulesState(signature, version, set(load_rules(whitelist_file)))
+    return state
+
+
+def _put_state(whitelist_file: str, state: _RulesState):
+    state.signature = _files_signature(whitelist_file)
+    state.version = rules_version(whitelist_file).value
+    with _states_lock:
+        _states[os.path.abspath(whitelist_file)] = state
+        while len(_states) > RULES_CACHE_SIZE:
+            _states.popitem(last=False)
+
+
+def _commit_journal(whitelist_file: str, ops):
+    """
+    Применяет операции к сохраненным правилам и дописывает в журнал только разницу.
+    """
+    state = _take_state(whitelist_file)
+    index = state.index
+    net_removed = set()
+    net_added = set()
+    for op_name, op_rules in ops:
+        if op_name == "add":
+            removed, added = add_indexed(state.rules, index, op_rules)
+        else:
+            removed, added = remove_indexed(state.rules, index, op_rules), ()
+        # Разница считается по индексу, который еще не изменен
+        removed = {rule for rule in removed if rule in index}
+        added = {rule for rule in added if rule not in index}
+        for rule in removed:
+            index.discard(rule)
+            if rule in net_added:
+                net_added.discard(rule)
+            else:
+                net_removed.add(rule)
+        for rule in added:
+            index.add(rule)
+            if rule in net_removed:
+                net_removed.discard(rule)
+            else:
+                net_added.add(rule)
+    save_delta(whitelist_file, net_removed, net_added, state.rules)
+    # Долгоживущие проверки этого процесса увидят изменение без ожидания
+    rules_applied(whitelist_file, net_removed, net_added)
+    _put_state(whitelist_file, state)
+
+
+def _mutate(path: str, op: str, rules: list[str], journal: bool, group_window: float | None):
+    """
+    Загружает правила, применяет операцию и сохраняет результат под блокировкой файла.
+    При group_window операция записывается вместе с операциями других писателей.
+    """
+    whitelist_file = os.path.join(path, ".whitelist.txt")
+
+    def commit(ops):
+        if journal:
+            _commit_journal(whitelist_file, ops)
+            return
+        before = frozenset(load_rules(whitelist_file))
+        present_rules = before
+        for op_name, op_rules in ops:
+            present_rules = OPERATIONS[op_name](present_rules, op_rules)
+        save_rules(whitelist_file, present_rules)
+        # Долгоживущие проверки этого процесса увидят изменение без ожидания
+        rules_changed(whitelist_file, before, present_rules)
+
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
+    if group_window is not None:
+        group_commit(whitelist_file, op, rules, commit, group_window)
+    else:
+        with locked(whitelist_file):
+            commit([(op, rules)])
+    if timing:
+        metrics.emit(op, duration_ns=time.perf_counter_ns() - start, rules=len(rules))
+
+
+def add(path: str, rules: list[str], journal: bool = False, group_window: float | None = None):
+    """
+    Функция добавления правил в файл '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            rules: список правил.
+            journal: дописать изменения в журнал вместо перезаписи файла.
+            group_window: включает групповую запись: изменения писателей, пришедшие
+                за group_window секунд, сохраняются одной перезаписью файла.
+
+        Правило: путь до файла/директории или glob expression.
+        Если в whitelist был путь foo/bar , а в правилах добавляется foo
+        оставляем в правилах только foo .
+        Загрузка, изменение и сохранение выполняются под блокировкой файла.
+
+        Без журнала файл читается и переписывается целиком: O(числа правил).
+        С журналом процесс держит правила и их CoverIndex после своей записи
+        (для RULES_CACHE_SIZE файлов) и, пока файл не менялся в обход него,
+        не перечитывает их: изменение стоит O(числа добавленных и удаленных
+        правил) плюс сдвиг отсортированного списка CoverIndex. Первое изменение,
+        изменение после записи другим процессом или сессией и свертка журнала
+        (см. whitelist01.journal) по-прежнему стоят O(числа правил).
+
+    """
+    _mutate(path, "add", rules, journal, group_window)
+
+
+def remove(path: str, rules: list[str], journal: bool = False, group_window: float | None = None):
+    """
+    Функция удаления правил в файле '.whitelist'.
+
+        Args:
+            path: путь до директории с '.whitelist'.
+            rules: список правил.
+            journal: дописать изменения в журнал вместо перезаписи файла.
+            group_window: включает групповую запись, как в add.
+
+        Правило: путь до файла/директории или glob expression.
+        Цена записи с журналом и без него - как в add.
+    """
+    _mutate(path, "remove", rules, journal, group_window)
+
+
+OPERATIONS = {"add": add_rules, "remove": remove_rules}
+
+
+def checker(path: str, snapshot: bool = False, cache_size: int = 0, nested: bool = False, compact: bool = False):
     """
     Возвращает функцию для проверки доступа к файлу/директории
 
         Args:
             path: путь до директории с '.whitelist'.
+            snapshot: отвечать по снимку '.whitelist.idx', отображенному в память
+                (снимок собирается заново, если он устарел).
+            cache_size: хранить до cache_size последних решений по нормализованному
+                пути (0 - без кэша).
+            nested: учитывать и '.whitelist' в поддиректориях, каждый для своего
+                поддерева; возвращается NestedChecker, snapshot и cache_size
+                не используются.
+            compact: хранить правила в CompactRuleIndex: в разы меньше памяти
+                на очень больших наборах ценой более медленной проверки.
+
+        У функции есть метод check_many(paths) для проверки списка путей сразу.
+        С кэшем у функции есть метод cache_info() со статистикой кэша.
+        Проверки сообщают о себе событиями, если включены измерения (см. whitelist01.metrics).
+        Функция отвечает по правилам на момент вызова checker, поэтому
+        решения в ее кэше не устаревают; для правил, которые меняются,
+        см. ReloadingChecker(path, cache_size=...).
     """
-    whitelist_file = os.path.join(path, ".whitelist.txt")
-    present_rules = load_rules(whitelist_file)
-    regex_patterns = [glob_to_regex(rule) for rule in present_rules]
+    if nested:
+        # Вложенные правила читаются через ReloadingChecker, который импортирует этот модуль
+        from whitelist01.nested import NestedChecker
+
+        return NestedChecker(path)
+    timing = metrics.sink is not None
+    start = time.perf_counter_ns() if timing else 0
+    if snapshot:
+        # Модуль снимка сам читает правила через load_rules, поэтому импортируется здесь
+        from whitelist01.snapshot import open_snapshot
+
+        index = open_snapshot(path)
+    else:
+        whitelist_file = os.path.join(path, ".whitelist.txt")
+        present_rules = load_rules(whitelist_file)
+        # Правила разложены по видам: точные пути, префиксы, расширения и остальные glob
+        if compact:
+            index = CompactRuleIndex(present_rules)
+        else:
+            index = RuleIndex(present_rules)
+    if timing:
+        mode = "snapshot" if snapshot else "compact" if compact else "index"
+        metrics.emit("checker_build", duration_ns=time.perf_counter_ns() - start, mode=mode)
 
-    def access_checker(file_path: str):
-        normalized_path = file_path.replace("\\", "/").rstrip("/")
-        # Проверка точного совпадения
-        if any(pattern.match(normalized_path) for pattern in regex_patterns):
-            return True
+    return access_checker_for(index, cache_size)
+
+
+def access_checker_for(index, cache_size: int = 0):
+    """
+    Возвращает функцию проверки доступа по готовому индексу правил.
+
+        Args:
+            index: RuleIndex, CompactRuleIndex или SnapshotIndex.
+            cache_size: размер кэша решений (0 - без кэша), как в checker.
+    """
+    if cache_size:
+        cache = DecisionCache(cache_size)
 
-        # Проверка, является ли путь родительским для какого-либо из разрешённых путей
-        for rule in present_rules:
-            # Добавляем '/' чтобы избежать частичных совпадений (например, 'foo1' не должен совпадать с 'foo')
-            if rule.startswith(normalized_path + "/"):
-                return True
+        def decide(normalized_path: str) -> bool:
+            # Путь подходит под правило или является родительским для разрешённого пути
+            return index.match(normalized_path) or index.has_descendants(normalized_path)
 
-        return False
+        def allows(file_path: str) -> bool:
+            return cache.lookup(file_path.replace("\\", "/").rstrip("/"), decide)
 
+        # Для ответа из кэша число шаблонов не считается
+        count_patterns = None
+    else:
+        # Путь подходит под правило или является родительским для разрешённого пути
+        allows = index.allows
+
+        def count_patterns(file_path: str) -> int:
+            return index.evaluated(file_path.replace("\\", "/").rstrip("/"))
+
+    def access_checker(file_path: str):
+        if metrics.sink is None:
+            return allows(file_path)
+        return metrics.timed_lookup(allows, file_path, count_patterns)
+
+    def check_many(paths) -> bytearray:
+        if metrics.sink is None:
+            return index.check_many(paths)
+        return metrics.timed_check_many(index.check_many, paths)
+
+    if cache_size:
+        access_checker.cache_info = cache.info
+    # Пакетная проверка: access_checker.check_many(paths) -> bytearray из 0 и 1
+    access_checker.check_many = check_many
     return access_checker